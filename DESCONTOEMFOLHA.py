@@ -5,10 +5,24 @@ from mysql.connector import Error
 from datetime import datetime
 import logging
 
+from moeda import formatar_centavos, para_centavos
+
 # Configuração de logging
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Configurações do banco de dados (substitua pelos seus valores ou use um perfil, ver perfis.py)
+DB_CONFIG = {
+    "host_name": "HOST_EXAMPLE",
+    "port": 3306,
+    "user_name": "USER_EXAMPLE",
+    "user_password": "PASSWORD_EXAMPLE",
+    "db_name": "DB_EXAMPLE"
+}
+
+# Caminho base para os arquivos (substitua pelo seu caminho)
+BASE_PATH = r'CAMINHO\PARA\ARQUIVOS'
+
 def create_db_connection(host_name, port, user_name, user_password, db_name):
     """
     Cria uma conexão com o banco de dados MySQL.
@@ -77,6 +91,8 @@ def process_excel_file(file_path, connection):
         atualizacoes_bem_sucedidas = 0
         atualizacoes_falhas = 0
         cpfs_nao_atualizados = []
+        # Valores em centavos convertidos de uma vez, arredondados (int(valor * 100) truncava 0,29 para 28)
+        valores_pagos = formatar_centavos(para_centavos(df['Valor']), 3)
 
         for index, row in df.iterrows():
             total_linhas += 1
@@ -85,7 +101,9 @@ def process_excel_file(file_path, connection):
                 matricula = str(int(row['Matrícula']))
                 mes_competencia = f"{int(row['Mês Competência']):02d}"
                 ano_competencia = str(int(row['Ano Competência']))
-                valor_pago = f"{int(row['Valor'] * 100):03d}"
+                valor_pago = valores_pagos[index]
+                if pd.isna(valor_pago):
+                    raise ValueError(f"Valor inválido: {row['Valor']}")
                 convenio = f"{int(row['Logo']):03d}"
 
                 update_query = f"""
@@ -130,17 +148,8 @@ def main():
     Função principal que coordena o fluxo de execução do script: conexão ao banco de dados,
     processamento do arquivo Excel e atualização dos registros com base nos dados fornecidos.
     """
-    # Configurações do banco de dados (substitua pelos seus valores de configuração)
-    db_config = {
-        "host_name": "HOST_EXAMPLE",
-        "port": 3306,
-        "user_name": "USER_EXAMPLE",
-        "user_password": "PASSWORD_EXAMPLE",
-        "db_name": "DB_EXAMPLE"
-    }
-
-    # Caminho base para os arquivos (substitua pelo seu caminho)
-    base_path = r'CAMINHO\PARA\ARQUIVOS'
+    db_config = DB_CONFIG
+    base_path = BASE_PATH
 
     # Data atual
     hoje = datetime.now()
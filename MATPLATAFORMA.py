@@ -8,6 +8,18 @@ import logging
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Configurações do banco de dados (substitua pelos seus valores ou use um perfil, ver perfis.py)
+DB_CONFIG = {
+    "host_name": "HOST_EXAMPLE",
+    "port": 3306,
+    "user_name": "USER_EXAMPLE",
+    "user_password": "PASSWORD_EXAMPLE",
+    "db_name": "DB_EXAMPLE"
+}
+
+# Caminho direto para o arquivo (substitua pelo seu caminho)
+CAMINHO_ARQUIVO = r"CAMINHO\PARA\ARQUIVO\EXCEL.xlsx"
+
 def create_db_connection(host_name, port, user_name, user_password, db_name):
     """
     Estabelece uma conexão com o banco de dados MySQL.
@@ -262,17 +274,8 @@ def main():
     Função principal que coordena a execução do script: verifica o arquivo Excel, conecta ao banco de dados,
     processa o arquivo, atualiza registros e gera um relatório de operações realizadas.
     """
-    # Configurações do banco de dados (substitua pelos seus valores de configuração)
-    db_config = {
-        "host_name": "HOST_EXAMPLE",
-        "port": 3306,
-        "user_name": "USER_EXAMPLE",
-        "user_password": "PASSWORD_EXAMPLE",
-        "db_name": "DB_EXAMPLE"
-    }
-
-    # Caminho direto para o arquivo (substitua pelo seu caminho)
-    caminho_arquivo = r"CAMINHO\PARA\ARQUIVO\EXCEL.xlsx"
+    db_config = DB_CONFIG
+    caminho_arquivo = CAMINHO_ARQUIVO
 
     # Verifica se o arquivo existe
     if not os.path.exists(caminho_arquivo):
@@ -17,6 +17,12 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import traceback
 
+from painel_agendador import AgendadorHeap, recursos_da_tarefa
+from painel_execucao import ExecucaoProcesso, caminho_log, limpar_logs, limpar_logs_tarefa, TIMEOUT_PADRAO_MINUTOS
+from painel_logs import preparar_log, descomprimir, conteudo_para_exportacao, conteudo_da_exportacao
+import painel_resumo
+import painel_migracoes
+
 # Variáveis de configuração da API IBM Control Center
 ICC_API_BASE_URL = "https://SEU_SERVER_IBM_ICC:PORTA/api/v1"
 ICC_USERNAME = "SEU_USUARIO_API"
@@ -25,7 +31,7 @@ ICC_PASSWORD = "SUA_SENHA_API"
 try:
     import pyodbc
     import sqlalchemy
-    from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float, ForeignKey, Boolean
+    from sqlalchemy import create_engine, Column, Integer, String, Date, DateTime, Text, Float, ForeignKey, Boolean, LargeBinary
     from sqlalchemy.orm import declarative_base
     from sqlalchemy.orm import sessionmaker, relationship
     from sqlalchemy.sql import func
@@ -134,6 +140,7 @@ if SQLSERVER_AVAILABLE:
         cd_destination_path = Column(String(500)) # Caminho do arquivo de destino no nó remoto do CD
         cd_process_name = Column(String(200)) # Nome de um processo CD pré-configurado (opcional)
         # --- FIM NOVOS CAMPOS ---
+        timeout_minutos = Column(Integer) # Tempo limite da execução BAT (vazio = TIMEOUT_PADRAO_MINUTOS)
 
         execucoes = relationship("Execucao", back_populates="tarefa", cascade="all, delete-orphan")
         agendamentos = relationship("Agendamento", back_populates="tarefa", cascade="all, delete-orphan")
@@ -146,10 +153,19 @@ if SQLSERVER_AVAILABLE:
         status = Column(String(50))
         codigo_retorno = Column(Integer)
         duracao_segundos = Column(Float)
-        log_output = Column(Text)
+        log_output = Column(Text)  # Log inteiro ou, se longo, início e fim (ver painel_logs)
+        log_hash = Column(String(64))  # Log completo em painel_logs_execucao (None = log_output está inteiro)
         executado_por_agendador = Column(Boolean, default=False)
         tarefa = relationship("Tarefa", back_populates="execucoes")
 
+    class LogExecucao(Base):
+        __tablename__ = 'painel_logs_execucao'
+        hash = Column(String(64), primary_key=True)  # SHA-256 do texto: logs idênticos são gravados uma vez
+        compressao = Column(String(10))  # zstd, gzip
+        tamanho_original = Column(Integer)
+        conteudo = Column(LargeBinary)
+        data_criacao = Column(DateTime, default=func.now())
+
     class Agendamento(Base):
         __tablename__ = 'painel_agendamentos'
         id = Column(Integer, primary_key=True, autoincrement=True)
@@ -191,6 +207,25 @@ if SQLSERVER_AVAILABLE:
         configuracao = Column(Text)  # JSON com configurações específicas
         data_atualizacao = Column(DateTime, default=func.now())
 
+    class ResumoDashboard(Base):
+        __tablename__ = 'painel_resumo'
+        chave = Column(String(100), primary_key=True)  # ver painel_resumo.py
+        valor = Column(Integer, nullable=False, default=0)
+        valor_data = Column(DateTime)
+
+    class ExecucaoDiaria(Base):
+        __tablename__ = 'painel_execucoes_diarias'
+        # Sem FK para a tarefa: o consolidado é reconstruído quando tarefas são excluídas
+        tarefa_id = Column(Integer, primary_key=True)
+        dia = Column(Date, primary_key=True)
+        execucoes = Column(Integer, nullable=False, default=0)
+        sucessos = Column(Integer, nullable=False, default=0)
+        erros = Column(Integer, nullable=False, default=0)
+        timeouts = Column(Integer, nullable=False, default=0)
+        duracao_total = Column(Float, nullable=False, default=0)
+        duracao_min = Column(Float)
+        duracao_max = Column(Float)
+
     class SistemaMonitor(Base):
         __tablename__ = 'painel_sistema_monitor'
         id = Column(Integer, primary_key=True, autoincrement=True)
@@ -374,6 +409,11 @@ class TaskDialog:
         self.cd_config_frame.columnconfigure(1, weight=1)
         # --- FIM NOVOS CAMPOS ---
 
+        # Tempo limite (vazio = padrão)
+        ttk.Label(main_frame, text="Tempo Limite (min):").grid(row=7, column=0, sticky='w', pady=5)
+        self.timeout_entry = ttk.Entry(main_frame, width=10)
+        self.timeout_entry.grid(row=7, column=1, padx=(10, 0), pady=5, sticky='w')
+
         # Preencher campos se for edição
         if task_data:
             self.titulo_entry.insert(0, task_data.titulo or "")
@@ -389,9 +429,11 @@ class TaskDialog:
                 self.cd_destination_node_entry.insert(0, getattr(task_data, 'cd_destination_node', "") or "")
                 self.cd_destination_path_entry.insert(0, getattr(task_data, 'cd_destination_path', "") or "")
                 self.cd_process_name_entry.insert(0, getattr(task_data, 'cd_process_name', "") or "")
+            if getattr(task_data, 'timeout_minutos', None):
+                self.timeout_entry.insert(0, str(task_data.timeout_minutos))
 
         btn_frame = ttk.Frame(main_frame)
-        btn_frame.grid(row=7, column=0, columnspan=2, pady=20) # Linha ajustada
+        btn_frame.grid(row=8, column=0, columnspan=2, pady=20) # Linha ajustada
         
         ttk.Button(btn_frame, text="💾 Salvar", width=15, command=self.on_ok).pack(side='left', padx=5)
         ttk.Button(btn_frame, text="❌ Cancelar", width=15, command=self.top.destroy).pack(side='left', padx=5)
@@ -459,6 +501,11 @@ class TaskDialog:
             if not all([cd_source_path, cd_destination_node, cd_destination_path]):
                 messagebox.showwarning("Aviso", "Para Connect:Direct, os campos 'Caminho Origem', 'Nó Destino' e 'Caminho Destino' são obrigatórios.")
                 return
+
+        timeout_minutos = self.timeout_entry.get().strip()
+        if timeout_minutos and (not timeout_minutos.isdigit() or int(timeout_minutos) <= 0):
+            messagebox.showwarning("Aviso", "O tempo limite deve ser um número inteiro de minutos (ou vazio para o padrão).")
+            return
             
         self.result = {
             'titulo': titulo,
@@ -469,7 +516,8 @@ class TaskDialog:
             'cd_source_path': cd_source_path, # Novos campos
             'cd_destination_node': cd_destination_node,
             'cd_destination_path': cd_destination_path,
-            'cd_process_name': cd_process_name if cd_process_name else None # Salva None se vazio
+            'cd_process_name': cd_process_name if cd_process_name else None, # Salva None se vazio
+            'timeout_minutos': int(timeout_minutos) if timeout_minutos else None
         }
         self.top.destroy()
 
@@ -709,6 +757,9 @@ class PainelDesktop:
         
         # Variáveis de controle
         self.scheduler_running = False
+        self.execucoes_ativas = {}  # {task_id: ExecucaoProcesso} das execuções BAT em andamento
+        self.execucoes_manuais = set()  # task_ids com execução manual em andamento
+        self.lock_execucoes_manuais = threading.Lock()
         self.current_theme = "teal"
         self.notification_configs = {}
         
@@ -717,6 +768,12 @@ class PainelDesktop:
         self.create_widgets()
         self.load_data()
         
+        # Retenção dos logs de execução em disco
+        try:
+            limpar_logs()
+        except Exception as e:
+            print(f"⚠️ Erro ao limpar logs de execução antigos: {e}")
+
         # Iniciar agendador
         self.start_scheduler()
 
@@ -771,6 +828,7 @@ class PainelDesktop:
             # Criar tabelas se não existirem
             print("📋 Criando/verificando tabelas...")
             Base.metadata.create_all(bind=self.engine)
+            self.run_migrations()
             
             print("✅ Conexão com SQL Server configurada com sucesso!")
             print("🎉 Sistema pronto para uso!")
@@ -810,6 +868,7 @@ class PainelDesktop:
             # Para SQLite, precisamos recriar os modelos
             if SQLSERVER_AVAILABLE: # Se SQLALCHEMY estiver disponível, use o Base.metadata
                 Base.metadata.create_all(bind=self.engine)
+                self.run_migrations()
             else: # Se SQLALCHEMY não estiver disponível, crie tabelas manualmente
                 self.create_sqlite_tables()
             
@@ -843,7 +902,8 @@ class PainelDesktop:
                 cd_source_path TEXT,
                 cd_destination_node TEXT,
                 cd_destination_path TEXT,
-                cd_process_name TEXT
+                cd_process_name TEXT,
+                timeout_minutos INTEGER
             )
         ''')
         
@@ -857,11 +917,23 @@ class PainelDesktop:
                 codigo_retorno INTEGER,
                 duracao_segundos REAL,
                 log_output TEXT,
+                log_hash TEXT,
                 executado_por_agendador BOOLEAN DEFAULT 0,
                 FOREIGN KEY (tarefa_id) REFERENCES painel_tarefas (id)
             )
         ''')
         
+        # Logs completos comprimidos, endereçados pelo hash do conteúdo
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS painel_logs_execucao (
+                hash TEXT PRIMARY KEY,
+                compressao TEXT,
+                tamanho_original INTEGER,
+                conteudo BLOB,
+                data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
         # Tabela de agendamentos
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS painel_agendamentos (
@@ -914,6 +986,31 @@ class PainelDesktop:
             )
         ''')
         
+        # Contadores do dashboard (ver painel_resumo.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS painel_resumo (
+                chave TEXT PRIMARY KEY,
+                valor INTEGER NOT NULL DEFAULT 0,
+                valor_data TIMESTAMP
+            )
+        ''')
+        
+        # Execuções consolidadas por tarefa e dia (gráficos e relatórios)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS painel_execucoes_diarias (
+                tarefa_id INTEGER NOT NULL,
+                dia DATE NOT NULL,
+                execucoes INTEGER NOT NULL DEFAULT 0,
+                sucessos INTEGER NOT NULL DEFAULT 0,
+                erros INTEGER NOT NULL DEFAULT 0,
+                timeouts INTEGER NOT NULL DEFAULT 0,
+                duracao_total REAL NOT NULL DEFAULT 0,
+                duracao_min REAL,
+                duracao_max REAL,
+                PRIMARY KEY (tarefa_id, dia)
+            )
+        ''')
+        
         # Tabela de monitoramento
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS painel_sistema_monitor (
@@ -929,6 +1026,66 @@ class PainelDesktop:
         
         conn.commit()
         conn.close()
+        self.run_migrations()
+
+    def run_migrations(self):
+        """Aplica as migrações de esquema pendentes (ver painel_migracoes.py)"""
+        dialeto = self.summary_dialect()
+        if self.using_sqlite and not SQLSERVER_AVAILABLE:
+            import sqlite3
+            # Transações explícitas: sem isso o módulo sqlite3 não abre transação para o
+            # DDL e a migração e o registro da versão não seriam atômicos
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            try:
+                conn.execute(painel_migracoes.sql_criar_controle(dialeto))
+                aplicadas = [row[0] for row in conn.execute(painel_migracoes.SQL_VERSOES_APLICADAS)]
+                for migracao in painel_migracoes.pendentes(aplicadas):
+                    # IMMEDIATE trava a escrita já no início: outra instância espera e, ao
+                    # entrar, encontra a versão registrada
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        if conn.execute(painel_migracoes.SQL_VERSAO_APLICADA, {'versao': migracao[0]}).fetchone():
+                            conn.execute("ROLLBACK")
+                            continue
+                        consultar = lambda sql: conn.execute(sql).fetchall()
+                        for sql in painel_migracoes.comandos_da_migracao(migracao, dialeto, consultar):
+                            conn.execute(sql)
+                        conn.execute(painel_migracoes.SQL_REGISTRAR_VERSAO,
+                                     painel_migracoes.registro_da_versao(migracao, dialeto))
+                        conn.execute("COMMIT")
+                    except Exception:
+                        conn.execute("ROLLBACK")
+                        raise
+                    print(f"🛠️ Migração {migracao[0]} aplicada: {migracao[1]}")
+            finally:
+                conn.close()
+        else:
+            with self.engine.begin() as connection:
+                connection.execute(sqlalchemy.text(painel_migracoes.sql_criar_controle(dialeto)))
+                aplicadas = [row[0] for row in connection.execute(sqlalchemy.text(painel_migracoes.SQL_VERSOES_APLICADAS))]
+            sql_trava = painel_migracoes.sql_travar_migracoes(dialeto)
+            for migracao in painel_migracoes.pendentes(aplicadas):
+                try:
+                    with self.engine.begin() as connection:
+                        if sql_trava:
+                            connection.execute(sqlalchemy.text(sql_trava))
+                        versao = {'versao': migracao[0]}
+                        if connection.execute(sqlalchemy.text(painel_migracoes.SQL_VERSAO_APLICADA), versao).fetchone():
+                            continue  # Aplicada por outra instância enquanto esta esperava a trava
+                        consultar = lambda sql: connection.execute(sqlalchemy.text(sql)).fetchall()
+                        for sql in painel_migracoes.comandos_da_migracao(migracao, dialeto, consultar):
+                            connection.execute(sqlalchemy.text(sql))
+                        connection.execute(sqlalchemy.text(painel_migracoes.SQL_REGISTRAR_VERSAO),
+                                           painel_migracoes.registro_da_versao(migracao, dialeto))
+                except sqlalchemy.exc.IntegrityError:
+                    # Outra instância registrou a mesma versão ao mesmo tempo (sem trava, ex.: SQLite
+                    # via SQLAlchemy): a transação desta foi desfeita e a migração já está aplicada
+                    with self.engine.connect() as connection:
+                        if not connection.execute(sqlalchemy.text(painel_migracoes.SQL_VERSAO_APLICADA),
+                                                  {'versao': migracao[0]}).fetchone():
+                            raise
+                    continue
+                print(f"🛠️ Migração {migracao[0]} aplicada: {migracao[1]}")
 
     def check_initial_data(self):
         """Verifica se há dados iniciais no banco"""
@@ -1072,6 +1229,7 @@ class PainelDesktop:
         menubar.add_cascade(label="Ferramentas", menu=tools_menu)
         tools_menu.add_command(label="Backup Banco", command=self.backup_database)
         tools_menu.add_command(label="Limpar Dados", command=self.clear_data)
+        tools_menu.add_command(label="Recalcular Estatísticas", command=self.recalculate_statistics)
         tools_menu.add_command(label="Teste de Notificação", command=self.test_notification)
         
         # Menu Ajuda
@@ -1142,59 +1300,73 @@ class PainelDesktop:
         self.create_execution_chart(charts_frame)
 
     def create_execution_chart(self, parent):
-        """Cria gráfico de execuções por data"""
+        """Cria gráfico de execuções por data, com seleção do período"""
+        controls = ttk.Frame(parent)
+        controls.pack(fill='x')
+        ttk.Label(controls, text="Período:").pack(side='left', padx=(0, 5))
+        self.chart_period_var = tk.StringVar(value=f"{painel_resumo.PERIODOS_GRAFICO[0]} dias")
+        period_combo = ttk.Combobox(controls, textvariable=self.chart_period_var, state='readonly', width=10,
+                                    values=[f"{dias} dias" for dias in painel_resumo.PERIODOS_GRAFICO])
+        period_combo.pack(side='left')
+        period_combo.bind('<<ComboboxSelected>>', lambda e: self.draw_execution_chart())
+        
+        self.chart_container = ttk.Frame(parent)
+        self.chart_container.pack(fill='both', expand=True)
+        self.chart_figure = None
+        self.draw_execution_chart()
+
+    def fetch_daily_executions(self, dias, task_id=None):
+        """Execuções por dia dos últimos `dias` dias, lidas de painel_execucoes_diarias"""
+        sql, parametros = painel_resumo.sql_execucoes_por_dia(dias, task_id, dialeto=self.summary_dialect())
+        if self.using_sqlite and not SQLSERVER_AVAILABLE:
+            import sqlite3
+            conn = sqlite3.connect(self.db_path)
+            try:
+                df = pd.read_sql_query(sql, conn, params=parametros)
+            finally:
+                conn.close()
+        else:
+            with self.engine.connect() as conn:
+                df = pd.read_sql_query(sqlalchemy.text(sql), conn, params=parametros)
+        df['data'] = pd.to_datetime(df['data'])
+        return df
+
+    def draw_execution_chart(self):
+        """Desenha (ou redesenha) os gráficos do dashboard no período selecionado"""
+        for widget in self.chart_container.winfo_children():
+            widget.destroy()
+        if self.chart_figure is not None:
+            plt.close(self.chart_figure)
+            self.chart_figure = None
+        parent = self.chart_container
+        dias = int(self.chart_period_var.get().split()[0])
         try:
             # Configurar matplotlib para tema escuro
             plt.style.use('dark_background')
             
             fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 4))
             fig.patch.set_facecolor('#1e3a3a')
+            self.chart_figure = fig
+            
+            # Execuções por data (consolidado diário)
+            df_executions = self.fetch_daily_executions(dias)
             
-            # Buscar dados
+            # Tarefas por prioridade
+            sql_tasks = """
+                SELECT prioridade, COUNT(*) as count 
+                FROM painel_tarefas 
+                GROUP BY prioridade
+            """
             if self.using_sqlite and not SQLSERVER_AVAILABLE:
                 # SQLite sem SQLAlchemy
                 import sqlite3
                 conn = sqlite3.connect(self.db_path)
-                
-                # Execuções por data
-                df_executions = pd.read_sql_query("""
-                    SELECT DATE(data_execucao) as data, COUNT(*) as count,
-                           SUM(CASE WHEN status = 'sucesso' THEN 1 ELSE 0 END) as sucessos
-                    FROM painel_execucoes 
-                    WHERE data_execucao >= datetime('now', '-7 days')
-                    GROUP BY DATE(data_execucao)
-                    ORDER BY data
-                """, conn)
-                
-                # Tarefas por prioridade
-                df_tasks = pd.read_sql_query("""
-                    SELECT prioridade, COUNT(*) as count 
-                    FROM painel_tarefas 
-                    GROUP BY prioridade
-                """, conn)
-                
+                df_tasks = pd.read_sql_query(sql_tasks, conn)
                 conn.close()
             else:
                 # SQL Server com SQLAlchemy
-                from sqlalchemy import text
-                
                 with self.engine.connect() as conn:
-                    # Execuções por data
-                    df_executions = pd.read_sql_query("""
-                        SELECT CAST(data_execucao AS DATE) as data, COUNT(*) as count,
-                               SUM(CASE WHEN status = 'sucesso' THEN 1 ELSE 0 END) as sucessos
-                        FROM painel_execucoes 
-                        WHERE data_execucao >= DATEADD(day, -7, GETDATE())
-                        GROUP BY CAST(data_execucao AS DATE)
-                        ORDER BY data
-                    """, conn)
-                    
-                    # Tarefas por prioridade
-                    df_tasks = pd.read_sql_query("""
-                        SELECT prioridade, COUNT(*) as count 
-                        FROM painel_tarefas 
-                        GROUP BY prioridade
-                    """, conn)
+                    df_tasks = pd.read_sql_query(sqlalchemy.text(sql_tasks), conn)
             
             # Gráfico 1: Execuções por data
             if not df_executions.empty:
@@ -1202,15 +1374,15 @@ class PainelDesktop:
 				                       color='#4a9b9b', alpha=0.7, label='Total')
                 ax1.bar(df_executions['data'], df_executions['sucessos'], 
                        color='#66cccc', alpha=0.8, label='Sucessos')
-                ax1.set_title('Execuções por Data (7 dias)', color='#e8f4f4', fontsize=12)
+                ax1.set_title(f'Execuções por Data ({dias} dias)', color='#e8f4f4', fontsize=12)
                 ax1.set_ylabel('Quantidade', color='#e8f4f4')
                 ax1.legend()
                 ax1.tick_params(axis='x', rotation=45, colors='#e8f4f4')
                 ax1.tick_params(axis='y', colors='#e8f4f4')
             else:
-                ax1.text(0.5, 0.5, 'Sem execuções nos últimos 7 dias', 
+                ax1.text(0.5, 0.5, f'Sem execuções nos últimos {dias} dias', 
                         ha='center', va='center', color='#e8f4f4', transform=ax1.transAxes)
-                ax1.set_title('Execuções por Data (7 dias)', color='#e8f4f4', fontsize=12)
+                ax1.set_title(f'Execuções por Data ({dias} dias)', color='#e8f4f4', fontsize=12)
             
             # Gráfico 2: Tarefas por prioridade
             if not df_tasks.empty:
@@ -1264,6 +1436,8 @@ class PainelDesktop:
         
         ttk.Button(controls_frame, text="📊 Ver Histórico", 
                   command=self.show_execution_history).pack(side='left', padx=5)
+        ttk.Button(controls_frame, text="📜 Acompanhar Execução", 
+                  command=self.show_live_output).pack(side='left', padx=5)
         ttk.Button(controls_frame, text="🔄 Atualizar", 
                   command=self.refresh_tasks).pack(side='left', padx=5)
         
@@ -1349,6 +1523,10 @@ class PainelDesktop:
         self.scheduler_status_label = ttk.Label(controls_frame, text="🟢 Agendador Ativo", 
                                                font=('Segoe UI', 10, 'bold'))
         self.scheduler_status_label.pack(side='left', padx=10)
+
+        # Fila de execução por prioridade
+        self.queue_status_label = ttk.Label(controls_frame, text="", font=('Segoe UI', 9))
+        self.queue_status_label.pack(side='left', padx=10)
         
         ttk.Button(controls_frame, text="🔄 Atualizar", 
                   command=self.refresh_schedules).pack(side='right', padx=5)
@@ -1637,10 +1815,12 @@ Funcionalidades Disponíveis:
 
     def load_data(self):
         """Carrega dados iniciais"""
+        self.ensure_dashboard_summary()
         self.refresh_tasks()
         self.refresh_schedules()
         self.refresh_alerts()
         self.update_dashboard_stats()
+        self.notificar_agendador()
 
     def refresh_tasks(self):
         """Atualiza a lista de tarefas"""
@@ -1861,6 +2041,21 @@ Funcionalidades Disponíveis:
             print(f"❌ Erro ao carregar agendamentos: {e}")
             messagebox.showerror("Erro", f"Erro ao carregar agendamentos: {e}")
 
+        self.update_queue_status()
+
+    def update_queue_status(self):
+        """Mostra a fila de execução por prioridade (quantidade e espera média) e a ocupação dos recursos"""
+        if not getattr(self, 'agendador', None) or not hasattr(self, 'queue_status_label'):
+            return
+        situacao = self.agendador.pool.situacao()
+        classes = " | ".join(f"{prioridade}: {dados['fila']} (espera média {dados['espera_media']:.0f}s)"
+                             for prioridade, dados in situacao['prioridades'].items())
+        recursos = "".join(f" · {recurso} {dados['em_uso']}/{dados['capacidade'] or '∞'}"
+                           + (f" (+{dados['fila']} na fila)" if dados['fila'] else "")
+                           for recurso, dados in situacao['recursos'].items())
+        self.queue_status_label.config(
+            text=f"Executando {situacao['executando']}/{situacao['max_simultaneas']} · Fila {classes}{recursos}")
+
     def refresh_alerts(self):
         """Atualiza a lista de alertas"""
         try:
@@ -2009,74 +2204,28 @@ Funcionalidades Disponíveis:
             messagebox.showerror("Erro", f"Erro ao carregar alertas: {e}")
 
     def update_dashboard_stats(self):
-        """Atualiza as estatísticas do dashboard"""
+        """Atualiza as estatísticas do dashboard (uma consulta aos contadores de painel_resumo)"""
         try:
+            sql, parametros = painel_resumo.sql_leitura()
             if self.using_sqlite and not SQLSERVER_AVAILABLE:
                 import sqlite3
                 conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                
-                # Total de tarefas configuradas
-                cursor.execute("SELECT COUNT(*) FROM painel_tarefas")
-                total_tasks = cursor.fetchone()[0]
-                
-                # Agendamentos ativos
-                cursor.execute("SELECT COUNT(*) FROM painel_agendamentos WHERE ativo = 1")
-                active_schedules = cursor.fetchone()[0]
-                
-                # Execuções hoje
-                cursor.execute("""
-                    SELECT COUNT(*) FROM painel_execucoes 
-                    WHERE DATE(data_execucao) = DATE('now')
-                """,)
-                executions_today = cursor.fetchone()[0]
-                
-                # Alertas pendentes
-                cursor.execute("SELECT COUNT(*) FROM painel_alertas WHERE resolvido = 0")
-                pending_alerts = cursor.fetchone()[0]
-                
-                # Última execução
-                cursor.execute("SELECT MAX(data_execucao) FROM painel_execucoes")
-                last_execution = cursor.fetchone()[0]
-                
-                # Taxa de sucesso
-                cursor.execute("SELECT COUNT(*) FROM painel_execucoes WHERE status = 'sucesso'")
-                sucessos = cursor.fetchone()[0]
-                cursor.execute("SELECT COUNT(*) FROM painel_execucoes")
-                total_execucoes = cursor.fetchone()[0]
-                
-                conn.close()
-            else:
-                session = self.get_db_session()
                 try:
-                    # Total de tarefas configuradas
-                    total_tasks = session.query(Tarefa).count()
-                    
-                    # Agendamentos ativos
-                    active_schedules = session.query(Agendamento).filter(Agendamento.ativo == True).count()
-                    
-                    # Execuções hoje
-                    from sqlalchemy import func, cast, Date
-                    today = datetime.date.today()
-                    executions_today = session.query(Execucao).filter(
-                        cast(Execucao.data_execucao, Date) == today
-                    ).count()
-                    
-                    # Alertas pendentes
-                    pending_alerts = session.query(Alerta).filter(Alerta.resolvido == False).count()
-                    
-                    # Última execução
-                    last_execution_obj = session.query(Execucao).order_by(
-                        Execucao.data_execucao.desc()
-                    ).first()
-                    last_execution = last_execution_obj.data_execucao if last_execution_obj else None
-                    
-                    # Taxa de sucesso
-                    sucessos = session.query(Execucao).filter(Execucao.status == 'sucesso').count()
-                    total_execucoes = session.query(Execucao).count()
-                    
+                    rows = conn.execute(sql, parametros).fetchall()
                 finally:
-                    session.close()
+                    conn.close()
+            else:
+                with self.engine.connect() as connection:
+                    rows = connection.execute(sqlalchemy.text(sql), parametros).fetchall()
+            
+            resumo = {chave: (valor, valor_data) for chave, valor, valor_data in rows}
+            total_tasks = resumo['tarefas_total'][0]
+            active_schedules = resumo['agendamentos_ativos'][0]
+            executions_today = resumo.get(painel_resumo.chave_dia(datetime.date.today()), (0, None))[0]
+            pending_alerts = resumo.get(painel_resumo.CHAVE_ALERTAS_PENDENTES, (0, None))[0]
+            last_execution = resumo.get(painel_resumo.CHAVE_ULTIMA_EXECUCAO, (0, None))[1]
+            sucessos = resumo.get(painel_resumo.CHAVE_SUCESSO, (0, None))[0]
+            total_execucoes = resumo.get(painel_resumo.CHAVE_TOTAL, (0, None))[0]
             
             # Atualizar labels
             self.stats_labels['tasks_total'].config(text=str(total_tasks))
@@ -2108,6 +2257,76 @@ Funcionalidades Disponíveis:
         except Exception as e:
             print(f"Erro ao atualizar estatísticas: {e}")
 
+    def summary_dialect(self):
+        if self.using_sqlite and not SQLSERVER_AVAILABLE:
+            return 'sqlite'
+        return self.engine.dialect.name
+
+    def apply_summary_increments(self, executar, incrementos, ultima_execucao=None):
+        """
+        Atualiza os contadores de painel_resumo pela conexão/sessão de quem
+        está gravando (executar(sql, parametros)), dentro da mesma transação.
+        """
+        dialeto = self.summary_dialect()
+        for chave, valor in incrementos.items():
+            executar(painel_resumo.sql_incrementar(dialeto), {'chave': chave, 'valor': valor})
+        if ultima_execucao:
+            executar(painel_resumo.sql_ultima_execucao(dialeto),
+                     {'data': ultima_execucao if dialeto == 'mssql' else ultima_execucao.isoformat(' ')})
+
+    def record_execution_summary(self, executar, task_id, status, data_execucao, duracao):
+        """Contadores do dashboard e consolidado diário de uma nova execução, na mesma transação"""
+        dialeto = self.summary_dialect()
+        self.apply_summary_increments(executar, painel_resumo.incrementos_execucao(status, data_execucao),
+                                      ultima_execucao=data_execucao)
+        executar(painel_resumo.sql_consolidar_execucao(dialeto),
+                 painel_resumo.valores_consolidado(task_id, status, data_execucao, duracao, dialeto))
+
+    def reconcile_dashboard_summary(self):
+        """Reconstrói painel_resumo e o consolidado diário a partir das execuções e alertas"""
+        comandos = painel_resumo.sql_reconciliar(self.summary_dialect())
+        if self.using_sqlite and not SQLSERVER_AVAILABLE:
+            import sqlite3
+            conn = sqlite3.connect(self.db_path)
+            try:
+                for sql in comandos:
+                    conn.execute(sql)
+                conn.commit()
+            finally:
+                conn.close()
+        else:
+            with self.engine.begin() as connection:
+                for sql in comandos:
+                    connection.execute(sqlalchemy.text(sql))
+        print("📊 Contadores do dashboard recalculados")
+
+    def ensure_dashboard_summary(self):
+        """Monta os contadores e o consolidado na primeira abertura (banco novo ou anterior a eles)"""
+        try:
+            if self.using_sqlite and not SQLSERVER_AVAILABLE:
+                import sqlite3
+                conn = sqlite3.connect(self.db_path)
+                try:
+                    pendente = conn.execute(painel_resumo.SQL_PRECISA_RECONCILIAR).fetchone()[0]
+                finally:
+                    conn.close()
+            else:
+                with self.engine.connect() as connection:
+                    pendente = connection.execute(sqlalchemy.text(painel_resumo.SQL_PRECISA_RECONCILIAR)).scalar()
+            if pendente:
+                self.reconcile_dashboard_summary()
+        except Exception as e:
+            print(f"⚠️ Erro ao preparar contadores do dashboard: {e}")
+
+    def recalculate_statistics(self):
+        """Recalcula os contadores do dashboard (menu Ferramentas)"""
+        try:
+            self.reconcile_dashboard_summary()
+            self.update_dashboard_stats()
+            messagebox.showinfo("Sucesso", "Estatísticas recalculadas!")
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao recalcular estatísticas: {e}")
+
     # ==================== FUNÇÕES DE TAREFAS ====================
 
     def new_task(self):
@@ -2124,12 +2343,14 @@ Funcionalidades Disponíveis:
                     # INSERT ATUALIZADO PARA NOVOS CAMPOS
                     cursor.execute("""
                         INSERT INTO painel_tarefas (titulo, descricao, prioridade, arquivo_BAT, tipo_execucao,
-                                                   cd_source_path, cd_destination_node, cd_destination_path, cd_process_name) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                                   cd_source_path, cd_destination_node, cd_destination_path, cd_process_name,
+                                                   timeout_minutos) 
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """, (dialog.result['titulo'], dialog.result['descricao'], 
                          dialog.result['prioridade'], dialog.result['arquivo_BAT'], dialog.result['tipo_execucao'],
                          dialog.result['cd_source_path'], dialog.result['cd_destination_node'],
-                         dialog.result['cd_destination_path'], dialog.result['cd_process_name']))
+                         dialog.result['cd_destination_path'], dialog.result['cd_process_name'],
+                         dialog.result['timeout_minutos']))
                     
                     conn.commit()
                     conn.close()
@@ -2146,7 +2367,8 @@ Funcionalidades Disponíveis:
                             cd_source_path=dialog.result['cd_source_path'], # Novo campo
                             cd_destination_node=dialog.result['cd_destination_node'], # Novo campo
                             cd_destination_path=dialog.result['cd_destination_path'], # Novo campo
-                            cd_process_name=dialog.result['cd_process_name'] # Novo campo
+                            cd_process_name=dialog.result['cd_process_name'], # Novo campo
+                            timeout_minutos=dialog.result['timeout_minutos']
                         )
                         
                         session.add(nova_tarefa)
@@ -2200,6 +2422,7 @@ Funcionalidades Disponíveis:
                             self.cd_destination_node = row_data[11] if len(row_data) > 11 else None # Nova coluna
                             self.cd_destination_path = row_data[12] if len(row_data) > 12 else None # Nova coluna
                             self.cd_process_name = row_data[13] if len(row_data) > 13 else None # Nova coluna
+                            self.timeout_minutos = row_data[14] if len(row_data) > 14 else None
 
                     task_data = MockTask(row)
                 else:
@@ -2226,12 +2449,14 @@ Funcionalidades Disponíveis:
                     cursor.execute("""
                         UPDATE painel_tarefas 
                         SET titulo = ?, descricao = ?, prioridade = ?, arquivo_BAT = ?, tipo_execucao = ?,
-                            cd_source_path = ?, cd_destination_node = ?, cd_destination_path = ?, cd_process_name = ?
+                            cd_source_path = ?, cd_destination_node = ?, cd_destination_path = ?, cd_process_name = ?,
+                            timeout_minutos = ?
                         WHERE id = ?
                     """, (dialog.result['titulo'], dialog.result['descricao'], 
                          dialog.result['prioridade'], dialog.result['arquivo_BAT'], dialog.result['tipo_execucao'],
                          dialog.result['cd_source_path'], dialog.result['cd_destination_node'],
-                         dialog.result['cd_destination_path'], dialog.result['cd_process_name'], task_id))
+                         dialog.result['cd_destination_path'], dialog.result['cd_process_name'],
+                         dialog.result['timeout_minutos'], task_id))
                     conn.commit()
                     conn.close()
                 else:
@@ -2248,6 +2473,7 @@ Funcionalidades Disponíveis:
                             tarefa.cd_destination_node = dialog.result['cd_destination_node'] # Novo campo
                             tarefa.cd_destination_path = dialog.result['cd_destination_path'] # Novo campo
                             tarefa.cd_process_name = dialog.result['cd_process_name'] # Novo campo
+                            tarefa.timeout_minutos = dialog.result['timeout_minutos']
                             session.commit()
                     finally:
                         session.close()
@@ -2267,9 +2493,81 @@ Funcionalidades Disponíveis:
         
         item = self.tasks_tree.item(selection[0])
         task_id = item['values'][0]
-        # task_title e outros detalhes serão buscados no execute_task_by_id
 
-        self.execute_task_by_id(task_id, executado_por_agendador=False)
+        try:
+            detalhes = self.get_task_details(task_id)
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao carregar tarefa: {e}")
+            return
+        if not messagebox.askyesno("Confirmar Execução", self.confirm_message(detalhes)):
+            return
+
+        # Não sobrepor a uma execução agendada (ou manual) da mesma tarefa nem exceder os pools de recursos
+        pool = self.agendador.pool if getattr(self, 'agendador', None) else None
+        recursos = self.get_task_resources(task_id) if pool else []
+        with self.lock_execucoes_manuais:
+            if task_id in self.execucoes_manuais or (pool and not pool.tentar_reservar(task_id, recursos)):
+                messagebox.showwarning("Aviso", "Esta tarefa já está em execução ou os recursos que ela usa "
+                                       f"({', '.join(recursos)}) estão no limite. Aguarde o término.")
+                return
+            self.execucoes_manuais.add(task_id)
+
+        # A execução roda fora da thread do Tk (a janela continua respondendo e o
+        # "Acompanhar Execução" funciona); a reserva é liberada quando ela termina
+        def executar():
+            try:
+                self.execute_task_by_id(task_id, executado_por_agendador=False)
+            except Exception as e:
+                print(f"Erro na execução manual da tarefa {task_id}: {e}")
+                traceback.print_exc()
+            finally:
+                with self.lock_execucoes_manuais:
+                    self.execucoes_manuais.discard(task_id)
+                if pool:
+                    pool.liberar(task_id, recursos)
+
+        threading.Thread(target=executar, name=f"tarefa-manual-{task_id}", daemon=True).start()
+        print(f"▶️ Execução manual da tarefa {task_id} iniciada: {detalhes['titulo']}")
+
+    def get_task_details(self, task_id):
+        """Dados de execução da tarefa; levanta exceção se ela não existir"""
+        campos = ('titulo', 'arquivo_BAT', 'tipo_execucao', 'cd_source_path', 'cd_destination_node',
+                  'cd_destination_path', 'cd_process_name', 'timeout_minutos')
+        if self.using_sqlite and not SQLSERVER_AVAILABLE:
+            import sqlite3
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT {', '.join(campos)} FROM painel_tarefas WHERE id = ?", (task_id,))
+                result = cursor.fetchone()
+            finally:
+                conn.close()
+            if not result:
+                raise Exception("Tarefa não encontrada.")
+            detalhes = dict(zip(campos, result))
+        else: # SQL Server com SQLAlchemy
+            session = self.get_db_session()
+            try:
+                tarefa = session.query(Tarefa).filter(Tarefa.id == task_id).first()
+                if not tarefa:
+                    raise Exception("Tarefa não encontrada.")
+                detalhes = {campo: getattr(tarefa, campo, None) for campo in campos}
+            finally:
+                session.close()
+        detalhes['tipo_execucao'] = detalhes['tipo_execucao'] or "BAT" # Compatibilidade
+        return detalhes
+
+    def confirm_message(self, detalhes):
+        """Texto da confirmação de uma execução manual"""
+        task_title = detalhes['titulo']
+        tipo_execucao = detalhes['tipo_execucao']
+        if tipo_execucao == 'BAT':
+            return f"Executar a tarefa '{task_title}'?\n\nArquivo: {os.path.basename(detalhes['arquivo_BAT'] or '')}"
+        if tipo_execucao == 'ConnectDirect':
+            return (f"Iniciar transferência Connect:Direct para '{task_title}'?\n\n"
+                    f"Origem: {detalhes['cd_source_path']}\n"
+                    f"Destino: {detalhes['cd_destination_node']}:{detalhes['cd_destination_path']}")
+        return f"Executar a tarefa '{task_title}' (Tipo: {tipo_execucao})?"
 
     def execute_task_by_id(self, task_id, executado_por_agendador=True):
         """Executa uma tarefa pelo ID"""
@@ -2281,71 +2579,45 @@ Funcionalidades Disponíveis:
         task_title = "N/A"
         
         try:
-            # Buscar dados da tarefa com os novos campos
-            if self.using_sqlite and not SQLSERVER_AVAILABLE:
-                import sqlite3
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("SELECT titulo, arquivo_BAT, tipo_execucao, cd_source_path, cd_destination_node, cd_destination_path, cd_process_name FROM painel_tarefas WHERE id = ?", (task_id,))
-                result = cursor.fetchone()
-                conn.close()
-                
-                if not result:
-                    raise Exception("Tarefa não encontrada.")
-                
-                task_title = result[0]
-                BAT_file = result[1]
-                tipo_execucao = result[2] if len(result) > 2 else "BAT" # Compatibilidade
-                cd_source_path = result[3] if len(result) > 3 else None
-                cd_destination_node = result[4] if len(result) > 4 else None
-                cd_destination_path = result[5] if len(result) > 5 else None
-                cd_process_name = result[6] if len(result) > 6 else None
-                
-            else: # SQL Server com SQLAlchemy
-                session = self.get_db_session()
-                try:
-                    tarefa = session.query(Tarefa).filter(Tarefa.id == task_id).first()
-                    if not tarefa:
-                        raise Exception("Tarefa não encontrada.")
-                    
-                    task_title = tarefa.titulo
-                    BAT_file = tarefa.arquivo_BAT
-                    tipo_execucao = getattr(tarefa, 'tipo_execucao', "BAT") # Usa 'BAT' como default se a coluna não existir
-                    cd_source_path = getattr(tarefa, 'cd_source_path', None)
-                    cd_destination_node = getattr(tarefa, 'cd_destination_node', None)
-                    cd_destination_path = getattr(tarefa, 'cd_destination_path', None)
-                    cd_process_name = getattr(tarefa, 'cd_process_name', None)
-                finally:
-                    session.close()
-            
-            # Confirmar execução se manual (apenas a mensagem muda)
-            if not executado_por_agendador:
-                confirm_msg = ""
-                if tipo_execucao == 'BAT':
-                    confirm_msg = f"Executar a tarefa '{task_title}'?\n\nArquivo: {os.path.basename(BAT_file)}"
-                elif tipo_execucao == 'ConnectDirect':
-                    confirm_msg = f"Iniciar transferência Connect:Direct para '{task_title}'?\n\nOrigem: {cd_source_path}\nDestino: {cd_destination_node}:{cd_destination_path}"
-                else:
-                    confirm_msg = f"Executar a tarefa '{task_title}' (Tipo: {tipo_execucao})?"
-
-                if not messagebox.askyesno("Confirmar Execução", confirm_msg):
-                    return False
+            # Buscar dados da tarefa (a confirmação das execuções manuais já foi feita em execute_task)
+            detalhes = self.get_task_details(task_id)
+            task_title = detalhes['titulo']
+            BAT_file = detalhes['arquivo_BAT']
+            tipo_execucao = detalhes['tipo_execucao']
+            cd_source_path = detalhes['cd_source_path']
+            cd_destination_node = detalhes['cd_destination_node']
+            cd_destination_path = detalhes['cd_destination_path']
+            cd_process_name = detalhes['cd_process_name']
+            timeout_minutos = detalhes['timeout_minutos']
             
             # --- Lógica de Execução baseada no tipo ---
             if tipo_execucao == 'BAT':
                 if not BAT_file or not os.path.exists(BAT_file):
                     raise FileNotFoundError(f"Arquivo BAT não existe ou não foi informado: {BAT_file}")
 
-                result_subprocess = subprocess.run(
-                    [BAT_file], 
-                    capture_output=True, 
-                    text=True, 
-                    timeout=300,  # 5 minutos de timeout
-                    cwd=os.path.dirname(BAT_file)
+                # Saída lida em blocos durante a execução: memória limitada, log completo em disco
+                # e acompanhamento ao vivo pelo botão "Acompanhar Execução"
+                execucao = ExecucaoProcesso(
+                    [BAT_file],
+                    cwd=os.path.dirname(BAT_file),
+                    timeout_minutos=timeout_minutos,
+                    arquivo_log=caminho_log(task_id, start_datetime)
                 )
-                status = "sucesso" if result_subprocess.returncode == 0 else "erro"
-                codigo_retorno = result_subprocess.returncode
-                log_output = f"STDOUT:\n{result_subprocess.stdout}\n\nSTDERR:\n{result_subprocess.stderr}"
+                self.execucoes_ativas[task_id] = execucao
+                try:
+                    execucao.iniciar()
+                    codigo_retorno = execucao.aguardar()
+                    # Íntegra do arquivo (não só o que coube no buffer): é ela que fica no banco,
+                    # já que o arquivo em disco é apagado pela retenção de logs_execucao
+                    log_output = execucao.log_completo()
+                finally:
+                    self.execucoes_ativas.pop(task_id, None)
+                    limpar_logs_tarefa(os.path.dirname(execucao.arquivo_log))
+                if execucao.expirou:
+                    status = "timeout"
+                    codigo_retorno = -1
+                else:
+                    status = "sucesso" if codigo_retorno == 0 else "erro"
 
             elif tipo_execucao == 'ConnectDirect':
                 if not all([cd_source_path, cd_destination_node, cd_destination_path]):
@@ -2405,10 +2677,6 @@ Funcionalidades Disponíveis:
         except ValueError as e:
             log_output = str(e)
             status = "erro"
-        except subprocess.TimeoutExpired as e:
-            log_output = f"A execução da tarefa excedeu o tempo limite de 5 minutos. STDOUT: {e.stdout}, STDERR: {e.stderr}"
-            status = "timeout"
-            codigo_retorno = -1
         except Exception as e:
             log_output = f"Erro inesperado durante a execução: {str(e)}"
             status = "erro"
@@ -2419,15 +2687,27 @@ Funcionalidades Disponíveis:
 
         duration = time.time() - start_time
 
+        # Logs longos: trecho na linha da execução, íntegra comprimida e deduplicada à parte
+        log_resumo, log_armazenado = preparar_log(log_output)
+        log_hash = log_armazenado['hash'] if log_armazenado else None
+
         # Registrar execução no banco
         if self.using_sqlite and not SQLSERVER_AVAILABLE:
+            import sqlite3
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
+            if log_armazenado:
+                cursor.execute("""
+                    INSERT OR IGNORE INTO painel_logs_execucao (hash, compressao, tamanho_original, conteudo)
+                    VALUES (:hash, :compressao, :tamanho_original, :conteudo)
+                """, log_armazenado)
             cursor.execute("""
-                INSERT INTO painel_execucoes (tarefa_id, status, codigo_retorno, duracao_segundos, log_output, executado_por_agendador)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (task_id, status, codigo_retorno, duration, log_output, executado_por_agendador))
+                INSERT INTO painel_execucoes (tarefa_id, data_execucao, status, codigo_retorno, duracao_segundos, log_output, log_hash, executado_por_agendador)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (task_id, start_datetime.isoformat(' '), status, codigo_retorno, duration, log_resumo, log_hash,
+                  executado_por_agendador))
+            self.record_execution_summary(cursor.execute, task_id, status, start_datetime, duration)
             
             cursor.execute("""
                 UPDATE painel_tarefas 
@@ -2443,10 +2723,12 @@ Funcionalidades Disponíveis:
                 # Registrar execução
                 nova_execucao = Execucao(
                     tarefa_id=task_id,
+                    data_execucao=start_datetime,
                     status=status,
                     codigo_retorno=codigo_retorno,
                     duracao_segundos=duration,
-                    log_output=log_output,
+                    log_output=log_resumo,
+                    log_hash=log_hash,
                     executado_por_agendador=executado_por_agendador
                 )
                 session.add(nova_execucao)
@@ -2457,6 +2739,14 @@ Funcionalidades Disponíveis:
                     tarefa_obj.data_ultima_execucao = start_datetime
                     tarefa_obj.total_execucoes = (tarefa_obj.total_execucoes or 0) + 1
                 
+                self.record_execution_summary(
+                    lambda sql, parametros: session.execute(sqlalchemy.text(sql), parametros),
+                    task_id, status, start_datetime, duration)
+
+                # Log completo na mesma transação da execução (sem linha apontando para um log
+                # que não foi gravado, nem log órfão se o registro da execução falhar)
+                if log_armazenado:
+                    self.store_execution_log(log_armazenado, session=session)
                 session.commit()
             finally:
                 session.close()
@@ -2467,28 +2757,86 @@ Funcionalidades Disponíveis:
                             f"Duração: {duration:.2f} segundos", task_id)
             
             if not executado_por_agendador:
-                messagebox.showinfo("Execução Concluída", 
-                                    f"Tarefa '{task_title}' executada com sucesso!\n\n"
-                                    f"Duração: {duration:.2f} segundos\n"
-                                    f"Código de retorno: {codigo_retorno}")
+                mensagem = (f"Tarefa '{task_title}' executada com sucesso!\n\n"
+                            f"Duração: {duration:.2f} segundos\n"
+                            f"Código de retorno: {codigo_retorno}")
+                self.root.after(0, lambda: messagebox.showinfo("Execução Concluída", mensagem))
         else:
             self.create_alert(status, f"Falha na execução: {task_title}", 
                             f"Código: {codigo_retorno}\nErro: {log_output[:200]}...", task_id)
             
             if not executado_por_agendador:
-                messagebox.showerror("Erro na Execução", 
-                                    f"Tarefa '{task_title}' falhou!\n\n"
-                                    f"Código de retorno: {codigo_retorno}\n"
-                                    f"Duração: {duration:.2f} segundos\n\n"
-                                    f"Erro: {log_output[:200]}...")
+                mensagem = (f"Tarefa '{task_title}' falhou!\n\n"
+                            f"Código de retorno: {codigo_retorno}\n"
+                            f"Duração: {duration:.2f} segundos\n\n"
+                            f"Erro: {log_output[:200]}...")
+                self.root.after(0, lambda: messagebox.showerror("Erro na Execução", mensagem))
         
-        # Atualizar interface
+        # Atualizar interface (execuções manuais rodam em thread própria: a UI só na thread do Tk)
         if not executado_por_agendador:
-            self.refresh_tasks()
-            self.update_dashboard_stats()
+            self.root.after(0, self.refresh_tasks)
+            self.root.after(0, self.update_dashboard_stats)
         
         return status == "sucesso"
 
+    def store_execution_log(self, registro, session):
+        """
+        Inclui o log completo comprimido na transação da sessão, se ainda não
+        houver um com o mesmo conteúdo. O commit fica com quem chamou.
+        """
+        try:
+            # Savepoint: se outra execução gravou o mesmo log ao mesmo tempo, só esta
+            # inclusão é desfeita e a linha já gravada serve
+            with session.begin_nested():
+                if session.get(LogExecucao, registro['hash']) is None:
+                    session.add(LogExecucao(**registro))
+        except sqlalchemy.exc.IntegrityError:
+            pass
+
+    def load_execution_log(self, execution_id):
+        """Log completo de uma execução, lido (e descomprimido) só quando alguém abre"""
+        if self.using_sqlite and not SQLSERVER_AVAILABLE:
+            import sqlite3
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT e.log_output, l.compressao, l.conteudo
+                    FROM painel_execucoes e
+                    LEFT JOIN painel_logs_execucao l ON l.hash = e.log_hash
+                    WHERE e.id = ?
+                """, (execution_id,))
+                row = cursor.fetchone()
+            finally:
+                conn.close()
+        else:
+            session = self.get_db_session()
+            try:
+                row = session.query(Execucao.log_output, LogExecucao.compressao, LogExecucao.conteudo).outerjoin(
+                    LogExecucao, LogExecucao.hash == Execucao.log_hash
+                ).filter(Execucao.id == execution_id).first()
+            finally:
+                session.close()
+        if not row:
+            return None
+        log_output, compressao, conteudo = row
+        if conteudo is None:
+            return log_output
+        texto = descomprimir(compressao, conteudo)
+        # Execuções antigas traziam na linha o caminho do arquivo de log da execução BAT
+        if log_output and log_output.startswith("Log completo: "):
+            texto = log_output.split("\n\n", 1)[0] + "\n\n" + texto
+        return texto
+
+    def purge_orphan_logs(self, cursor=None, session=None):
+        """Remove logs comprimidos que nenhuma execução referencia mais"""
+        sql = ("DELETE FROM painel_logs_execucao WHERE hash NOT IN "
+               "(SELECT log_hash FROM painel_execucoes WHERE log_hash IS NOT NULL)")
+        if cursor is not None:
+            cursor.execute(sql)
+        else:
+            session.execute(sqlalchemy.text(sql))
+
     def delete_task(self):
         """Exclui a tarefa selecionada"""
         selection = self.tasks_tree.selection()
@@ -2516,6 +2864,7 @@ Funcionalidades Disponíveis:
                     
                     # Excluir tarefa
                     cursor.execute("DELETE FROM painel_tarefas WHERE id = ?", (task_id,))
+                    self.purge_orphan_logs(cursor=cursor)
                     
                     conn.commit()
                     conn.close()
@@ -2526,21 +2875,139 @@ Funcionalidades Disponíveis:
                         tarefa = session.query(Tarefa).filter(Tarefa.id == task_id).first()
                         if tarefa:
                             session.delete(tarefa)
+                            session.flush()
+                            self.purge_orphan_logs(session=session)
                             session.commit()
                     finally:
                         session.close()
                 
+                self.reconcile_dashboard_summary()
                 self.refresh_tasks()
                 self.refresh_schedules()
                 self.refresh_alerts()
                 self.update_dashboard_stats()
+                self.notificar_agendador()
                 messagebox.showinfo("Sucesso", "Tarefa excluída com sucesso!")
                 
             except Exception as e:
                 messagebox.showerror("Erro", f"Erro ao excluir tarefa: {e}")
 
+    def show_live_output(self):
+        """Acompanha ao vivo a saída da execução em andamento da tarefa selecionada"""
+        selection = self.tasks_tree.selection()
+        if not selection:
+            messagebox.showwarning("Aviso", "Selecione uma tarefa para acompanhar.")
+            return
+        
+        item = self.tasks_tree.item(selection[0])
+        task_id = item['values'][0]
+        task_title = item['values'][1]
+        execucao = self.execucoes_ativas.get(task_id)
+        if not execucao:
+            messagebox.showinfo("Informação", f"A tarefa '{task_title}' não está em execução.")
+            return
+        
+        live_window = tk.Toplevel(self.root)
+        live_window.title(f"Execução em Andamento - {task_title}")
+        live_window.geometry("900x600")
+        live_window.transient(self.root)
+        live_window.configure(bg='#1e3a3a')
+        
+        main_frame = ttk.Frame(live_window, padding="10")
+        main_frame.pack(fill='both', expand=True)
+        
+        status_label = ttk.Label(main_frame, text="Executando...", font=('Segoe UI', 10, 'bold'))
+        status_label.pack(anchor='w', pady=(0, 5))
+        ttk.Label(main_frame, text=f"Log completo: {execucao.arquivo_log}").pack(anchor='w', pady=(0, 5))
+        
+        text_widget = tk.Text(main_frame, wrap='none', state='disabled',
+                             bg='#2d5555', fg='#e8f4f4', insertbackground='#e8f4f4')
+        scrollbar = ttk.Scrollbar(main_frame, orient='vertical', command=text_widget.yview)
+        text_widget.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y')
+        text_widget.pack(fill='both', expand=True)
+        
+        max_linhas = 5000  # a janela mantém só o final; a saída completa está no arquivo de log
+        posicao = [0]
+        
+        def atualizar():
+            if not live_window.winfo_exists():
+                return
+            texto, posicao[0], descartados = execucao.ler_desde(posicao[0])
+            if descartados:
+                texto = f"[... {descartados} bytes omitidos ...]\n" + texto
+            if texto:
+                no_final = text_widget.yview()[1] >= 0.999
+                text_widget.config(state='normal')
+                text_widget.insert('end', texto)
+                linhas = int(text_widget.index('end-1c').split('.')[0])
+                if linhas > max_linhas:
+                    text_widget.delete('1.0', f"{linhas - max_linhas}.0")
+                text_widget.config(state='disabled')
+                if no_final:
+                    text_widget.see('end')
+            if execucao.finalizado.is_set():
+                situacao = "tempo limite excedido" if execucao.expirou else f"código de retorno {execucao.codigo_retorno}"
+                status_label.config(text=f"Execução finalizada ({situacao}) em {execucao.duracao:.1f}s")
+            else:
+                status_label.config(text=f"Executando... {execucao.duracao:.0f}s")
+                live_window.after(500, atualizar)
+        
+        atualizar()
+        
+        ttk.Button(main_frame, text="Fechar", command=live_window.destroy).pack(pady=10)
+
+    HISTORICO_TAMANHO_PAGINA = 100
+
+    def fetch_execution_page(self, task_id, apos=None, limite=None):
+        """
+        Uma página do histórico, da execução mais recente para a mais antiga,
+        só com as colunas exibidas. Paginação por chave (keyset): `apos` é o
+        (data_execucao, id) da última linha da página anterior, então cada
+        página custa o mesmo, por mais antiga que seja.
+        """
+        limite = limite or self.HISTORICO_TAMANHO_PAGINA
+        if self.using_sqlite and not SQLSERVER_AVAILABLE:
+            import sqlite3
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cursor = conn.cursor()
+                filtro_chave = ""
+                parametros = [task_id]
+                if apos:
+                    filtro_chave = "AND (data_execucao < ? OR (data_execucao = ? AND id < ?))"
+                    parametros += [apos[0], apos[0], apos[1]]
+                cursor.execute(f"""
+                    SELECT id, data_execucao, status, duracao_segundos, codigo_retorno, executado_por_agendador
+                    FROM painel_execucoes 
+                    WHERE tarefa_id = ? {filtro_chave}
+                    ORDER BY data_execucao DESC, id DESC
+                    LIMIT ?
+                """, parametros + [limite])
+                return cursor.fetchall()
+            finally:
+                conn.close()
+        else:
+            from sqlalchemy import or_, and_
+            session = self.get_db_session()
+            try:
+                query = session.query(
+                    Execucao.id, Execucao.data_execucao, Execucao.status, Execucao.duracao_segundos,
+                    Execucao.codigo_retorno, Execucao.executado_por_agendador
+                ).filter(Execucao.tarefa_id == task_id)
+                if apos:
+                    query = query.filter(or_(
+                        Execucao.data_execucao < apos[0],
+                        and_(Execucao.data_execucao == apos[0], Execucao.id < apos[1])
+                    ))
+                return [tuple(row) for row in query.order_by(
+                    Execucao.data_execucao.desc(), Execucao.id.desc()
+                ).limit(limite).all()]
+            finally:
+                session.close()
+
     def show_execution_history(self):
-        """Mostra histórico de execuções"""
+        """Mostra histórico de execuções (paginado conforme a rolagem)"""
         selection = self.tasks_tree.selection()
         if not selection:
             messagebox.showwarning("Aviso", "Selecione uma tarefa para ver o histórico.")
@@ -2574,64 +3041,46 @@ Funcionalidades Disponíveis:
         
         for col in columns:
             history_tree.heading(col, text=col)
-            self.tasks_tree.column(col, width=column_widths.get(col, 150)) # Mantido tasks_tree por engano no original, corrigido para history_tree
-            history_tree.column(col, width=column_widths.get(col, 100)) # Corrigido
+            history_tree.column(col, width=column_widths.get(col, 100))
         
-        # Scrollbars
-        v_scroll = ttk.Scrollbar(main_frame, orient='vertical', command=history_tree.yview)
-        h_scroll = ttk.Scrollbar(main_frame, orient='horizontal', command=history_tree.xview)
-        history_tree.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
+        status_label = ttk.Label(main_frame, text="", font=('Segoe UI', 9))
+        status_label.pack(side='bottom', pady=(5, 0))
         
-        # Layout
-        history_tree.pack(side='left', fill='both', expand=True)
-        v_scroll.pack(side='right', fill='y')
-        h_scroll.pack(side='bottom', fill='x')
+        # Páginas carregadas sob demanda: a próxima vem quando a rolagem chega perto do fim
+        pagina = {'ultima_chave': None, 'tem_mais': True, 'carregadas': 0, 'carregando': False}
         
-        # Carregar dados
-        try:
-            if self.using_sqlite and not SQLSERVER_AVAILABLE:
-                import sqlite3
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT data_execucao, status, duracao_segundos, codigo_retorno, 
-                           log_output, executado_por_agendador
-                    FROM painel_execucoes 
-                    WHERE tarefa_id = ? 
-                    ORDER BY data_execucao DESC
-                """, (task_id,))
-                executions = cursor.fetchall()
-                conn.close()
-            else:
-                session = self.get_db_session()
-                try:
-                    executions = session.query(Execucao).filter(
-                        Execucao.tarefa_id == task_id
-                    ).order_by(Execucao.data_execucao.desc()).all()
-                    
-                    # Converter para tuplas para compatibilidade
-                    executions = [(e.data_execucao, e.status, e.duracao_segundos, 
-                                 e.codigo_retorno, e.log_output, e.executado_por_agendador) 
-                                 for e in executions]
-                finally:
-                    session.close()
+        def carregar_pagina():
+            if not pagina['tem_mais'] or pagina['carregando'] or not history_window.winfo_exists():
+                return
+            pagina['carregando'] = True
+            try:
+                executions = self.fetch_execution_page(task_id, pagina['ultima_chave'])
+            except Exception as e:
+                pagina['tem_mais'] = False
+                messagebox.showerror("Erro", f"Erro ao carregar histórico: {e}", parent=history_window)
+                return
+            finally:
+                pagina['carregando'] = False
+            pagina['tem_mais'] = len(executions) == self.HISTORICO_TAMANHO_PAGINA
+            if executions:
+                pagina['ultima_chave'] = (executions[-1][1], executions[-1][0])
+            pagina['carregadas'] += len(executions)
             
-            for exec_data in executions:
+            for exec_id, data_execucao, status, duracao_segundos, codigo_retorno, por_agendador in executions:
                 # Formatar data
                 try:
-                    if isinstance(exec_data[0], str):
-                        dt = datetime.datetime.fromisoformat(exec_data[0])
+                    if isinstance(data_execucao, str):
+                        dt = datetime.datetime.fromisoformat(data_execucao)
                     else:
-                        dt = exec_data[0]
+                        dt = data_execucao
                     data_formatada = dt.strftime("%d/%m/%Y %H:%M:%S")
                 except:
-                    data_formatada = str(exec_data[0])
+                    data_formatada = str(data_execucao)
                 
                 # Formatar duração
-                duracao = f"{exec_data[2]:.2f}s" if exec_data[2] else "N/A"
+                duracao = f"{duracao_segundos:.2f}s" if duracao_segundos else "N/A"
                 
                 # Status com emoji
-                status = exec_data[1]
                 if status == "sucesso":
                     status_display = "✅ Sucesso"
                 elif status == "erro":
@@ -2642,22 +3091,75 @@ Funcionalidades Disponíveis:
                     status_display = status
                 
                 # Origem
-                origem = "🤖 Agendador" if exec_data[5] else "👤 Manual"
+                origem = "🤖 Agendador" if por_agendador else "👤 Manual"
                 
-                history_tree.insert('', 'end', values=(
-                    data_formatada, status_display, duracao, exec_data[3], origem
+                history_tree.insert('', 'end', iid=str(exec_id), values=(
+                    data_formatada, status_display, duracao, codigo_retorno, origem
                 ))
             
-            if not executions:
-                ttk.Label(main_frame, text="Nenhuma execução encontrada para esta tarefa.", 
-                         font=('Segoe UI', 10)).pack(pady=20)
-            
-        except Exception as e:
-            messagebox.showerror("Erro", f"Erro ao carregar histórico: {e}")
+            if not pagina['carregadas']:
+                status_label.config(text="Nenhuma execução encontrada para esta tarefa.")
+            else:
+                mais = " · role para carregar mais" if pagina['tem_mais'] else ""
+                status_label.config(text=f"{pagina['carregadas']} execuções carregadas{mais} · "
+                                         "clique duas vezes em uma execução para ver o log")
+        
+        def ao_rolar(inicio, fim):
+            v_scroll.set(inicio, fim)
+            if float(fim) >= 0.95 and pagina['tem_mais'] and not pagina['carregando']:
+                history_window.after_idle(carregar_pagina)
+        
+        # Scrollbars
+        v_scroll = ttk.Scrollbar(main_frame, orient='vertical', command=history_tree.yview)
+        h_scroll = ttk.Scrollbar(main_frame, orient='horizontal', command=history_tree.xview)
+        history_tree.configure(yscrollcommand=ao_rolar, xscrollcommand=h_scroll.set)
+        
+        # Layout
+        history_tree.pack(side='left', fill='both', expand=True)
+        v_scroll.pack(side='right', fill='y')
+        h_scroll.pack(side='bottom', fill='x')
+        
+        # Log completo só é lido ao abrir a execução
+        history_tree.bind('<Double-1>', lambda event: self.show_execution_log(
+            history_window, history_tree.focus(), task_title))
+        
+        carregar_pagina()
         
         # Botão fechar
         ttk.Button(main_frame, text="Fechar", command=history_window.destroy).pack(pady=10)
 
+    def show_execution_log(self, parent, execution_id, task_title):
+        """Abre o log completo de uma execução do histórico"""
+        if not execution_id:
+            return
+        try:
+            log_text = self.load_execution_log(int(execution_id))
+        except Exception as e:
+            messagebox.showerror("Erro", f"Erro ao carregar log: {e}", parent=parent)
+            return
+        
+        log_window = tk.Toplevel(parent)
+        log_window.title(f"Log da Execução - {task_title}")
+        log_window.geometry("900x600")
+        log_window.transient(parent)
+        log_window.configure(bg='#1e3a3a')
+        
+        main_frame = ttk.Frame(log_window, padding="10")
+        main_frame.pack(fill='both', expand=True)
+        
+        text_widget = tk.Text(main_frame, wrap='none', state='disabled',
+                             bg='#2d5555', fg='#e8f4f4', insertbackground='#e8f4f4')
+        scrollbar = ttk.Scrollbar(main_frame, orient='vertical', command=text_widget.yview)
+        text_widget.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side='right', fill='y')
+        text_widget.pack(fill='both', expand=True)
+        
+        text_widget.config(state='normal')
+        text_widget.insert(1.0, log_text or "Nenhum log registrado para esta execução.")
+        text_widget.config(state='disabled')
+        
+        ttk.Button(main_frame, text="Fechar", command=log_window.destroy).pack(pady=10)
+
     # ==================== FUNÇÕES DE AGENDAMENTO ====================
 
     def new_schedule(self):
@@ -2782,6 +3284,7 @@ Funcionalidades Disponíveis:
                     
                     self.refresh_schedules()
                     self.update_dashboard_stats()
+                    self.notificar_agendador()
                     messagebox.showinfo("Sucesso", "Agendamento criado com sucesso!")
                     
                 except Exception as e:
@@ -2967,6 +3470,7 @@ Funcionalidades Disponíveis:
                         session.close()
                 
                 self.refresh_schedules()
+                self.notificar_agendador()
                 messagebox.showinfo("Sucesso", "Agendamento atualizado com sucesso!")
                 
         except Exception as e:
@@ -3008,6 +3512,7 @@ Funcionalidades Disponíveis:
                 
                 self.refresh_schedules()
                 self.update_dashboard_stats()
+                self.notificar_agendador()
                 messagebox.showinfo("Sucesso", "Agendamento excluído com sucesso!")
                 
             except Exception as e:
@@ -3018,245 +3523,201 @@ Funcionalidades Disponíveis:
     def start_scheduler(self):
         """Inicia o sistema de agendamento"""
         self.scheduler_running = True
-        self.scheduler_thread = threading.Thread(target=self.scheduler_loop, daemon=True)
-        self.scheduler_thread.start()
+        if getattr(self, 'agendador', None) and self.agendador.pool.ativo:
+            # Reinício: mantém o pool (e as execuções em andamento) e só relê o heap
+            self.agendador.parar(parar_pool=False)
+        else:
+            self.agendador = AgendadorHeap(self.carregar_agendamentos_ativos, self.executar_agendamento)
+        self.agendador.iniciar()
         print("🕐 Sistema de agendamento iniciado")
 
-    def scheduler_loop(self):
-        """Loop principal do agendador"""
-        while self.scheduler_running:
+    def stop_scheduler(self, parar_pool=True):
+        """Para o sistema de agendamento (parar_pool=False mantém as execuções em andamento para um reinício)"""
+        self.scheduler_running = False
+        if getattr(self, 'agendador', None):
+            self.agendador.parar(parar_pool=parar_pool)
+
+    def notificar_agendador(self):
+        """Avisa o agendador que os agendamentos mudaram (relê o banco)"""
+        if getattr(self, 'agendador', None):
+            self.agendador.notificar_alteracao()
+
+    def carregar_agendamentos_ativos(self):
+        """Lista (id, proxima_execucao, tarefa_id, prioridade, recursos) dos agendamentos ativos para o agendador"""
+        if self.using_sqlite and not SQLSERVER_AVAILABLE:
+            import sqlite3
+            conn = sqlite3.connect(self.db_path)
             try:
-                self.check_scheduled_tasks()
-                time.sleep(60)  # Verificar a cada minuto
-            except Exception as e:
-                print(f"Erro no agendador: {e}")
-                time.sleep(60)
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT a.id, a.proxima_execucao, a.tarefa_id, t.prioridade,
+                           t.tipo_execucao, t.cd_destination_node
+                    FROM painel_agendamentos a
+                    JOIN painel_tarefas t ON a.tarefa_id = t.id
+                    WHERE a.ativo = 1 AND a.proxima_execucao IS NOT NULL
+                """)
+                rows = cursor.fetchall()
+            finally:
+                conn.close()
+            return [(schedule_id, datetime.datetime.fromisoformat(proxima), task_id, prioridade,
+                     recursos_da_tarefa(tipo_execucao, cd_node))
+                    for schedule_id, proxima, task_id, prioridade, tipo_execucao, cd_node in rows]
 
-    def check_scheduled_tasks(self):
-        """Verifica e executa tarefas agendadas"""
+        session = self.get_db_session()
         try:
-            now = datetime.datetime.now()
-            
-            if self.using_sqlite and not SQLSERVER_AVAILABLE:
-                import sqlite3
-                conn = sqlite3.connect(self.db_path)
+            rows = session.query(
+                Agendamento.id, Agendamento.proxima_execucao, Agendamento.tarefa_id, Tarefa.prioridade,
+                Tarefa.tipo_execucao, Tarefa.cd_destination_node
+            ).join(Tarefa).filter(
+                Agendamento.ativo == True,
+                Agendamento.proxima_execucao != None
+            ).all()
+            return [(schedule_id, proxima, task_id, prioridade, recursos_da_tarefa(tipo_execucao, cd_node))
+                    for schedule_id, proxima, task_id, prioridade, tipo_execucao, cd_node in rows]
+        finally:
+            session.close()
+
+    def get_task_resources(self, task_id):
+        """Recursos (local-cpu, cd-node:NOME) consumidos pela execução da tarefa"""
+        if self.using_sqlite and not SQLSERVER_AVAILABLE:
+            import sqlite3
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT tipo_execucao, cd_destination_node FROM painel_tarefas WHERE id = ?", (task_id,))
+                row = cursor.fetchone()
+            finally:
+                conn.close()
+        else:
+            session = self.get_db_session()
+            try:
+                row = session.query(Tarefa.tipo_execucao, Tarefa.cd_destination_node).filter(
+                    Tarefa.id == task_id).first()
+            finally:
+                session.close()
+        return recursos_da_tarefa(*row) if row else []
+
+    def get_schedule_data(self, schedule_id):
+        """Dados de um agendamento (com o título da tarefa) para execução"""
+        campos = ['tarefa_id', 'nome', 'tipo_agendamento', 'horario', 'dias_semana', 'dia_mes',
+                  'data_especifica', 'ativo', 'retry_count', 'max_retries', 'notificar_sucesso',
+                  'notificar_erro', 'titulo']
+        if self.using_sqlite and not SQLSERVER_AVAILABLE:
+            import sqlite3
+            conn = sqlite3.connect(self.db_path)
+            try:
                 cursor = conn.cursor()
-                
                 cursor.execute("""
-                    SELECT a.id, a.tarefa_id, a.nome, a.proxima_execucao, a.max_retries, 
-                           a.retry_count, a.notificar_sucesso, a.notificar_erro, t.titulo
+                    SELECT a.tarefa_id, a.nome, a.tipo_agendamento, a.horario, a.dias_semana, a.dia_mes,
+                           a.data_especifica, a.ativo, a.retry_count, a.max_retries, a.notificar_sucesso,
+                           a.notificar_erro, t.titulo
                     FROM painel_agendamentos a
                     JOIN painel_tarefas t ON a.tarefa_id = t.id
-                    WHERE a.ativo = 1 AND a.proxima_execucao <= ?
-                """, (now.isoformat(),))
-                
-                scheduled_tasks = cursor.fetchall()
+                    WHERE a.id = ?
+                """, (schedule_id,))
+                row = cursor.fetchone()
+            finally:
                 conn.close()
-                
-                for task in scheduled_tasks:
-                    schedule_id, task_id, schedule_name, _, max_retries, retry_count, notif_success, notif_error, task_title = task
-                    
-                    print(f"🕐 Executando agendamento: {schedule_name} ({task_title})")
-                    
-                    # Executar tarefa
-                    success = self.execute_task_by_id(task_id, executado_por_agendador=True) # task_title é buscado dentro da função
-                    
-                    if success:
-                        # Sucesso - calcular próxima execução
-                        conn = sqlite3.connect(self.db_path)
-                        cursor = conn.cursor()
-                        
-                        # Buscar dados do agendamento para recalcular
-                        cursor.execute("SELECT * FROM painel_agendamentos WHERE id = ?", (schedule_id,))
-                        schedule_row = cursor.fetchone()
-                        
-                        if schedule_row:
-                            schedule_data = {
-                                'tipo_agendamento': schedule_row[3],
-                                'horario': schedule_row[4],
-                                'dias_semana': schedule_row[5],
-                                'dia_mes': schedule_row[6],
-                                'data_especifica': datetime.datetime.fromisoformat(schedule_row[7]) if schedule_row[7] else None
-                            }
-                            
-                            next_exec = self.calculate_next_execution(schedule_data)
-                            
-                            # Atualizar agendamento
-                            cursor.execute("""
-                                UPDATE painel_agendamentos 
-                                SET proxima_execucao = ?, retry_count = 0
-                                WHERE id = ?
-                            """, (next_exec.isoformat() if next_exec else None, schedule_id))
-                            
-                            # Se for execução única, desativar
-                            if schedule_data['tipo_agendamento'] == 'unico':
-                                cursor.execute("UPDATE painel_agendamentos SET ativo = 0 WHERE id = ?", (schedule_id,))
-                        
-                        conn.commit()
-                        conn.close()
-                        
-                        # Notificar sucesso se configurado
-                        if notif_success:
-                                                self.send_notification("sucesso", f"Agendamento executado com sucesso: {schedule_name}",
-                                         f"Tarefa: {task_title}\nHorário: {now.strftime('%d/%m/%Y %H:%M')}",
-                                         tarefa_id=task_id, agendamento_id=schedule_id) # IDs adicionados aqui
-                    # NOVO: ALERTA POP-UP DE SUCESSO PARA AGENDAMENTO
-                        self.root.after(0, lambda: messagebox.showinfo("Agendamento Executado com Sucesso",
-                                        f"✅ Agendamento '{schedule_name}' para a tarefa '{task_title}' foi executado com sucesso!\n\n"
-                                        f"Verifique o histórico para mais detalhes."))
-                    
-                    else:
-                        # Falha - verificar retry
-                        if retry_count < max_retries:
-                            # Tentar novamente em 5 minutos
-                            retry_time = now + datetime.timedelta(minutes=5)
-                            
-                            conn = sqlite3.connect(self.db_path)
-                            cursor = conn.cursor()
-                            cursor.execute("""
-                                UPDATE painel_agendamentos 
-                                SET proxima_execucao = ?, retry_count = retry_count + 1
-                                WHERE id = ?
-                            """, (retry_time.isoformat(), schedule_id))
-                            conn.commit()
-                            conn.close()
-                            
-                            print(f"⚠️ Reagendando para retry em 5 minutos: {schedule_name}")
-                        else:
-                            # Esgotou tentativas - calcular próxima execução normal
-                            conn = sqlite3.connect(self.db_path)
-                            cursor = conn.cursor()
-                            
-                            cursor.execute("SELECT * FROM painel_agendamentos WHERE id = ?", (schedule_id,))
-                            schedule_row = cursor.fetchone()
-                            
-                            if schedule_row:
-                                schedule_data = {
-                                    'tipo_agendamento': schedule_row[3],
-                                    'horario': schedule_row[4],
-                                    'dias_semana': schedule_row[5],
-                                    'dia_mes': schedule_row[6],
-                                    'data_especifica': datetime.datetime.fromisoformat(schedule_row[7]) if schedule_row[7] else None
-                                }
-                                
-                                next_exec = self.calculate_next_execution(schedule_data)
-                                
-                                cursor.execute("""
-                                    UPDATE painel_agendamentos 
-                                    SET proxima_execucao = ?, retry_count = 0
-                                    WHERE id = ?
-                                """, (next_exec.isoformat() if next_exec else None, schedule_id))
-                                # Se for execução única, desativar
-                                if schedule_data['tipo_agendamento'] == 'unico':
-                                    cursor.execute("UPDATE painel_agendamentos SET ativo = 0 WHERE id = ?", (schedule_id,))
-                            
-                            conn.commit()
-                            conn.close()
-                            
-                        # Notificar falha se configurado
-                        self.send_notification("erro", f"Falha no agendamento: {schedule_name}",
-                                             f"Tarefa: {task_title}\nTentativas esgotadas: {max_retries}",
-                                             tarefa_id=task_id, agendamento_id=schedule_id) # IDs adicionados aqui
-                        # NOVO: ALERTA POP-UP DE FALHA PARA AGENDAMENTO
-                        self.root.after(0, lambda: messagebox.showerror("Falha no Agendamento",
-                                            f"❌ Agendamento '{schedule_name}' para a tarefa '{task_title}' falhou!\n\n"
-                                            f"Motivo: Esgotadas {max_retries} tentativas.\n"
-                                            f"Verifique o histórico e alertas para mais detalhes."))
-            
-            else:
-                # SQL Server com SQLAlchemy
-                session = self.get_db_session()
-                try:
-                    scheduled_tasks = session.query(Agendamento).join(Tarefa).filter(
-                        Agendamento.ativo == True,
-                        Agendamento.proxima_execucao <= now
-                    ).all()
-                    
-                    for agendamento in scheduled_tasks:
-                        print(f"🕐 Executando agendamento: {agendamento.nome} ({agendamento.tarefa.titulo})")
-                        
-                        # Executar tarefa
-                        success = self.execute_task_by_id(agendamento.tarefa_id, executado_por_agendador=True)
-                        
-                        if success:
-                            # Sucesso - calcular próxima execução
-                            schedule_data = {
-                                'tipo_agendamento': agendamento.tipo_agendamento,
-                                'horario': agendamento.horario,
-                                'dias_semana': agendamento.dias_semana,
-                                'dia_mes': agendamento.dia_mes,
-                                'data_especifica': agendamento.data_especifica
-                            }
-                            
-                            next_exec = self.calculate_next_execution(schedule_data)
-                            agendamento.proxima_execucao = next_exec
-                            agendamento.retry_count = 0
-                            
-                            # Se for execução única, desativar
-                            if agendamento.tipo_agendamento == 'unico':
-                                agendamento.ativo = False
-                            
-                            session.commit()
-                            
-                            # Notificar sucesso se configurado
-                        self.send_notification("sucesso", f"Agendamento executado com sucesso: {agendamento.nome}",
-                                             f"Tarefa: {agendamento.tarefa.titulo}\nHorário: {now.strftime('%d/%m/%Y %H:%M')}",
-                                             tarefa_id=agendamento.tarefa_id, agendamento_id=agendamento.id) # IDs adicionados aqui
-                        # NOVO: ALERTA POP-UP DE SUCESSO PARA AGENDAMENTO
-                        self.root.after(0, lambda: messagebox.showinfo("Agendamento Executado com Sucesso",
-                                            f"✅ Agendamento '{agendamento.nome}' para a tarefa '{agendamento.tarefa.titulo}' foi executado com sucesso!\n\n"
-                                            f"Verifique o histórico para mais detalhes."))
-                        
-                    else:
-                            # Falha - verificar retry
-                            if agendamento.retry_count < agendamento.max_retries:
-                                # Tentar novamente em 5 minutos
-                                retry_time = now + datetime.timedelta(minutes=5)
-                                agendamento.proxima_execucao = retry_time
-                                agendamento.retry_count += 1
-                                session.commit()
-                                
-                                print(f"⚠️ Reagendando para retry em 5 minutos: {agendamento.nome}")
-                            else:
-                                # Esgotou tentativas - calcular próxima execução normal
-                                schedule_data = {
-                                    'tipo_agendamento': agendamento.tipo_agendamento,
-                                    'horario': agendamento.horario,
-                                    'dias_semana': agendamento.dias_semana,
-                                    'dia_mes': agendamento.dia_mes,
-                                    'data_especifica': agendamento.data_especifica
-                                }
-                                
-                                next_exec = self.calculate_next_execution(schedule_data)
-                                agendamento.proxima_execucao = next_exec
-                                agendamento.retry_count = 0
-                                
-                                # Se for execução única, desativar
-                                if agendamento.tipo_agendamento == 'unico':
-                                    agendamento.ativo = False
-                                
-                                session.commit()
-                                
-                                # Notificar falha se configurado
-                            self.send_notification("erro", f"Falha no agendamento: {agendamento.nome}",
-                                                 f"Tarefa: {agendamento.tarefa.titulo}\nTentativas esgotadas: {agendamento.max_retries}",
-                                                 tarefa_id=agendamento.tarefa_id, agendamento_id=agendamento.id) # IDs adicionados aqui
-                            # NOVO: ALERTA POP-UP DE FALHA PARA AGENDAMENTO
-                            self.root.after(0, lambda: messagebox.showerror("Falha no Agendamento",
-                                                f"❌ Agendamento '{agendamento.nome}' para a tarefa '{agendamento.tarefa.titulo}' falhou!\n\n"
-                                                f"Motivo: Esgotadas {agendamento.max_retries} tentativas.\n"
-                                                f"Verifique o histórico e alertas para mais detalhes."))
-                
-                finally:
-                    session.close()
-            
-            # Atualizar interface se necessário
-            if scheduled_tasks:
-                self.root.after(0, self.refresh_schedules)
-                self.root.after(0, self.update_dashboard_stats)
-                
-        except Exception as e:
-            print(f"Erro ao verificar tarefas agendadas: {e}")
+            if not row:
+                return None
+            schedule_data = dict(zip(campos, row))
+            if schedule_data['data_especifica']:
+                schedule_data['data_especifica'] = datetime.datetime.fromisoformat(schedule_data['data_especifica'])
+        else:
+            session = self.get_db_session()
+            try:
+                agendamento = session.query(Agendamento).filter(Agendamento.id == schedule_id).first()
+                if not agendamento:
+                    return None
+                schedule_data = {campo: getattr(agendamento, campo) for campo in campos[:-1]}
+                schedule_data['titulo'] = agendamento.tarefa.titulo
+            finally:
+                session.close()
+
+        schedule_data['retry_count'] = schedule_data['retry_count'] or 0
+        schedule_data['max_retries'] = schedule_data['max_retries'] or 0
+        return schedule_data
+
+    def update_schedule_after_run(self, schedule_id, proxima_execucao, retry_count, ativo):
+        """Grava a próxima execução, o contador de retry e a situação do agendamento"""
+        if self.using_sqlite and not SQLSERVER_AVAILABLE:
+            import sqlite3
+            conn = sqlite3.connect(self.db_path)
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    UPDATE painel_agendamentos
+                    SET proxima_execucao = ?, retry_count = ?, ativo = ?
+                    WHERE id = ?
+                """, (proxima_execucao.isoformat() if proxima_execucao else None, retry_count, ativo, schedule_id))
+                conn.commit()
+            finally:
+                conn.close()
+        else:
+            session = self.get_db_session()
+            try:
+                agendamento = session.query(Agendamento).filter(Agendamento.id == schedule_id).first()
+                if agendamento:
+                    agendamento.proxima_execucao = proxima_execucao
+                    agendamento.retry_count = retry_count
+                    agendamento.ativo = ativo
+                    session.commit()
+            finally:
+                session.close()
+
+    def executar_agendamento(self, schedule_id):
+        """
+        Executa um agendamento vencido (chamado pelo agendador) e grava a
+        próxima execução: retry em 5 minutos enquanto houver tentativas, senão
+        o próximo horário normal. Retorna a nova proxima_execucao, ou None se
+        o agendamento não tem mais execuções.
+        """
+        now = datetime.datetime.now()
+        schedule_data = self.get_schedule_data(schedule_id)
+        if not schedule_data or not schedule_data['ativo']:
+            return None
+
+        schedule_name = schedule_data['nome']
+        task_title = schedule_data['titulo']
+        print(f"🕐 Executando agendamento: {schedule_name} ({task_title})")
+
+        success = self.execute_task_by_id(schedule_data['tarefa_id'], executado_por_agendador=True)
+
+        retry = not success and schedule_data['retry_count'] < schedule_data['max_retries']
+        if retry:
+            next_exec = now + datetime.timedelta(minutes=5)
+            retry_count = schedule_data['retry_count'] + 1
+            ativo = True
+            print(f"⚠️ Reagendando para retry em 5 minutos: {schedule_name}")
+        else:
+            next_exec = self.calculate_next_execution(schedule_data)
+            retry_count = 0
+            # Se for execução única, desativar
+            ativo = schedule_data['tipo_agendamento'] != 'unico'
+        self.update_schedule_after_run(schedule_id, next_exec, retry_count, ativo)
+
+        if success:
+            if schedule_data['notificar_sucesso']:
+                self.send_notification("sucesso", f"Agendamento executado com sucesso: {schedule_name}",
+                                       f"Tarefa: {task_title}\nHorário: {now.strftime('%d/%m/%Y %H:%M')}")
+            mensagem = (f"✅ Agendamento '{schedule_name}' para a tarefa '{task_title}' foi executado com sucesso!\n\n"
+                        f"Verifique o histórico para mais detalhes.")
+            self.root.after(0, lambda: messagebox.showinfo("Agendamento Executado com Sucesso", mensagem))
+        elif not retry:
+            max_retries = schedule_data['max_retries']
+            if schedule_data['notificar_erro']:
+                self.send_notification("erro", f"Falha no agendamento: {schedule_name}",
+                                       f"Tarefa: {task_title}\nTentativas esgotadas: {max_retries}")
+            mensagem = (f"❌ Agendamento '{schedule_name}' para a tarefa '{task_title}' falhou!\n\n"
+                        f"Motivo: Esgotadas {max_retries} tentativas.\n"
+                        f"Verifique o histórico e alertas para mais detalhes.")
+            self.root.after(0, lambda: messagebox.showerror("Falha no Agendamento", mensagem))
+
+        # Atualizar interface
+        self.root.after(0, self.refresh_schedules)
+        self.root.after(0, self.update_dashboard_stats)
+
+        return next_exec if ativo else None
 
     # ==================== SISTEMA DE ALERTAS ====================
 
@@ -3274,6 +3735,7 @@ Funcionalidades Disponíveis:
                 """, (tipo, titulo, mensagem, tarefa_id, agendamento_id))
                 
                 alert_id = cursor.lastrowid
+                self.apply_summary_increments(cursor.execute, {painel_resumo.CHAVE_ALERTAS_PENDENTES: 1})
                 conn.commit()
                 conn.close()
             else:
@@ -3288,6 +3750,9 @@ Funcionalidades Disponíveis:
                     )
                     
                     session.add(novo_alerta)
+                    self.apply_summary_increments(
+                        lambda sql, parametros: session.execute(sqlalchemy.text(sql), parametros),
+                        {painel_resumo.CHAVE_ALERTAS_PENDENTES: 1})
                     session.commit()
                     alert_id = novo_alerta.id
                 finally:
@@ -3324,8 +3789,10 @@ Funcionalidades Disponíveis:
                 cursor.execute("""
                     UPDATE painel_alertas 
                     SET resolvido = 1, data_resolucao = ?
-                    WHERE id = ?
+                    WHERE id = ? AND resolvido = 0
                 """, (datetime.datetime.now().isoformat(), alert_id))
+                if cursor.rowcount:
+                    self.apply_summary_increments(cursor.execute, {painel_resumo.CHAVE_ALERTAS_PENDENTES: -1})
                 
                 conn.commit()
                 conn.close()
@@ -3333,9 +3800,12 @@ Funcionalidades Disponíveis:
                 session = self.get_db_session()
                 try:
                     alerta = session.query(Alerta).filter(Alerta.id == alert_id).first()
-                    if alerta:
+                    if alerta and not alerta.resolvido:
                         alerta.resolvido = True
                         alerta.data_resolucao = datetime.datetime.now()
+                        self.apply_summary_increments(
+                            lambda sql, parametros: session.execute(sqlalchemy.text(sql), parametros),
+                            {painel_resumo.CHAVE_ALERTAS_PENDENTES: -1})
                         session.commit()
                 finally:
                     session.close()
@@ -3711,25 +4181,29 @@ Funcionalidades Disponíveis:
                     conn = sqlite3.connect(self.db_path)
                     
                     # Exportar todas as tabelas
-                    tables = ['painel_tarefas', 'painel_execucoes', 'painel_agendamentos', 
+                    tables = ['painel_tarefas', 'painel_execucoes', 'painel_logs_execucao', 'painel_agendamentos', 
                              'painel_alertas', 'painel_config_notificacao']
                     
                     export_data = {}
                     for table in tables:
                         df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
                         export_data[table] = df.to_dict('records')
+                    for log in export_data['painel_logs_execucao']:
+                        log['conteudo'] = conteudo_para_exportacao(log['conteudo'])  # Blob em base64 no JSON
                     
                     conn.close()
                 else:
                     with self.engine.connect() as conn:
                         # Exportar todas as tabelas
-                        tables = ['painel_tarefas', 'painel_execucoes', 'painel_agendamentos', 
+                        tables = ['painel_tarefas', 'painel_execucoes', 'painel_logs_execucao', 'painel_agendamentos', 
                                  'painel_alertas', 'painel_config_notificacao']
                         
                         export_data = {}
                         for table in tables:
                             df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
                             export_data[table] = df.to_dict('records')
+                        for log in export_data['painel_logs_execucao']:
+                            log['conteudo'] = conteudo_para_exportacao(log['conteudo'])  # Blob em base64 no JSON
                 
                 # Criar estrutura de exportação
                 final_export = {
@@ -3779,13 +4253,15 @@ Funcionalidades Disponíveis:
                                     # INSERT ATUALIZADO PARA NOVOS CAMPOS
                                     cursor.execute("""
                                         INSERT INTO painel_tarefas (titulo, descricao, prioridade, arquivo_BAT, tipo_execucao,
-                                                                   cd_source_path, cd_destination_node, cd_destination_path, cd_process_name) 
-                                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                                                   cd_source_path, cd_destination_node, cd_destination_path, cd_process_name,
+                                                                   timeout_minutos) 
+                                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                                     """, (task.get('titulo'), task.get('descricao'), 
                                          task.get('prioridade'), task.get('arquivo_BAT'), 
                                          task.get('tipo_execucao', 'BAT'), # Valor padrão para compatibilidade
                                          task.get('cd_source_path'), task.get('cd_destination_node'),
-                                         task.get('cd_destination_path'), task.get('cd_process_name')))
+                                         task.get('cd_destination_path'), task.get('cd_process_name'),
+                                         task.get('timeout_minutos')))
                                     conn.commit()
                                     conn.close()
                                 else:
@@ -3800,7 +4276,8 @@ Funcionalidades Disponíveis:
                                             cd_source_path=task.get('cd_source_path'),
                                             cd_destination_node=task.get('cd_destination_node'),
                                             cd_destination_path=task.get('cd_destination_path'),
-                                            cd_process_name=task.get('cd_process_name')
+                                            cd_process_name=task.get('cd_process_name'),
+                                            timeout_minutos=task.get('timeout_minutos')
                                         )
                                         session.add(nova_tarefa)
                                         session.commit()
@@ -3859,13 +4336,15 @@ Funcionalidades Disponíveis:
         """Exporta dados para arquivo específico"""
         with self.engine.connect() as conn:
             # Exportar todas as tabelas
-            tables = ['painel_tarefas', 'painel_execucoes', 'painel_agendamentos', 
+            tables = ['painel_tarefas', 'painel_execucoes', 'painel_logs_execucao', 'painel_agendamentos', 
                      'painel_alertas', 'painel_config_notificacao']
             
             export_data = {}
             for table in tables:
                 df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
                 export_data[table] = df.to_dict('records')
+            for log in export_data['painel_logs_execucao']:
+                log['conteudo'] = conteudo_para_exportacao(log['conteudo'])  # Blob em base64 no JSON
         
         # Criar estrutura de backup
         backup_data = {
@@ -3893,15 +4372,15 @@ Funcionalidades Disponíveis:
                     )
                     
                     if backup_path:
-                        # Parar agendador
-                        self.scheduler_running = False
-                        time.sleep(2)
+                        # Parar agendador (o pool segue com as execuções em andamento)
+                        self.stop_scheduler(parar_pool=False)
                         
                         # Restaurar arquivo
                         import shutil
                         shutil.copy2(self.db_path, backup_path)
                         
                         # Recarregar dados
+                        self.reconcile_dashboard_summary()
                         self.load_data()
                         
                         # Reiniciar agendador
@@ -3934,6 +4413,7 @@ Funcionalidades Disponíveis:
             session.query(Alerta).delete()
             session.query(Agendamento).delete()
             session.query(Execucao).delete()
+            session.query(LogExecucao).delete()
             # session.query(SistemaMonitor).delete() # Não incluído no export/import atual
             session.query(ConfiguracaoNotificacao).delete()
             session.query(Tarefa).delete() # Tarefas por último
@@ -3960,7 +4440,8 @@ Funcionalidades Disponíveis:
                             cd_source_path=task.get('cd_source_path'),
                             cd_destination_node=task.get('cd_destination_node'),
                             cd_destination_path=task.get('cd_destination_path'),
-                            cd_process_name=task.get('cd_process_name')
+                            cd_process_name=task.get('cd_process_name'),
+                            timeout_minutos=task.get('timeout_minutos')
                         )
                         session.add(nova_tarefa)
                         # Comitar em lote pode ser mais eficiente, mas para backup pequeno, linha a linha ok
@@ -4013,11 +4494,23 @@ Funcionalidades Disponíveis:
                             codigo_retorno=exec_data.get('codigo_retorno'),
                             duracao_segundos=exec_data.get('duracao_segundos'),
                             log_output=exec_data.get('log_output'),
+                            log_hash=exec_data.get('log_hash'),
                             executado_por_agendador=exec_data.get('executado_por_agendador')
                         )
                         session.add(nova_execucao)
                         session.flush()
 
+                if 'painel_logs_execucao' in data:
+                    for log_data in data['painel_logs_execucao']:
+                        session.add(LogExecucao(
+                            hash=log_data.get('hash'),
+                            compressao=log_data.get('compressao'),
+                            tamanho_original=log_data.get('tamanho_original'),
+                            conteudo=conteudo_da_exportacao(log_data.get('conteudo')),
+                            data_criacao=datetime.datetime.fromisoformat(log_data.get('data_criacao')) if log_data.get('data_criacao') else None
+                        ))
+                    session.flush()
+
                 if 'painel_alertas' in data:
                     for alert_data in data['painel_alertas']:
                         novo_alerta = Alerta(
@@ -4042,6 +4535,7 @@ Funcionalidades Disponíveis:
             session.close()
         
         # Recarregar dados
+        self.reconcile_dashboard_summary()
         self.load_data()
 
     def clear_data(self):
@@ -4055,7 +4549,7 @@ Funcionalidades Disponíveis:
                         cursor = conn.cursor()
                         
                         # Limpar todas as tabelas em ordem inversa de dependência
-                        tables = ['painel_alertas', 'painel_agendamentos', 'painel_execucoes', 
+                        tables = ['painel_alertas', 'painel_agendamentos', 'painel_execucoes', 'painel_logs_execucao',
                                  'painel_sistema_monitor', 'painel_config_notificacao', 'painel_tarefas']
                         
                         for table in tables:
@@ -4070,6 +4564,7 @@ Funcionalidades Disponíveis:
                             session.query(Alerta).delete()
                             session.query(Agendamento).delete()
                             session.query(Execucao).delete()
+                            session.query(LogExecucao).delete()
                             session.query(SistemaMonitor).delete()
                             session.query(ConfiguracaoNotificacao).delete()
                             session.query(Tarefa).delete() # Tarefas por último
@@ -4077,6 +4572,7 @@ Funcionalidades Disponíveis:
                         finally:
                             session.close()
                     
+                    self.reconcile_dashboard_summary()
                     self.load_data()
                     messagebox.showinfo("Sucesso", "Todos os dados foram limpos!")
                     
@@ -4169,7 +4665,7 @@ Desenvolvido por: Usuário #
         """Manipula o fechamento da aplicação"""
         if messagebox.askokcancel("Sair", "Deseja realmente sair do Painel de Controle?"):
             # Parar agendador
-            self.scheduler_running = False
+            self.stop_scheduler()
             
             # Fechar aplicação
             self.root.destroy()
@@ -3,10 +3,16 @@ from datetime import datetime
 import pandas as pd
 from openpyxl import load_workbook
 import shutil
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
+
+from moeda import coluna_centavos, formatar_centavos, para_centavos, somar_centavos
+from offline_cache import ler_excel_em_cache
+from offline_descoberta import classificar_candidatos, listar_candidatos
+from offline_divisao import descrever_partes, gerar_arquivos_divididos
+from offline_gravacao import GravadorMultiplo
+from offline_historico import atualizar_indice
+from offline_outbox import CaixaSaidaEmail
+from offline_pipeline import executar_pipeline
+from offline_validacao import salvar_rejeitados, validar_registros
 
 # Diretórios e credenciais genéricos
 INPUT_DIR = r"C:\CAMINHO\PARA\ENTRADA"
@@ -14,16 +20,29 @@ OUTPUT_DIR = r"C:\CAMINHO\PARA\ENVIADOS"
 HISTORICO_DIR = r"C:\CAMINHO\PARA\HISTORICO"
 PROCESSADOS_DIR = r"C:\CAMINHO\PARA\PROCESSADOS"
 CONTROL_FILE = r"C:\CAMINHO\PARA\CONTROLE_OFFLINE.xlsx"
+INDICE_HISTORICO_FILE = None  # None: indice_historico.sqlite dentro de HISTORICO_DIR
 
 MOVER_ARQUIVO_ORIGINAL = False
+# Divisão de planilhas grandes em vários arquivos/lotes (None = sem limite além do layout)
+MAX_REGISTROS_POR_ARQUIVO = None
+MAX_BYTES_POR_ARQUIVO = None
+TRABALHADORES_GERACAO = None  # None: até os.cpu_count() processos
 
 SERVIDOR_SMTP = "smtp.seuprovedor.com"
 PORTA_SMTP = 465
 EMAIL_PADRAO = "usuario@seudominio.com"
 SENHA_PADRAO = "SUA_SENHA_AQUI"
+SERVIDORES_SMTP = None  # None: apenas SERVIDOR_SMTP/PORTA_SMTP (ver servidores_smtp)
+
+OUTBOX_DIR = r"C:\CAMINHO\PARA\CAIXA_SAIDA"
+TEMPO_ESPERA_EMAILS = 120
 
 data_atual = datetime.now()
 
+def servidores_smtp():
+    # Montado na execução para refletir SERVIDOR_SMTP/PORTA_SMTP de um perfil (ver perfis.py)
+    return SERVIDORES_SMTP or [{'nome': 'principal', 'host': SERVIDOR_SMTP, 'porta': PORTA_SMTP, 'seguranca': 'ssl'}]
+
 def verificar_acesso_rede():
     diretorios = [INPUT_DIR, OUTPUT_DIR, HISTORICO_DIR, PROCESSADOS_DIR]
     for diretorio in diretorios:
@@ -44,11 +63,9 @@ def verificar_acesso_rede():
 def encontrar_arquivos_txn(diretorio):
     print(f"Iniciando busca por arquivos TXN em: {diretorio}")
     try:
-        todos_arquivos = os.listdir(diretorio)
-        arquivos_excel = [f for f in todos_arquivos if f.lower().endswith(('.xlsx', '.xls'))]
+        _, candidatos = listar_candidatos(diretorio)
         data_hoje = data_atual.strftime('%Y%m%d')
-        padrao_hoje = f"TXN_{data_hoje}"
-        arquivos_txn_hoje = [f for f in arquivos_excel if padrao_hoje.upper() in f.upper()]
+        arquivos_txn_hoje = classificar_candidatos(candidatos, data_atual)['hoje']
         if arquivos_txn_hoje:
             print(f"Encontrados {len(arquivos_txn_hoje)} arquivos com o padrão TXN_{data_hoje}:")
             for arquivo in arquivos_txn_hoje:
@@ -87,9 +104,11 @@ def create_header(batch_number: int) -> str:
     return f"000000{batch_number:03d}0000000{' ' * 40}A{current_datetime}M00000000{' ' * 412}00000002"
 
 def create_detail_record(card_number: str, txn_code: str, value: float, date: str, sequence: int) -> str:
+    return build_detail_record(card_number, txn_code, formatar_centavos(para_centavos(value), 17), date, sequence)
+
+def build_detail_record(card_number: str, txn_code: str, formatted_value: str, date: str, sequence: int) -> str:
     formatted_card = f"{int(card_number):016d}"
     formatted_txn = f"{int(txn_code):04d}"
-    formatted_value = f"{int(value * 100):017d}"
     formatted_date = datetime.strptime(date, '%Y-%m-%d').strftime('%Y%m%d') + "163000"
     return (
         f"1{'0' * 26}"
@@ -130,57 +149,157 @@ def create_trailer(batch_number: int, total_records: int, total_value: int) -> s
         f"{'0' * 7}2"
     )
 
-def generate_file(df: pd.DataFrame, output_path: str, batch_number: int) -> int:
+def generate_file(df: pd.DataFrame, output_path: str, batch_number: int, copias: list = None) -> int:
     try:
-        total_value = 0
         successful_records = 0
-        with open(output_path, 'w') as f:
+        # Posições 0..n-1: formatted_values, centavos.iloc e a sequência são posicionais,
+        # e o df pode vir filtrado (partes, rejeitados) com outro índice
+        df = df.reset_index(drop=True)
+        # Valores convertidos e formatados de uma vez; o total soma só os registros gravados
+        centavos = coluna_centavos(df)
+        formatted_values = formatar_centavos(centavos, 17).to_numpy(dtype=object, na_value=None)
+        gravados = []
+        gravador = GravadorMultiplo([output_path] + list(copias or []))
+        with gravador as f:
             header = create_header(batch_number)
             f.write(header + '\n')
             for i, row in df.iterrows():
                 try:
                     card_number = row['NUMERO CARTÃO']
                     txn_code = row['TXN']
-                    value = row['VALOR']
+                    if formatted_values[i] is None:
+                        raise ValueError(f"Valor inválido: {row['VALOR']}")
                     date = row['DATA DE ENVIO'].strftime('%Y-%m-%d')
-                    detail_record = create_detail_record(str(card_number), str(txn_code), value, date, i + 1)
+                    detail_record = build_detail_record(str(card_number), str(txn_code), formatted_values[i], date, i + 1)
                     f.write(detail_record + '\n')
-                    total_value += int(value * 100)
+                    gravados.append(i)
                     successful_records += 1
                 except Exception as e:
                     print(f"Erro ao processar registro {i + 1}: {e}")
+            total_value = somar_centavos(centavos.iloc[gravados])
             trailer = create_trailer(batch_number, successful_records, total_value)
             f.write(trailer + '\n')
-        print(f"Arquivo gerado: {output_path}")
+        print(f"Arquivo gerado: {output_path} (SHA-256 {gravador.sha256})")
+        for copia in copias or []:
+            print(f"Cópia gravada em: {copia}")
         return successful_records
     except Exception as e:
         raise IOError(f"Erro ao gerar o arquivo: {e}")
 
-def enviar_email(remetente, destinatarios, assunto, corpo, senha, anexos=None):
-    mensagem = MIMEMultipart()
-    mensagem['From'] = remetente
-    mensagem['To'] = ", ".join(destinatarios)
-    mensagem['Subject'] = assunto
-    mensagem.attach(MIMEText(corpo, 'html'))
-    if anexos:
-        for arquivo in anexos:
-            if os.path.isfile(arquivo):
-                with open(arquivo, 'rb') as f:
-                    parte = MIMEApplication(f.read(), Name=os.path.basename(arquivo))
-                parte['Content-Disposition'] = f'attachment; filename="{os.path.basename(arquivo)}"'
-                mensagem.attach(parte)
+def gerar_arquivos(df: pd.DataFrame, output_path: str, batch_number: int, copias: list = None,
+                   arquivo_origem: str = None):
+    """
+    Gera o arquivo OFFLINE da planilha, dividido em partes (um lote por parte)
+    quando ultrapassa MAX_REGISTROS_POR_ARQUIVO, MAX_BYTES_POR_ARQUIVO ou os
+    limites do layout.
+
+    Returns:
+        tuple: (partes, caminho_manifesto) de gerar_arquivos_divididos.
+    """
+    bytes_detalhe = len(create_detail_record('0', '0', 0, '2000-01-01', 1)) + len(os.linesep)
+    bytes_fixos = len(create_header(batch_number)) + len(create_trailer(batch_number, 0, 0)) + 2 * len(os.linesep)
+    return gerar_arquivos_divididos(
+        df, generate_file, output_path, batch_number, copias,
+        max_registros=MAX_REGISTROS_POR_ARQUIVO, max_bytes=MAX_BYTES_POR_ARQUIVO,
+        bytes_detalhe=bytes_detalhe, bytes_fixos=bytes_fixos,
+        trabalhadores=TRABALHADORES_GERACAO, arquivo_origem=arquivo_origem)
+
+def carregar_planilha(input_file):
+    arquivo = os.path.basename(input_file)
+    print(f"Processando arquivo: {input_file}")
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(f"Arquivo de entrada não encontrado: {input_file}")
+    df = ler_excel_em_cache(input_file)
+    print(f"Planilha carregada com {len(df)} registros.")
+    df['DATA DE ENVIO'] = pd.to_datetime(df['DATA DE ENVIO'], errors='coerce')
+    required_columns = ['NUMERO CARTÃO', 'TXN', 'VALOR', 'DATA DE ENVIO']
+    if not all(col in df.columns for col in required_columns):
+        raise ValueError("Colunas necessárias não encontradas na planilha.")
+    total_planilha = len(df)
+    df, rejeitados = validar_registros(df)
+    return {'input_file': input_file, 'arquivo': arquivo, 'df': df, 'rejeitados': rejeitados,
+            'total_planilha': total_planilha}
+
+def gerar_lote(planilha, batch_number):
+    current_datetime = datetime.now()
+    anexos_rejeitados = []
+    if len(planilha['rejeitados']):
+        caminho_rejeitados = os.path.join(
+            OUTPUT_DIR, f"REJEITADOS_{batch_number:06d}_{current_datetime.strftime('%d%m%Y_%H%M')}.xlsx")
+        anexos_rejeitados.append(salvar_rejeitados(planilha['rejeitados'], caminho_rejeitados))
+    # O lote no nome: o email do lote anterior ainda pode estar na caixa de saída
+    # com o arquivo dele anexado, e dois lotes podem ser gerados no mesmo minuto
+    output_filename = f"OFFLINE_{batch_number:06d}_{current_datetime.strftime('%d%m%Y_%H%M')}.txt"
+    output_path = os.path.join(OUTPUT_DIR, output_filename)
+    data_hoje = current_datetime.strftime('%Y%m%d')
+    arquivo_txn_historico = f"TXN_{data_hoje}_{batch_number:06d}.txt"
+    destino_txn = os.path.join(HISTORICO_DIR, arquivo_txn_historico)
+    # Saída e histórico gravados na mesma passada, sem copiar o arquivo depois
+    if MOVER_ARQUIVO_ORIGINAL:
+        output_path = destino_txn
+        partes, manifesto = gerar_arquivos(planilha['df'], output_path, batch_number, arquivo_origem=planilha['arquivo'])
+    else:
+        partes, manifesto = gerar_arquivos(planilha['df'], output_path, batch_number, [destino_txn], planilha['arquivo'])
+    return dict(planilha, batch_number=batch_number, current_datetime=current_datetime,
+                partes=partes, manifesto=manifesto, anexos_rejeitados=anexos_rejeitados)
+
+def descartar_lote(lote):
+    gerados = [c for parte in lote['partes'] for c in [parte['caminho']] + parte['copias']]
+    for caminho in gerados + [lote['manifesto']] + lote['anexos_rejeitados']:
+        if caminho and os.path.exists(caminho):
+            os.remove(caminho)
+            print(f"Arquivo descartado: {caminho}")
+
+def concluir_processamento(lote, caixa_saida):
+    arquivo = lote['arquivo']
+    batch_number = lote['batch_number']
+    partes = lote['partes']
+    total_planilha = lote['total_planilha']
+    current_datetime = lote['current_datetime']
+    for parte in partes:
+        update_control_file(parte['lote'], parte['registros'])
+    successful_records = sum(parte['registros'] for parte in partes)
+    remetente = EMAIL_PADRAO
+    destinatarios = [EMAIL_PADRAO]
+    assunto = f"Processamento de Transações OFFLINE_{batch_number:06d}"
+    corpo = f"""
+    <html>
+    <body>
+        <h2>Processamento Concluído</h2>
+        <p>O processamento do lote OFFLINE <b>{batch_number:06d}</b> foi concluído.</p>
+        <ul>
+            <li>Arquivo processado: {arquivo}</li>
+            <li>Arquivo gerado: {descrever_partes(partes)}</li>
+            <li>Total de registros processados: {successful_records}</li>
+            <li>Total de registros na planilha original: {total_planilha}</li>
+            <li>Registros rejeitados na validação: {len(lote['rejeitados'])}</li>
+            <li>Data e hora do processamento: {current_datetime.strftime('%d/%m/%Y %H:%M:%S')}</li>
+        </ul>
+        <p>Este é um email automático.</p>
+    </body>
+    </html>
+    """
+    anexos = [parte['caminho'] for parte in partes] + ([lote['manifesto']] if lote['manifesto'] else []) + lote['anexos_rejeitados']
+    caixa_saida.enfileirar(remetente, destinatarios, assunto, corpo, anexos)
+    print(f"Total de registros processados com sucesso: {successful_records}")
+    print(f"Total de registros na planilha original: {total_planilha}")
+    if successful_records < total_planilha:
+        print(f"Atenção: {total_planilha - successful_records} registros não foram processados.")
     try:
-        with smtplib.SMTP_SSL(SERVIDOR_SMTP, PORTA_SMTP) as servidor:
-            servidor.login(remetente, senha)
-            texto = mensagem.as_string()
-            servidor.sendmail(remetente, destinatarios, texto)
-            print("Email enviado com sucesso!")
+        atualizar_indice(HISTORICO_DIR, INDICE_HISTORICO_FILE or os.path.join(HISTORICO_DIR, "indice_historico.sqlite"))
     except Exception as e:
-        print(f"Erro ao enviar email: {e}")
-        raise
+        print(f"Aviso: não foi possível atualizar o índice do histórico: {e}")
+    if not os.path.exists(PROCESSADOS_DIR):
+        os.makedirs(PROCESSADOS_DIR, exist_ok=True)
+    destino_excel = os.path.join(PROCESSADOS_DIR, arquivo)
+    shutil.move(lote['input_file'], destino_excel)
+    print(f"Arquivo Excel movido para: {destino_excel}")
+    return successful_records
 
 def main():
     batch_number = 0
+    caixa_saida = CaixaSaidaEmail(OUTBOX_DIR, servidores_smtp(), EMAIL_PADRAO, SENHA_PADRAO)
+    caixa_saida.iniciar()
     try:
         print(f"Iniciando processamento em {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
         print("Verificando acesso aos diretórios de rede...")
@@ -191,7 +310,6 @@ def main():
             mensagem = "Nenhum arquivo de entrada TXN encontrado."
             print(mensagem)
             remetente = EMAIL_PADRAO
-            senha = SENHA_PADRAO
             destinatarios = [EMAIL_PADRAO]
             assunto = "Processamento - Arquivo OFFLINE"
             corpo = f"""
@@ -204,81 +322,32 @@ def main():
             </body>
             </html>
             """
-            try:
-                enviar_email(remetente, destinatarios, assunto, corpo, senha)
-            except Exception as email_error:
-                print(f"Erro ao enviar email: {email_error}")
+            caixa_saida.enfileirar(remetente, destinatarios, assunto, corpo)
             return
         print(f"Encontrados {len(arquivos_entrada)} arquivos para processamento.")
-        for arquivo in arquivos_entrada:
-            INPUT_FILE = os.path.join(INPUT_DIR, arquivo)
-            print(f"Processando arquivo: {INPUT_FILE}")
-            if not os.path.exists(INPUT_FILE):
-                raise FileNotFoundError(f"Arquivo de entrada não encontrado: {INPUT_FILE}")
-            df = pd.read_excel(INPUT_FILE)
-            print(f"Planilha carregada com {len(df)} registros.")
-            df['DATA DE ENVIO'] = pd.to_datetime(df['DATA DE ENVIO'], errors='coerce')
-            required_columns = ['NUMERO CARTÃO', 'TXN', 'VALOR', 'DATA DE ENVIO']
-            if not all(col in df.columns for col in required_columns):
-                raise ValueError("Colunas necessárias não encontradas na planilha.")
-            batch_number = get_next_batch_number()
+        # Leitura da próxima planilha, geração da atual e conclusão da anterior ocorrem ao mesmo tempo;
+        # os lotes são numerados na geração, pois o controle só é atualizado no último estágio
+        proximo_lote = get_next_batch_number()
+        def gerar(planilha):
+            nonlocal batch_number, proximo_lote
+            batch_number = proximo_lote
             print(f"Número do lote: {batch_number}")
-            current_datetime = datetime.now()
-            output_filename = f"OFFLINE_{current_datetime.strftime('%d%m%Y_%H%M')}.txt"
-            output_path = os.path.join(OUTPUT_DIR, output_filename)
-            successful_records = generate_file(df, output_path, batch_number)
-            update_control_file(batch_number, successful_records)
-            remetente = EMAIL_PADRAO
-            senha = SENHA_PADRAO
-            destinatarios = [EMAIL_PADRAO]
-            assunto = f"Processamento de Transações OFFLINE_{batch_number:06d}"
-            corpo = f"""
-            <html>
-            <body>
-                <h2>Processamento Concluído</h2>
-                <p>O processamento do lote OFFLINE <b>{batch_number:06d}</b> foi concluído.</p>
-                <ul>
-                    <li>Arquivo processado: {arquivo}</li>
-                    <li>Arquivo gerado: {output_filename}</li>
-                    <li>Total de registros processados: {successful_records}</li>
-                    <li>Total de registros na planilha original: {len(df)}</li>
-                    <li>Data e hora do processamento: {current_datetime.strftime('%d/%m/%Y %H:%M:%S')}</li>
-                </ul>
-                <p>Este é um email automático.</p>
-            </body>
-            </html>
-            """
-            anexos = [output_path]
-            try:
-                enviar_email(remetente, destinatarios, assunto, corpo, senha, anexos)
-            except Exception as email_error:
-                print(f"Erro ao enviar email: {email_error}")
-            print(f"Total de registros processados com sucesso: {successful_records}")
-            print(f"Total de registros na planilha original: {len(df)}")
-            if successful_records < len(df):
-                print(f"Atenção: {len(df) - successful_records} registros não foram processados.")
-            data_hoje = current_datetime.strftime('%Y%m%d')
-            arquivo_txn_historico = f"TXN_{data_hoje}.txt"
-            destino_txn = os.path.join(HISTORICO_DIR, arquivo_txn_historico)
-            if MOVER_ARQUIVO_ORIGINAL:
-                shutil.move(output_path, destino_txn)
-                print(f"Arquivo TXN movido para o histórico: {destino_txn}")
-            else:
-                shutil.copy2(output_path, destino_txn)
-                print(f"Arquivo TXN mantido em: {output_path}")
-                print(f"Cópia do arquivo TXN salva em: {destino_txn}")
-            if not os.path.exists(PROCESSADOS_DIR):
-                os.makedirs(PROCESSADOS_DIR, exist_ok=True)
-            destino_excel = os.path.join(PROCESSADOS_DIR, arquivo)
-            shutil.move(INPUT_FILE, destino_excel)
-            print(f"Arquivo Excel movido para: {destino_excel}")
+            lote = gerar_lote(planilha, batch_number)
+            proximo_lote = lote['partes'][-1]['lote'] + 1
+            return lote
+        executar_pipeline(
+            [os.path.join(INPUT_DIR, arquivo) for arquivo in arquivos_entrada],
+            [
+                ('leitura', carregar_planilha),
+                ('geracao', gerar, descartar_lote),
+                ('conclusao', lambda lote: concluir_processamento(lote, caixa_saida)),
+            ])
         print(f"Processamento concluído em {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
     except Exception as e:
         erro_msg = f"Erro: {e}"
         print(erro_msg)
         try:
             remetente = EMAIL_PADRAO
-            senha = SENHA_PADRAO
             destinatarios = [EMAIL_PADRAO]
             assunto = "ERRO - Processamento de Transações OFFLINE"
             corpo = f"""
@@ -297,9 +366,13 @@ def main():
             </body>
             </html>
             """
-            try:
-                enviar_email(remetente, destinatarios, assunto, corpo, senha)
-            except Exception as email_error:
-                print(f"Erro ao enviar email de notificação de erro: {email_error}")
+            caixa_saida.enfileirar(remetente, destinatarios, assunto, corpo)
         except Exception as email_error:
-            print(f"Erro ao enviar email de notificação de erro:
+            print(f"Erro ao enviar email de notificação de erro: {email_error}")
+    finally:
+        if not caixa_saida.aguardar(TEMPO_ESPERA_EMAILS):
+            print(f"Emails pendentes permanecem na caixa de saída para a próxima execução: {OUTBOX_DIR}")
+        caixa_saida.parar()
+
+if __name__ == "__main__":
+    main()
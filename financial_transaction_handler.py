@@ -1,35 +1,60 @@
 import os
-from datetime import datetime, timedelta
+import sys
+from datetime import datetime
 import pandas as pd
 from openpyxl import load_workbook
 import shutil
-import smtplib
 import imaplib
-import email
-import re
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
 import getpass  # Para obter a senha de forma segura
 
+from moeda import coluna_centavos, formatar_centavos, para_centavos, somar_centavos
+from offline_cache import ler_excel_em_cache
+from offline_descoberta import EXTENSOES_EXCEL, classificar_candidatos, listar_candidatos
+from offline_divisao import descrever_partes, gerar_arquivos_divididos
+from offline_gravacao import GravadorMultiplo
+from offline_imap import ler_novas_mensagens
+from offline_ingestao import ingerir_anexos, monitorar_anexos
+from offline_outbox import SERVIDOR_PRIMARIO, CaixaSaidaEmail
+from offline_pipeline import executar_pipeline
+from offline_processados import IndiceProcessados
+from offline_validacao import salvar_rejeitados, validar_registros
+
 # Configurações de diretórios - substitua pelos caminhos reais em produção
 INPUT_DIR = r"path/to/input/directory"
 OUTPUT_DIR = r"path/to/output/directory"
 HISTORICO_DIR = r"path/to/history/directory"
 CONTROL_FILE = r"path/to/control/file.xlsx"
+# Índice das planilhas já processadas (hash do conteúdo -> lote e arquivo gerado)
+INDICE_PROCESSADOS_FILE = r"path/to/processed_index.json"
 
 MOVER_ARQUIVO_ORIGINAL = False
+# Divisão de planilhas grandes em vários arquivos/lotes (None = sem limite além do layout)
+MAX_REGISTROS_POR_ARQUIVO = None
+MAX_BYTES_POR_ARQUIVO = None
+TRABALHADORES_GERACAO = None  # None: até os.cpu_count() processos
 # Configurações de Email - substitua pelos dados reais
 SERVIDOR_SMTP = "smtp.example.com"
 PORTA_SMTP = 465
 SERVIDOR_IMAP = "imap.example.com"
 PORTA_IMAP = 993
+# Último UID lido por pasta, para a leitura incremental da caixa de entrada
+ESTADO_IMAP_FILE = r"path/to/imap_state.json"
+# Ingestão de planilhas TXN recebidas como anexo (ver ingerir_anexos_email)
+INGESTAO_DIR = r"path/to/local/email/input/directory"
+PASTA_INGESTAO = 'INBOX'
+INTERVALO_INGESTAO = 60
+# None: SERVIDOR_PRIMARIO e, como secundário, SERVIDOR_SMTP/PORTA_SMTP (ver servidores_smtp)
+SERVIDORES_SMTP = None
+# Caixa de saída local: emails pendentes sobrevivem a falhas e reinícios
+OUTBOX_DIR = r"path/to/outbox/directory"
+TEMPO_ESPERA_EMAILS = 120  # Segundos aguardando o envio dos emails ao final da execução
 
 # Configurações de Email padrão - substitua pelos dados reais
 EMAIL_PADRAO = "notification@example.com"
 SENHA_PADRAO = "your_password_here"  # Não é recomendado armazenar senhas diretamente no código
 
 data_atual = datetime.now()
+_indice_processados = None
 
 
 def verificar_acesso_rede():
@@ -52,17 +77,33 @@ def verificar_acesso_rede():
             raise Exception(f"Erro ao acessar o diretório {diretorio}: {e}")
 
 
+def obter_indice_processados():
+    global _indice_processados
+    if _indice_processados is None:
+        _indice_processados = IndiceProcessados(INDICE_PROCESSADOS_FILE)
+    return _indice_processados
+
+
+def conteudo_ja_processado(indice, diretorio, arquivo):
+    """Confere pelo hash do conteúdo se a planilha que vai ser processada já foi processada antes."""
+    registro = indice.consultar(os.path.join(diretorio, arquivo))
+    if registro:
+        print(f"Arquivo {arquivo} ignorado: conteúdo já processado no lote "
+              f"{registro.get('lote') or '?'} em {registro.get('processado_em')}.")
+    return registro is not None
+
+
 def encontrar_arquivos_txn(diretorio):
     """
     Função especializada para encontrar arquivos TXN no diretório especificado.
-    Implementa várias estratégias de busca.
+    Implementa várias estratégias de busca sobre uma única listagem do diretório
+    (ver offline_descoberta), reaproveitada enquanto o diretório não mudar.
     """
     print(f"Iniciando busca por arquivos TXN em: {diretorio}")
     
-    # Listar todos os arquivos no diretório
     try:
-        todos_arquivos = os.listdir(diretorio)
-        arquivos_excel = [f for f in todos_arquivos if f.lower().endswith(('.xlsx', '.xls'))]
+        todos_arquivos, candidatos = listar_candidatos(diretorio)
+        arquivos_excel = [f for f in todos_arquivos if f.lower().endswith(EXTENSOES_EXCEL)]
         
         print(f"Total de arquivos Excel encontrados: {len(arquivos_excel)}")
         if len(arquivos_excel) > 0:
@@ -70,50 +111,32 @@ def encontrar_arquivos_txn(diretorio):
             for i, arquivo in enumerate(arquivos_excel[:5]):
                 print(f"  {i+1}. {arquivo}")
         
-        # Estratégia 1: Buscar pelo padrão exato TXN_AAAAMMDD
+        # Planilhas já processadas ficam fora de todas as estratégias: aqui só pela
+        # assinatura (nome, tamanho, mtime); o conteúdo é conferido abaixo, apenas
+        # nos arquivos da estratégia escolhida
+        indice = obter_indice_processados()
+        estrategias = classificar_candidatos(
+            candidatos, data_atual,
+            ignorar=lambda candidato: indice.candidato_processado(diretorio, candidato))
         data_hoje = data_atual.strftime('%Y%m%d')
-        padrao_hoje = f"TXN_{data_hoje}"
-        
-        arquivos_txn_hoje = [f for f in arquivos_excel if padrao_hoje.upper() in f.upper()]
-        if arquivos_txn_hoje:
-            print(f"Encontrados {len(arquivos_txn_hoje)} arquivos com o padrão TXN_{data_hoje}:")
-            for arquivo in arquivos_txn_hoje:
-                print(f"  - {arquivo}")
-            return arquivos_txn_hoje
-        
-        # Estratégia 2: Buscar por arquivos TXN de datas recentes (últimos 7 dias)
-        arquivos_txn_recentes = []
-        for i in range(7):  # Verificar últimos 7 dias
-            data_verificar = data_atual - timedelta(days=i)
-            data_str = data_verificar.strftime('%Y%m%d')
-            padrao = f"TXN_{data_str}"
-            
-            for arquivo in arquivos_excel:
-                if padrao.upper() in arquivo.upper():
-                    arquivos_txn_recentes.append(arquivo)
-        
-        if arquivos_txn_recentes:
-            print(f"Encontrados {len(arquivos_txn_recentes)} arquivos TXN de datas recentes:")
-            for arquivo in arquivos_txn_recentes:
-                print(f"  - {arquivo}")
-            return arquivos_txn_recentes
-        
-        # Estratégia 3: Buscar qualquer arquivo com "TXN" no nome
-        arquivos_txn_geral = [f for f in arquivos_excel if "TXN" in f.upper()]
-        if arquivos_txn_geral:
-            print(f"Encontrados {len(arquivos_txn_geral)} arquivos com 'TXN' no nome:")
-            for arquivo in arquivos_txn_geral:
-                print(f"  - {arquivo}")
-            return arquivos_txn_geral
-        
-        # Estratégia 4: Buscar por padrão usando expressão regular
-        padrao_regex = re.compile(r'TXN[_\s-]?\d{8}', re.IGNORECASE)
-        arquivos_txn_regex = [f for f in arquivos_excel if padrao_regex.search(f)]
-        if arquivos_txn_regex:
-            print(f"Encontrados {len(arquivos_txn_regex)} arquivos com padrão regex TXN_AAAAMMDD:")
-            for arquivo in arquivos_txn_regex:
-                print(f"  - {arquivo}")
-            return arquivos_txn_regex
+        descricoes = [
+            # Estratégia 1: padrão exato TXN_AAAAMMDD
+            ('hoje', f"arquivos com o padrão TXN_{data_hoje}"),
+            # Estratégia 2: arquivos TXN de datas recentes (últimos 7 dias)
+            ('recentes', "arquivos TXN de datas recentes"),
+            # Estratégia 3: qualquer arquivo com "TXN" no nome
+            ('geral', "arquivos com 'TXN' no nome"),
+            # Estratégia 4: padrão por expressão regular
+            ('regex', "arquivos com padrão regex TXN_AAAAMMDD"),
+        ]
+        for estrategia, descricao in descricoes:
+            arquivos = [a for a in estrategias[estrategia] if not conteudo_ja_processado(indice, diretorio, a)]
+            indice.salvar_se_alterado()
+            if arquivos:
+                print(f"Encontrados {len(arquivos)} {descricao}:")
+                for arquivo in arquivos:
+                    print(f"  - {arquivo}")
+                return arquivos
         
         # Se nenhum arquivo for encontrado, retornar lista vazia
         print("Nenhum arquivo TXN encontrado após todas as estratégias de busca.")
@@ -159,9 +182,13 @@ def create_header(batch_number: int) -> str:
 
 
 def create_detail_record(card_number: str, txn_code: str, value: float, date: str, sequence: int) -> str:
+    return build_detail_record(
+        card_number, txn_code, formatar_centavos(para_centavos(value), 17), date, sequence)
+
+
+def build_detail_record(card_number: str, txn_code: str, formatted_value: str, date: str, sequence: int) -> str:
     formatted_card = f"{int(card_number):016d}"
     formatted_txn = f"{int(txn_code):04d}"
-    formatted_value = f"{int(value * 100):017d}"
     formatted_date = datetime.strptime(
         date, '%Y-%m-%d').strftime('%Y%m%d') + "163000"
 
@@ -208,9 +235,16 @@ def create_trailer(batch_number: int, total_records: int, total_value: int) -> s
 
 def generate_file(df: pd.DataFrame, output_path: str, batch_number: int) -> int:
     try:
-        total_value = 0
         successful_records = 0
-        with open(output_path, 'w') as f:
+        # Posições 0..n-1: formatted_values, centavos.iloc e a sequência são posicionais,
+        # e o df pode vir filtrado (partes, rejeitados) com outro índice
+        df = df.reset_index(drop=True)
+        # Valores convertidos e formatados de uma vez; o total soma só os registros gravados
+        centavos = coluna_centavos(df)
+        formatted_values = formatar_centavos(centavos, 17).to_numpy(dtype=object, na_value=None)
+        gravados = []
+        gravador = GravadorMultiplo([output_path])
+        with gravador as f:
             header = create_header(batch_number)
             f.write(header + '\n')
 
@@ -218,139 +252,312 @@ def generate_file(df: pd.DataFrame, output_path: str, batch_number: int) -> int:
                 try:
                     card_number = row['NUMERO CARTÃO']
                     txn_code = row['TXN']
-                    value = row['VALOR']
+                    if formatted_values[i] is None:
+                        raise ValueError(f"Valor inválido: {row['VALOR']}")
                     date = row['DATA DE ENVIO'].strftime('%Y-%m-%d')
 
-                    detail_record = create_detail_record(
-                        str(card_number), str(txn_code), value, date, i + 1)
+                    detail_record = build_detail_record(
+                        str(card_number), str(txn_code), formatted_values[i], date, i + 1)
                     f.write(detail_record + '\n')
-                    total_value += int(value * 100)
+                    gravados.append(i)
                     successful_records += 1
                 except Exception as e:
                     print(f"Erro ao processar registro {i + 1}: {e}")
 
+            total_value = somar_centavos(centavos.iloc[gravados])
             trailer = create_trailer(
                 batch_number, successful_records, total_value)
             f.write(trailer + '\n')
 
-        print(f"Arquivo gerado com sucesso: {output_path}")
+        print(f"Arquivo gerado com sucesso: {output_path} (SHA-256 {gravador.sha256})")
         return successful_records
     except Exception as e:
         raise IOError(f"Erro ao gerar o arquivo: {e}")
 
 
-def enviar_email_primario(remetente, destinatarios, assunto, corpo, senha, anexos=None):
-    mensagem = MIMEMultipart()
-    mensagem['From'] = remetente
-    mensagem['To'] = ", ".join(destinatarios)
-    mensagem['Subject'] = assunto
-    
-    mensagem.attach(MIMEText(corpo, 'html'))
-    
-    if anexos:
-        for arquivo in anexos:
-            if os.path.isfile(arquivo):
-                with open(arquivo, 'rb') as f:
-                    parte = MIMEApplication(f.read(), Name=os.path.basename(arquivo))
-                parte['Content-Disposition'] = f'attachment; filename="{os.path.basename(arquivo)}"'
-                mensagem.attach(parte)
-    
-    try:
-        # Usando servidor SMTP primário
-        servidor = smtplib.SMTP("smtp.office365.com", 587)
-        servidor.ehlo()
-        servidor.starttls()  # Habilitando criptografia
-        servidor.login(remetente, senha)
-        
-        # Enviando email
-        texto = mensagem.as_string()
-        servidor.sendmail(remetente, destinatarios, texto)
-        print("Email enviado com sucesso pelo servidor primário!")
-        
-    except Exception as e:
-        print(f"Erro ao enviar email: {e}")
-        raise
-    
-    finally:
-        if 'servidor' in locals():
-            servidor.quit()
-
-
-def enviar_email_secundario(remetente, destinatarios, assunto, corpo, senha, anexos=None):
-    try:
-        with smtplib.SMTP_SSL(SERVIDOR_SMTP, PORTA_SMTP) as servidor:
-            servidor.login(remetente, senha)
-            mensagem = MIMEMultipart()
-            mensagem['From'] = remetente
-            mensagem['To'] = ", ".join(destinatarios)
-            mensagem['Subject'] = assunto
-
-            mensagem.attach(MIMEText(corpo, 'html'))
-
-            if anexos:
-                for arquivo in anexos:
-                    if os.path.isfile(arquivo):
-                        with open(arquivo, 'rb') as f:
-                            parte = MIMEApplication(
-                                f.read(), Name=os.path.basename(arquivo))
-                        parte['Content-Disposition'] = f'attachment; filename="{os.path.basename(arquivo)}"'
-                        mensagem.attach(parte)
-
-            texto = mensagem.as_string()
-            servidor.sendmail(remetente, destinatarios, texto)
-            print("Email enviado com sucesso pelo servidor secundário!")
+def gerar_arquivos(df: pd.DataFrame, output_path: str, batch_number: int, arquivo_origem: str = None):
+    """
+    Gera o arquivo OFFLINE da planilha, dividido em partes (um lote por parte)
+    quando ultrapassa MAX_REGISTROS_POR_ARQUIVO, MAX_BYTES_POR_ARQUIVO ou os
+    limites do layout.
 
-    except Exception as e:
-        print(f"Erro ao enviar email: {e}")
-        raise
+    Returns:
+        tuple: (partes, caminho_manifesto) de gerar_arquivos_divididos.
+    """
+    bytes_detalhe = len(create_detail_record('0', '0', 0, '2000-01-01', 1)) + len(os.linesep)
+    bytes_fixos = len(create_header(batch_number)) + len(create_trailer(batch_number, 0, 0)) + 2 * len(os.linesep)
+    return gerar_arquivos_divididos(
+        df, generate_file, output_path, batch_number,
+        max_registros=MAX_REGISTROS_POR_ARQUIVO, max_bytes=MAX_BYTES_POR_ARQUIVO,
+        bytes_detalhe=bytes_detalhe, bytes_fixos=bytes_fixos,
+        trabalhadores=TRABALHADORES_GERACAO, arquivo_origem=arquivo_origem)
 
 
-def ler_emails(usuario, senha, pasta='INBOX', quantidade=5):
+def ler_emails(usuario, senha, pasta='INBOX', quantidade=5, arquivo_estado=ESTADO_IMAP_FILE):
+    """
+    Exibe os emails recebidos desde a última leitura (na primeira, os `quantidade`
+    mais recentes). Só cabeçalhos e o início do corpo são baixados; o último UID
+    lido fica registrado em arquivo_estado.
+    """
     try:
         # Conectando ao servidor IMAP
         with imaplib.IMAP4_SSL(SERVIDOR_IMAP, PORTA_IMAP) as mail:
             mail.login(usuario, senha)
-            mail.select(pasta)
+            previas = ler_novas_mensagens(mail, usuario, pasta, arquivo_estado, quantidade)
 
-            status, mensagens = mail.search(None, 'ALL')
-            ids_mensagens = mensagens[0].split()
-            ids_para_ler = ids_mensagens[-quantidade:] if len(
-                ids_mensagens) > quantidade else ids_mensagens
+            if not previas:
+                print(f"Nenhum email novo na pasta {pasta}.")
+                return previas
 
             print(
-                f"Lendo os {len(ids_para_ler)} emails mais recentes da pasta {pasta}:")
-
-            for num in reversed(ids_para_ler):
-                status, dados = mail.fetch(num, '(RFC822)')
-                email_bruto = dados[0][1]
-                mensagem = email.message_from_bytes(email_bruto)
-
-                de = mensagem['From']
-                assunto = mensagem['Subject']
-                data = mensagem['Date']
-
-                print(f"\nDe: {de}")
-                print(f"Assunto: {assunto}")
-                print(f"Data: {data}")
-
-                if mensagem.is_multipart():
-                    for parte in mensagem.walk():
-                        tipo_conteudo = parte.get_content_type()
-                        if tipo_conteudo == 'text/plain':
-                            corpo = parte.get_payload(decode=True).decode()
-                            print(f"Corpo: {corpo[:100]}...")
-                            break
-                else:
-                    corpo = mensagem.get_payload(decode=True).decode()
-                    print(f"Corpo: {corpo[:100]}...")
+                f"Lendo os {len(previas)} emails novos da pasta {pasta}:")
+
+            for previa in previas:
+                print(f"\nDe: {previa['de']}")
+                print(f"Assunto: {previa['assunto']}")
+                print(f"Data: {previa['data']}")
+                print(f"Corpo: {previa['corpo']}...")
+
+            return previas
 
     except Exception as e:
         print(f"Erro ao ler emails: {e}")
         raise
 
 
+def carregar_planilha(input_file):
+    """
+    Lê a planilha TXN, confere as colunas e separa as linhas rejeitadas na
+    validação (primeiro estágio do processamento).
+
+    Returns:
+        dict: input_file, arquivo, df (linhas válidas), rejeitados e total_planilha.
+    """
+    arquivo = os.path.basename(input_file)
+    print(f"Processando arquivo: {input_file}")
+
+    if not os.path.exists(input_file):
+        raise FileNotFoundError(
+            f"Arquivo de entrada não encontrado: {input_file}")
+
+    df = ler_excel_em_cache(input_file)
+    print(f"Planilha carregada com {len(df)} registros.")
+
+    # Converte a coluna 'DATA DE ENVIO' para datetime
+    df['DATA DE ENVIO'] = pd.to_datetime(
+        df['DATA DE ENVIO'], errors='coerce')
+
+    required_columns = ['NUMERO CARTÃO',
+                        'TXN', 'VALOR', 'DATA DE ENVIO']
+    if not all(col in df.columns for col in required_columns):
+        raise ValueError(
+            "Colunas necessárias não encontradas na planilha.")
+
+    # Linhas inválidas vão para a planilha de rejeitados, anexada à notificação
+    total_planilha = len(df)
+    df, rejeitados = validar_registros(df)
+    return {
+        'input_file': input_file,
+        'arquivo': arquivo,
+        'df': df,
+        'rejeitados': rejeitados,
+        'total_planilha': total_planilha,
+    }
+
+
+def gerar_lote(planilha, batch_number):
+    """
+    Gera o(s) arquivo(s) OFFLINE da planilha carregada a partir do lote
+    informado (um lote por parte quando a planilha é dividida).
+
+    Returns:
+        dict: A planilha acrescida de batch_number, current_datetime, partes,
+        manifesto e anexos_rejeitados.
+    """
+    current_datetime = datetime.now()
+    anexos_rejeitados = []
+    if len(planilha['rejeitados']):
+        caminho_rejeitados = os.path.join(
+            OUTPUT_DIR, f"REJEITADOS_{batch_number:06d}_{current_datetime.strftime('%d%m%Y_%H%M')}.xlsx")
+        anexos_rejeitados.append(salvar_rejeitados(planilha['rejeitados'], caminho_rejeitados))
+    # O lote no nome: o email do lote anterior ainda pode estar na caixa de saída
+    # com o arquivo dele anexado, e dois lotes podem ser gerados no mesmo minuto
+    output_filename = f"COMPANY_OFFLINE_{batch_number:06d}_{current_datetime.strftime('%d%m%Y_%H%M')}.txt"
+    output_path = os.path.join(OUTPUT_DIR, output_filename)
+
+    partes, manifesto = gerar_arquivos(planilha['df'], output_path, batch_number,
+                                       arquivo_origem=planilha['arquivo'])
+    return dict(planilha, batch_number=batch_number, current_datetime=current_datetime,
+                partes=partes, manifesto=manifesto, anexos_rejeitados=anexos_rejeitados)
+
+
+def descartar_lote(lote):
+    """Remove os arquivos de um lote gerado que não chegou a ser concluído."""
+    gerados = [c for parte in lote['partes'] for c in [parte['caminho']] + parte['copias']]
+    for caminho in gerados + [lote['manifesto']] + lote['anexos_rejeitados']:
+        if caminho and os.path.exists(caminho):
+            os.remove(caminho)
+            print(f"Arquivo descartado: {caminho}")
+
+
+def concluir_processamento(lote, caixa_saida):
+    """
+    Atualiza o controle e o índice de processados, enfileira a notificação e
+    guarda a planilha no histórico (último estágio do processamento).
+
+    Returns:
+        int: Quantidade de registros gerados.
+    """
+    input_file = lote['input_file']
+    arquivo = lote['arquivo']
+    batch_number = lote['batch_number']
+    partes = lote['partes']
+    manifesto = lote['manifesto']
+    total_planilha = lote['total_planilha']
+    current_datetime = lote['current_datetime']
+
+    for parte in partes:
+        update_control_file(parte['lote'], parte['registros'])
+    successful_records = sum(parte['registros'] for parte in partes)
+    arquivos_gerados = descrever_partes(partes)
+
+    obter_indice_processados().registrar(input_file, batch_number, arquivos_gerados)
+
+    remetente = EMAIL_PADRAO
+    destinatarios = [EMAIL_PADRAO]
+    assunto = f"Processamento de Transações OFFLINE_{batch_number:06d}"
+    
+    corpo = f"""
+    <html>
+    <body>
+        <h2>Processamento de Transações Concluído</h2>
+        <p>O processamento do lote OFFLINE_<b>{batch_number:06d}</b> foi concluído com sucesso.</p>
+        <p><b>Detalhes do processamento:</b></p>
+        <ul>
+            <li>Arquivo processado: {arquivo}</li>
+            <li>Arquivo gerado: {arquivos_gerados}</li>
+            <li>Total de registros processados: {successful_records}</li>
+            <li>Total de registros na planilha original: {total_planilha}</li>
+            <li>Registros rejeitados na validação: {len(lote['rejeitados'])}</li>
+            <li>Data e hora do processamento: {current_datetime.strftime('%d/%m/%Y %H:%M:%S')}</li>
+        </ul>
+        <p>Este é um email automático, por favor não responda.</p>
+    </body>
+    </html>
+    """
+    
+    anexos = [parte['caminho'] for parte in partes] + ([manifesto] if manifesto else []) + lote['anexos_rejeitados']
+    
+    # O envio (com failover entre servidores) ocorre em segundo plano
+    caixa_saida.enfileirar(remetente, destinatarios, assunto, corpo, anexos)
+
+    print(
+        f"Total de registros processados com sucesso: {successful_records}")
+    print(f"Total de registros na planilha original: {total_planilha}")
+    if successful_records < total_planilha:
+        print(
+            f"Atenção: {total_planilha - successful_records} registros não foram processados.")
+
+    # Mover ou copiar o arquivo para o histórico
+    arquivo_destino = os.path.join(HISTORICO_DIR, arquivo)
+    if MOVER_ARQUIVO_ORIGINAL:
+        shutil.move(input_file, arquivo_destino)
+        print(
+            f"Arquivo original movido para o histórico: {arquivo_destino}")
+    else:
+        shutil.copy2(input_file, arquivo_destino)
+        print(f"Arquivo original mantido em: {input_file}")
+        print(f"Cópia do arquivo salva em: {arquivo_destino}")
+
+    return successful_records
+
+
+def processar_arquivo(input_file, batch_number, caixa_saida):
+    """
+    Gera o arquivo OFFLINE de uma planilha TXN com o lote informado (um lote por
+    parte quando a planilha é dividida), atualiza o controle, enfileira a
+    notificação e guarda a planilha no histórico.
+
+    Returns:
+        int: Quantidade de registros gerados.
+    """
+    lote = gerar_lote(carregar_planilha(input_file), batch_number)
+    return concluir_processamento(lote, caixa_saida)
+
+
+def servidores_smtp():
+    # Montado na execução para refletir SERVIDOR_SMTP/PORTA_SMTP de um perfil (ver perfis.py)
+    return SERVIDORES_SMTP or [
+        SERVIDOR_PRIMARIO,
+        {'nome': 'secundario', 'host': SERVIDOR_SMTP, 'porta': PORTA_SMTP, 'seguranca': 'ssl'},
+    ]
+
+
+def criar_caixa_saida():
+    caixa_saida = CaixaSaidaEmail(OUTBOX_DIR, servidores_smtp(), EMAIL_PADRAO, SENHA_PADRAO)
+    caixa_saida.iniciar()
+    return caixa_saida
+
+
+def ingerir_anexos_email(usuario=EMAIL_PADRAO, senha=SENHA_PADRAO, monitorar=False):
+    """
+    Recebe por IMAP as planilhas TXN anexadas aos emails de PASTA_INGESTAO,
+    gravando-as em INGESTAO_DIR, e gera o arquivo OFFLINE de cada uma assim que
+    ela chega. Com monitorar=True a pasta é verificada a cada INTERVALO_INGESTAO
+    segundos até o processo ser encerrado.
+    """
+    caixa_saida = criar_caixa_saida()
+
+    def ao_receber(caminho, dados):
+        registro = obter_indice_processados().consultar(caminho)
+        if registro:
+            print(f"Anexo {dados['nome_original']} ignorado: conteúdo já processado no lote {registro.get('lote')}.")
+            return
+        batch_number = get_next_batch_number()
+        print(f"Número do lote: {batch_number}")
+        try:
+            processar_arquivo(caminho, batch_number, caixa_saida)
+        except Exception as e:
+            print(f"Erro ao processar o anexo {dados['nome_original']}: {e}")
+            corpo = f"""
+            <html>
+            <body>
+                <h2>Log de processamento - OFFLINE_{batch_number:06d}</h2>
+                <p>Erro ao processar a planilha <b>{dados['nome_original']}</b> recebida por email:</p>
+                <p style="color: red; font-weight: bold;">{str(e)}</p>
+                <p>Data e hora do erro: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}</p>
+                <p>Este é um email automático, por favor não responda.</p>
+            </body>
+            </html>
+            """
+            caixa_saida.enfileirar(EMAIL_PADRAO, [EMAIL_PADRAO],
+                                   "ERRO - Processamento de Transações OFFLINE", corpo)
+
+    def conectar():
+        mail = imaplib.IMAP4_SSL(SERVIDOR_IMAP, PORTA_IMAP)
+        mail.login(usuario, senha)
+        return mail
+
+    try:
+        if monitorar:
+            monitorar_anexos(conectar, usuario, PASTA_INGESTAO, ESTADO_IMAP_FILE,
+                             INGESTAO_DIR, ao_receber, INTERVALO_INGESTAO)
+        else:
+            mail = conectar()
+            try:
+                ingerir_anexos(mail, usuario, PASTA_INGESTAO, ESTADO_IMAP_FILE,
+                               INGESTAO_DIR, ao_receber)
+            finally:
+                mail.logout()
+    finally:
+        if not caixa_saida.aguardar(TEMPO_ESPERA_EMAILS):
+            print(f"Emails pendentes permanecem na caixa de saída para a próxima execução: {OUTBOX_DIR}")
+        caixa_saida.parar()
+
+
 def main():
     batch_number = 0  # Inicializar a variável para evitar erro no bloco de exceção
+    caixa_saida = criar_caixa_saida()
     try:
         print(f"Iniciando processamento em {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
         
@@ -372,7 +579,7 @@ def main():
             
             # Diagnóstico adicional
             print("\nDiagnóstico de diretório:")
-            todos_arquivos = os.listdir(INPUT_DIR)
+            todos_arquivos, _ = listar_candidatos(INPUT_DIR)
             print(f"Total de arquivos no diretório: {len(todos_arquivos)}")
             if len(todos_arquivos) > 0:
                 print("Primeiros 10 arquivos no diretório:")
@@ -380,7 +587,6 @@ def main():
                     print(f"  {i+1}. {arquivo}")
             
             remetente = EMAIL_PADRAO
-            senha = SENHA_PADRAO
             destinatarios = [EMAIL_PADRAO]
             assunto = "Informação - Processamento de Transações OFFLINE"
             
@@ -395,103 +601,31 @@ def main():
             </html>
             """
             
-            try:
-                enviar_email_primario(remetente, destinatarios, assunto, corpo, senha)
-            except Exception as email_error:
-                print(f"Erro ao enviar email via servidor primário: {email_error}")
-                try:
-                    enviar_email_secundario(remetente, destinatarios, assunto, corpo, senha)
-                except Exception as secondary_error:
-                    print(f"Erro ao enviar email via servidor secundário: {secondary_error}")
+            caixa_saida.enfileirar(remetente, destinatarios, assunto, corpo)
             return
 
         print(f"Encontrados {len(arquivos_entrada)} arquivos para processamento.")
 
-        for arquivo in arquivos_entrada:
-            INPUT_FILE = os.path.join(INPUT_DIR, arquivo)
-            print(f"Processando arquivo: {INPUT_FILE}")
+        # Leitura da próxima planilha, geração da atual e conclusão da anterior
+        # ocorrem ao mesmo tempo. Os lotes são numerados na geração, pois o
+        # controle só é atualizado no último estágio.
+        proximo_lote = get_next_batch_number()
 
-            if not os.path.exists(INPUT_FILE):
-                raise FileNotFoundError(
-                    f"Arquivo de entrada não encontrado: {INPUT_FILE}")
-
-            df = pd.read_excel(INPUT_FILE)
-            print(f"Planilha carregada com {len(df)} registros.")
-
-            # Converte a coluna 'DATA DE ENVIO' para datetime
-            df['DATA DE ENVIO'] = pd.to_datetime(
-                df['DATA DE ENVIO'], errors='coerce')
-
-            required_columns = ['NUMERO CARTÃO',
-                                'TXN', 'VALOR', 'DATA DE ENVIO']
-            if not all(col in df.columns for col in required_columns):
-                raise ValueError(
-                    "Colunas necessárias não encontradas na planilha.")
-
-            batch_number = get_next_batch_number()
+        def gerar(planilha):
+            nonlocal batch_number, proximo_lote
+            batch_number = proximo_lote
             print(f"Número do lote: {batch_number}")
-
-            current_datetime = datetime.now()
-            output_filename = f"COMPANY_OFFLINE_{current_datetime.strftime('%d%m%Y_%H%M')}.txt"
-            output_path = os.path.join(OUTPUT_DIR, output_filename)
-
-            successful_records = generate_file(df, output_path, batch_number)
-
-            update_control_file(batch_number, successful_records)
-
-            remetente = EMAIL_PADRAO
-            senha = SENHA_PADRAO
-            destinatarios = [EMAIL_PADRAO]
-            assunto = f"Processamento de Transações OFFLINE_{batch_number:06d}"
-            
-            corpo = f"""
-            <html>
-            <body>
-                <h2>Processamento de Transações Concluído</h2>
-                <p>O processamento do lote OFFLINE_<b>{batch_number:06d}</b> foi concluído com sucesso.</p>
-                <p><b>Detalhes do processamento:</b></p>
-                <ul>
-                    <li>Arquivo processado: {arquivo}</li>
-                    <li>Arquivo gerado: {output_filename}</li>
-                    <li>Total de registros processados: {successful_records}</li>
-                    <li>Total de registros na planilha original: {len(df)}</li>
-                    <li>Data e hora do processamento: {current_datetime.strftime('%d/%m/%Y %H:%M:%S')}</li>
-                </ul>
-                <p>Este é um email automático, por favor não responda.</p>
-            </body>
-            </html>
-            """
-            
-            anexos = [output_path]
-            
-            try:
-                enviar_email_primario(remetente, destinatarios, assunto, corpo, senha, anexos)
-            except Exception as email_error:
-                print(f"Erro ao enviar email via servidor primário: {email_error}")
-                # Tentar enviar via servidor secundário como fallback
-                try:
-                    print("Tentando enviar email via servidor secundário como alternativa...")
-                    enviar_email_secundario(remetente, destinatarios, assunto, corpo, senha, anexos)
-                except Exception as secondary_error:
-                    print(f"Erro ao enviar email via servidor secundário: {secondary_error}")
-
-            print(
-                f"Total de registros processados com sucesso: {successful_records}")
-            print(f"Total de registros na planilha original: {len(df)}")
-            if successful_records < len(df):
-                print(
-                    f"Atenção: {len(df) - successful_records} registros não foram processados.")
-
-            # Mover ou copiar o arquivo para o histórico
-            arquivo_destino = os.path.join(HISTORICO_DIR, arquivo)
-            if MOVER_ARQUIVO_ORIGINAL:
-                shutil.move(INPUT_FILE, arquivo_destino)
-                print(
-                    f"Arquivo original movido para o histórico: {arquivo_destino}")
-            else:
-                shutil.copy2(INPUT_FILE, arquivo_destino)
-                print(f"Arquivo original mantido em: {INPUT_FILE}")
-                print(f"Cópia do arquivo salva em: {arquivo_destino}")
+            lote = gerar_lote(planilha, batch_number)
+            proximo_lote = lote['partes'][-1]['lote'] + 1
+            return lote
+
+        executar_pipeline(
+            [os.path.join(INPUT_DIR, arquivo) for arquivo in arquivos_entrada],
+            [
+                ('leitura', carregar_planilha),
+                ('geracao', gerar, descartar_lote),
+                ('conclusao', lambda lote: concluir_processamento(lote, caixa_saida)),
+            ])
 
         print(f"Processamento concluído em {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
 
@@ -502,7 +636,6 @@ def main():
         # Enviar email de erro
         try:
             remetente = EMAIL_PADRAO
-            senha = SENHA_PADRAO
             destinatarios = [EMAIL_PADRAO]
             assunto = "ERRO - Processamento de Transações OFFLINE"
 
@@ -518,20 +651,19 @@ def main():
             </html>
             """
 
-            try:
-                enviar_email_primario(remetente, destinatarios, assunto, corpo, senha)
-            except Exception as email_error:
-                print(f"Erro ao enviar email de erro via servidor primário: {email_error}")
-                # Tentar enviar via servidor secundário como fallback
-                try:
-                    print("Tentando enviar email de erro via servidor secundário como alternativa...")
-                    enviar_email_secundario(remetente, destinatarios, assunto, corpo, senha)
-                except Exception as secondary_error:
-                    print(f"Erro ao enviar email de erro via servidor secundário: {secondary_error}")
+            caixa_saida.enfileirar(remetente, destinatarios, assunto, corpo)
         except Exception as email_error:
             print(
                 f"Erro ao enviar email de notificação de erro: {email_error}")
 
+    finally:
+        if not caixa_saida.aguardar(TEMPO_ESPERA_EMAILS):
+            print(f"Emails pendentes permanecem na caixa de saída para a próxima execução: {OUTBOX_DIR}")
+        caixa_saida.parar()
+
 
 if __name__ == "__main__":
-    main()
+    if '--email' in sys.argv:
+        ingerir_anexos_email(monitorar=True)
+    else:
+        main()
@@ -0,0 +1,96 @@
+import math
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+import numpy as np
+import pandas as pd
+
+COLUNA_CENTAVOS = 'VALOR CENTAVOS'  # Coluna int64 criada por validar_registros
+# Distância máxima (em centavos) de valor*100 até o inteiro mais próximo para o
+# valor ser tratado como já em centavos exatos (só o erro de representação do float)
+TOLERANCIA_GRADE = 1e-6
+
+
+def _centavos_exatos(valor):
+    """Centavos de um valor, ou None se vazio/inválido. O texto é convertido em Decimal, sem float."""
+    if valor is None or isinstance(valor, (bool, np.bool_)):
+        return None
+    if isinstance(valor, (int, np.integer)):
+        return int(valor) * 100
+    if isinstance(valor, (float, np.floating)):
+        if not math.isfinite(valor):
+            return None
+        # Célula numérica do Excel: o menor texto que representa o float (0.29, não 0.28999...)
+        texto = repr(float(valor))
+    else:
+        texto = str(valor).strip()
+    try:
+        numero = Decimal(texto)
+    except InvalidOperation:
+        return None
+    if not numero.is_finite():
+        return None
+    return int(numero.scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def para_centavos(valores):
+    """
+    Converte valores em reais para centavos inteiros, arredondando meio
+    centavo para longe do zero (como nas planilhas), em vez de truncar o
+    float como int(valor * 100). O valor é lido como texto decimal exato
+    (1.005 vira 101 centavos), nunca multiplicado em ponto flutuante.
+
+    Aceita um valor único (devolve int; ValueError se inválido) ou uma
+    coluna/array. Colunas numéricas são convertidas de uma vez com NumPy; só
+    os valores fora da grade de centavos (ex.: 1.005) e as células de texto
+    passam pelo Decimal. A coluna devolvida é int64, ou Int64 com <NA> nos
+    vazios ou não numéricos quando houver algum.
+    """
+    if np.ndim(valores) == 0:
+        centavos = _centavos_exatos(valores)
+        if centavos is None:
+            raise ValueError(f"Valor inválido: {valores}")
+        return centavos
+
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores)
+    if pd.api.types.is_integer_dtype(serie.dtype) and not serie.hasnans:
+        return serie.astype('int64') * 100
+    if not pd.api.types.is_float_dtype(serie.dtype):
+        # Texto ou tipos misturados: cada célula pelo Decimal
+        centavos = [_centavos_exatos(valor) for valor in serie.to_numpy(dtype=object)]
+        return _serie_centavos(np.array([c or 0 for c in centavos], dtype='int64'),
+                               np.array([c is None for c in centavos]), serie.index)
+
+    numeros = serie.to_numpy(dtype='float64', na_value=np.nan)
+    validos = np.isfinite(numeros) & (np.abs(numeros) < 2.0 ** 63 / 100)  # centavos cabem em int64
+    escalados = np.where(validos, numeros, 0) * 100
+    arredondados = np.rint(escalados)
+    centavos = arredondados.astype('int64')
+    fora_da_grade = np.flatnonzero(np.abs(escalados - arredondados) > TOLERANCIA_GRADE)
+    for posicao in fora_da_grade:
+        centavos[posicao] = _centavos_exatos(numeros[posicao])
+    return _serie_centavos(centavos, ~validos, serie.index)
+
+
+def _serie_centavos(centavos, invalidos, indice):
+    if invalidos.any():
+        return pd.Series(pd.arrays.IntegerArray(centavos, invalidos), index=indice)
+    return pd.Series(centavos, index=indice)
+
+
+def coluna_centavos(df, coluna='VALOR'):
+    """Centavos da planilha: a coluna já convertida na validação ou a conversão de `coluna`."""
+    if COLUNA_CENTAVOS in df.columns:
+        return df[COLUNA_CENTAVOS]
+    return para_centavos(df[coluna])
+
+
+def formatar_centavos(centavos, largura):
+    """Centavos com zeros à esquerda (largura do campo no layout); <NA> continua <NA>."""
+    if np.ndim(centavos) == 0:
+        return f"{int(centavos):0{largura}d}"
+    return pd.Series(centavos).astype('Int64').astype('string').str.zfill(largura)
+
+
+def somar_centavos(centavos):
+    """Soma inteira (int64) dos centavos, ignorando <NA>."""
+    return int(pd.Series(centavos).astype('Int64').to_numpy(dtype='int64', na_value=0).sum())
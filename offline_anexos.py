@@ -0,0 +1,215 @@
+import base64
+import gzip
+import io
+import os
+import shutil
+import smtplib
+import tempfile
+import uuid
+import zipfile
+from email import policy
+from email.generator import BytesGenerator
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+# Arquivos acima deste tamanho são compactados antes do envio
+LIMITE_COMPRESSAO_BYTES = 256 * 1024
+# Acima deste tamanho (já compactado) o email leva apenas o caminho do arquivo
+LIMITE_ANEXO_BYTES = 15 * 1024 * 1024
+FORMATO_COMPRESSAO = 'zip'  # 'zip' ou 'gzip'
+
+TAMANHO_BLOCO = 1024 * 1024
+# Múltiplo de 57 bytes: cada bloco vira linhas base64 completas de 76 caracteres
+BLOCO_BASE64 = 57 * 1024
+TAMANHO_BUFFER_ENVIO = 64 * 1024
+
+
+def compactar_arquivo(caminho, diretorio_destino, formato=FORMATO_COMPRESSAO):
+    """
+    Compacta o arquivo em streaming (sem carregá-lo inteiro em memória).
+
+    Returns:
+        str: Caminho do arquivo compactado gerado em diretorio_destino.
+    """
+    nome = os.path.basename(caminho)
+    if formato == 'gzip':
+        destino = os.path.join(diretorio_destino, f"{nome}.gz")
+        with open(caminho, 'rb') as origem, gzip.open(destino, 'wb', compresslevel=6) as saida:
+            shutil.copyfileobj(origem, saida, TAMANHO_BLOCO)
+    else:
+        destino = os.path.join(diretorio_destino, f"{os.path.splitext(nome)[0]}.zip")
+        with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+            with open(caminho, 'rb') as origem, zf.open(nome, 'w', force_zip64=True) as saida:
+                shutil.copyfileobj(origem, saida, TAMANHO_BLOCO)
+    return destino
+
+
+def preparar_anexos(anexos, diretorio_temp, limite_compressao=LIMITE_COMPRESSAO_BYTES,
+                    limite_anexo=LIMITE_ANEXO_BYTES, formato=FORMATO_COMPRESSAO):
+    """
+    Decide, para cada anexo, se vai como está, compactado ou apenas como referência.
+
+    Os arquivos compactados são gerados em diretorio_temp, que deve ser
+    removido pelo chamador após o envio. Um anexo que não existe não impede
+    o envio; ele é listado em ausentes para ser citado no corpo do email.
+
+    Returns:
+        tuple: (arquivos_para_anexar, referencias, ausentes), onde referencias
+        são tuplas (caminho, tamanho) dos arquivos grandes demais para anexar.
+    """
+    arquivos = []
+    referencias = []
+    ausentes = []
+    for arquivo in anexos or []:
+        if not os.path.isfile(arquivo):
+            print(f"Anexo não encontrado: {arquivo}")
+            ausentes.append(arquivo)
+            continue
+        tamanho = os.path.getsize(arquivo)
+        caminho_envio = arquivo
+        if tamanho > limite_compressao:
+            caminho_envio = compactar_arquivo(arquivo, diretorio_temp, formato)
+            tamanho_compactado = os.path.getsize(caminho_envio)
+            print(f"Anexo {os.path.basename(arquivo)} compactado: {tamanho} -> {tamanho_compactado} bytes")
+            tamanho = tamanho_compactado
+        if tamanho > limite_anexo:
+            referencias.append((arquivo, os.path.getsize(arquivo)))
+            continue
+        arquivos.append(caminho_envio)
+    return arquivos, referencias, ausentes
+
+
+def _corpo_com_referencias(corpo, subtipo, referencias, ausentes=()):
+    if not referencias and not ausentes:
+        return corpo
+    if subtipo == 'html':
+        aviso = ""
+        if referencias:
+            itens = "".join(
+                f"<li>{os.path.basename(c)} ({t / (1024 * 1024):.1f} MB): {c}</li>" for c, t in referencias)
+            aviso += f"<p>Os arquivos abaixo excedem o limite para anexo e estão disponíveis em:</p><ul>{itens}</ul>"
+        if ausentes:
+            itens = "".join(f"<li>{c}</li>" for c in ausentes)
+            aviso += f"<p>Os anexos abaixo não foram encontrados no momento do envio:</p><ul>{itens}</ul>"
+        if '</body>' in corpo:
+            return corpo.replace('</body>', f"{aviso}</body>", 1)
+        return corpo + aviso
+    if referencias:
+        linhas = "\n".join(f"- {os.path.basename(c)} ({t / (1024 * 1024):.1f} MB): {c}" for c, t in referencias)
+        corpo = f"{corpo}\n\nOs arquivos abaixo excedem o limite para anexo e estão disponíveis em:\n{linhas}\n"
+    if ausentes:
+        linhas = "\n".join(f"- {c}" for c in ausentes)
+        corpo = f"{corpo}\n\nOs anexos abaixo não foram encontrados no momento do envio:\n{linhas}\n"
+    return corpo
+
+
+def _tipo_mime(caminho):
+    if caminho.endswith('.zip'):
+        return 'application', 'zip'
+    if caminho.endswith('.gz'):
+        return 'application', 'gzip'
+    return 'application', 'octet-stream'
+
+
+def escrever_mensagem(destino, remetente, destinatarios, assunto, corpo, arquivos, subtipo='html'):
+    """
+    Grava a mensagem MIME completa em disco, codificando os anexos em base64
+    bloco a bloco. A estrutura (cabeçalhos, partes, boundaries) é gerada pela
+    biblioteca email com marcadores no lugar dos anexos.
+    """
+    mensagem = MIMEMultipart(policy=policy.SMTP)
+    mensagem['From'] = remetente
+    mensagem['To'] = ", ".join(destinatarios)
+    mensagem['Subject'] = assunto
+    mensagem.attach(MIMEText(corpo, subtipo, 'utf-8', policy=policy.SMTP))
+
+    marcadores = {}
+    for arquivo in arquivos:
+        marcador = f"@@ANEXO_{uuid.uuid4().hex}@@"
+        marcadores[marcador.encode('ascii')] = arquivo
+        nome = os.path.basename(arquivo)
+        parte = MIMEBase(*_tipo_mime(arquivo), policy=policy.SMTP, name=nome)
+        parte['Content-Transfer-Encoding'] = 'base64'
+        parte['Content-Disposition'] = f'attachment; filename="{nome}"'
+        parte.set_payload(marcador)
+        mensagem.attach(parte)
+
+    estrutura = io.BytesIO()
+    BytesGenerator(estrutura, policy=policy.SMTP).flatten(mensagem)
+    conteudo = estrutura.getvalue()
+
+    with open(destino, 'wb') as saida:
+        for linha in conteudo.splitlines(keepends=True):
+            arquivo = marcadores.get(linha.strip())
+            if arquivo is None:
+                saida.write(linha)
+                continue
+            with open(arquivo, 'rb') as origem:
+                for bloco in iter(lambda: origem.read(BLOCO_BASE64), b''):
+                    codificado = base64.b64encode(bloco)
+                    for i in range(0, len(codificado), 76):
+                        saida.write(codificado[i:i + 76] + b'\r\n')
+
+
+def enviar_mensagem_de_arquivo(sessao, remetente, destinatarios, caminho_mensagem):
+    """
+    Envia pela sessão SMTP uma mensagem já gravada em disco, transmitindo-a em
+    blocos (com dot-stuffing) em vez de montar a mensagem inteira em memória.
+    """
+    sessao.ehlo_or_helo_if_needed()
+    codigo, resposta = sessao.mail(remetente)
+    if codigo != 250:
+        sessao.rset()
+        raise smtplib.SMTPSenderRefused(codigo, resposta, remetente)
+    recusados = {}
+    for destinatario in destinatarios:
+        codigo, resposta = sessao.rcpt(destinatario)
+        if codigo not in (250, 251):
+            recusados[destinatario] = (codigo, resposta)
+    if len(recusados) == len(destinatarios):
+        sessao.rset()
+        raise smtplib.SMTPRecipientsRefused(recusados)
+    codigo, resposta = sessao.docmd('data')
+    if codigo != 354:
+        sessao.rset()
+        raise smtplib.SMTPDataError(codigo, resposta)
+
+    buffer = bytearray()
+    with open(caminho_mensagem, 'rb') as f:
+        for linha in f:
+            if linha.startswith(b'.'):
+                buffer += b'.'
+            buffer += linha
+            if not linha.endswith(b'\r\n'):
+                buffer += b'\r\n'
+            if len(buffer) >= TAMANHO_BUFFER_ENVIO:
+                sessao.send(bytes(buffer))
+                buffer.clear()
+    buffer += b'.\r\n'
+    sessao.send(bytes(buffer))
+    codigo, resposta = sessao.getreply()
+    if codigo != 250:
+        raise smtplib.SMTPDataError(codigo, resposta)
+    return recusados
+
+
+def enviar_email_com_anexos(sessao, remetente, destinatarios, assunto, corpo, anexos=None,
+                            subtipo='html', diretorio_temp=None,
+                            limite_compressao=LIMITE_COMPRESSAO_BYTES,
+                            limite_anexo=LIMITE_ANEXO_BYTES, formato=FORMATO_COMPRESSAO):
+    """
+    Monta e envia o email pela sessão SMTP informada: anexos grandes são
+    compactados, os que excedem o limite viram referência no corpo, e a
+    mensagem é gravada e transmitida em streaming.
+    """
+    diretorio_trabalho = tempfile.mkdtemp(prefix='email_', dir=diretorio_temp)
+    try:
+        arquivos, referencias, ausentes = preparar_anexos(
+            anexos, diretorio_trabalho, limite_compressao, limite_anexo, formato)
+        corpo = _corpo_com_referencias(corpo, subtipo, referencias, ausentes)
+        caminho_mensagem = os.path.join(diretorio_trabalho, 'mensagem.eml')
+        escrever_mensagem(caminho_mensagem, remetente, destinatarios, assunto, corpo, arquivos, subtipo)
+        return enviar_mensagem_de_arquivo(sessao, remetente, destinatarios, caminho_mensagem)
+    finally:
+        shutil.rmtree(diretorio_trabalho, ignore_errors=True)
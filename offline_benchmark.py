@@ -0,0 +1,269 @@
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from moeda import coluna_centavos, somar_centavos
+from offline_gravacao import GravadorMultiplo
+from offline_validacao import validar_registros
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+SEMENTE = 20240601
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'offline_benchmark_golden.json')
+
+# Distribuições sintéticas: BINs por bandeira, códigos TXN e valores (lognormal, em reais)
+BINS = [('411111', 0.35), ('453211', 0.20), ('516292', 0.20), ('549167', 0.15), ('650487', 0.10)]
+CODIGOS_TXN = [(1, 0.55), (2, 0.20), (3, 0.10), (20, 0.08), (150, 0.05), (9999, 0.02)]
+VALOR_MEDIA_LOG = 4.0
+VALOR_DESVIO_LOG = 1.1
+VALOR_MAXIMO = 50_000.00
+DIAS_DATAS = 30
+
+
+class _DataFixa(datetime):
+    """Substitui datetime nas rotinas para que header e trailer sejam reprodutíveis."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 1, 15, 16, 30, 0)
+
+
+def _digitos_luhn(matriz):
+    """Dígito verificador de Luhn para cada linha da matriz de dígitos (sem o verificador)."""
+    dobrados = matriz[:, -1::-2] * 2
+    dobrados = np.where(dobrados > 9, dobrados - 9, dobrados)
+    soma = dobrados.sum(axis=1) + matriz[:, -2::-2].sum(axis=1)
+    return (10 - soma % 10) % 10
+
+
+def sintetizar_transacoes(quantidade, semente=SEMENTE):
+    """
+    Gera uma planilha TXN sintética (como lida do Excel) com cartões válidos
+    de 16 dígitos, códigos TXN e valores com distribuição próxima da real.
+    """
+    rng = np.random.default_rng(semente)
+    bins, pesos_bins = zip(*BINS)
+    escolhidos = rng.choice(len(bins), size=quantidade, p=pesos_bins)
+    matriz_bins = np.array([[int(d) for d in b] for b in bins], dtype=np.int64)
+    matriz = np.hstack([matriz_bins[escolhidos], rng.integers(0, 10, size=(quantidade, 9))])
+    matriz = np.hstack([matriz, _digitos_luhn(matriz)[:, None]])
+    cartoes = matriz @ (10 ** np.arange(15, -1, -1, dtype=np.int64))
+
+    codigos, pesos_codigos = zip(*CODIGOS_TXN)
+    txn = rng.choice(np.array(codigos), size=quantidade, p=pesos_codigos)
+    valores = np.round(np.clip(rng.lognormal(VALOR_MEDIA_LOG, VALOR_DESVIO_LOG, quantidade), 0.01, VALOR_MAXIMO), 2)
+    datas = (np.datetime64('2026-01-15') - rng.integers(0, DIAS_DATAS, size=quantidade).astype('timedelta64[D]'))
+
+    return pd.DataFrame({
+        'NUMERO CARTÃO': cartoes,
+        'TXN': txn,
+        'VALOR': valores,
+        'DATA DE ENVIO': datas,
+    })
+
+
+def _medir(funcao, medir_memoria):
+    """Executa funcao() e devolve (resultado, segundos, pico de memória em MB ou None)."""
+    if medir_memoria:
+        tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        resultado = funcao()
+        duracao = time.perf_counter() - inicio
+    finally:
+        pico = None
+        if medir_memoria:
+            pico = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+    return resultado, duracao, pico
+
+
+def medir_rotina(rotina, quantidade, diretorio, semente=SEMENTE, medir_memoria=True):
+    """
+    Mede as etapas da geração para uma planilha sintética de `quantidade` linhas:
+    preparação (datas e validação do DataFrame já carregado; a leitura do
+    Excel não entra), formatação (create_detail_record/
+    create_trailer, sem escrita), escrita das linhas já formatadas e
+    generate_file completo. Com medir_memoria, cada etapa é repetida sob
+    tracemalloc para obter o pico de memória sem distorcer os tempos.
+    """
+    modulo = importlib.import_module(rotina)
+    datetime_original = modulo.datetime
+    modulo.datetime = _DataFixa
+    try:
+        bruto = sintetizar_transacoes(quantidade, semente)
+
+        def preparar():
+            df = bruto.copy()
+            df['DATA DE ENVIO'] = pd.to_datetime(df['DATA DE ENVIO'], errors='coerce')
+            return validar_registros(df)[0]
+
+        def formatar():
+            linhas = [modulo.create_header(1)]
+            for sequencia, (cartao, txn, valor, data) in enumerate(zip(
+                    df['NUMERO CARTÃO'], df['TXN'], df['VALOR'], df['DATA DE ENVIO'].dt.strftime('%Y-%m-%d')), 1):
+                linhas.append(modulo.create_detail_record(cartao, str(txn), valor, data, sequencia))
+            linhas.append(modulo.create_trailer(1, len(linhas) - 1, somar_centavos(coluna_centavos(df))))
+            return linhas
+
+        def escrever():
+            with GravadorMultiplo([os.path.join(diretorio, 'escrita.txt')]) as f:
+                for linha in linhas:
+                    f.write(linha + '\n')
+
+        caminho_saida = os.path.join(diretorio, f'{rotina}_{quantidade}.txt')
+
+        def gerar():
+            return modulo.generate_file(df, caminho_saida, 1)
+
+        df, t_preparar, _ = _medir(preparar, False)
+        linhas, t_formatar, _ = _medir(formatar, False)
+        _, t_escrever, _ = _medir(escrever, False)
+        registros, t_gerar, _ = _medir(gerar, False)
+        picos = {}
+        if medir_memoria:
+            for nome, funcao in (('preparacao', preparar), ('formatacao', formatar),
+                                 ('generate_file', gerar)):
+                picos[nome] = round(_medir(funcao, True)[2], 1)
+
+        inicio = time.perf_counter()
+        repeticoes = 10_000
+        for _ in range(repeticoes):
+            modulo.create_trailer(1, quantidade, 123456789)
+        t_trailer = (time.perf_counter() - inicio) / repeticoes
+
+        # Quebras de linha normalizadas para LF: o golden vale no Windows (CRLF) e no Linux
+        sha = hashlib.sha256()
+        tamanho_saida = 0
+        with open(caminho_saida, 'rb') as f:
+            for linha in f:
+                if linha.endswith(b'\r\n'):
+                    linha = linha[:-2] + b'\n'
+                sha.update(linha)
+                tamanho_saida += len(linha)
+        os.remove(caminho_saida)
+    finally:
+        modulo.datetime = datetime_original
+
+    return {
+        'rotina': rotina,
+        'tamanho': quantidade,
+        'registros_gerados': registros,
+        'preparacao_s': round(t_preparar, 4),
+        'formatacao_s': round(t_formatar, 4),
+        'escrita_s': round(t_escrever, 4),
+        'generate_file_s': round(t_gerar, 4),
+        'detail_record_us': round(t_formatar / max(quantidade, 1) * 1e6, 3),
+        'trailer_us': round(t_trailer * 1e6, 3),
+        'registros_por_s': round(quantidade / t_gerar) if t_gerar else None,
+        'pico_memoria_mb': picos,
+        'bytes_saida': tamanho_saida,
+        'sha256_saida': sha.hexdigest(),
+    }
+
+
+def chave_golden(quantidade, semente):
+    # As rotinas geram o mesmo layout, então a referência vale para todas; a
+    # saída é comparada com as quebras de linha já normalizadas para LF
+    return f"{quantidade}|{semente}"
+
+
+def conferir_golden(resultado, golden, semente):
+    """Compara a saída com o golden; 'novo' quando ainda não há referência para o tamanho."""
+    referencia = golden.get(chave_golden(resultado['tamanho'], semente))
+    if referencia is None:
+        return 'novo'
+    if referencia == {'bytes': resultado['bytes_saida'], 'sha256': resultado['sha256_saida']}:
+        return 'ok'
+    return 'divergente'
+
+
+def _versao_codigo():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def comparar(resultados, arquivo_anterior):
+    with open(arquivo_anterior, 'r', encoding='utf-8') as f:
+        anteriores = {(r['rotina'], r['tamanho']): r for r in json.load(f)['resultados']}
+    print(f"\nComparação com {arquivo_anterior}:")
+    for r in resultados:
+        anterior = anteriores.get((r['rotina'], r['tamanho']))
+        if not anterior:
+            continue
+        for campo in ('preparacao_s', 'formatacao_s', 'escrita_s', 'generate_file_s'):
+            if anterior.get(campo):
+                variacao = (r[campo] - anterior[campo]) / anterior[campo] * 100
+                print(f"  {r['rotina']} {r['tamanho']:>9} {campo:<16} {anterior[campo]:>9.3f}s -> {r[campo]:>9.3f}s ({variacao:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do gerador de arquivos OFFLINE (sem SMTP nem rede).")
+    parser.add_argument('--rotina', default='ROTINAOFFLINE', help="Módulo com generate_file (ROTINAOFFLINE ou ROTINACADASTRAL).")
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=TAMANHOS_PADRAO)
+    parser.add_argument('--semente', type=int, default=SEMENTE)
+    parser.add_argument('--saida', default=f"benchmark_offline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    parser.add_argument('--golden', default=GOLDEN_FILE)
+    parser.add_argument('--atualizar-golden', action='store_true', help="Grava a saída atual como referência.")
+    parser.add_argument('--sem-memoria', action='store_true', help="Não mede o pico de memória (mais rápido).")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior para comparar os tempos.")
+    args = parser.parse_args()
+
+    try:
+        with open(args.golden, 'r', encoding='utf-8') as f:
+            golden = json.load(f)
+    except (OSError, ValueError):
+        golden = {}
+
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix='benchmark_offline_') as diretorio:
+        for quantidade in args.tamanhos:
+            print(f"Medindo {args.rotina} com {quantidade} linhas...")
+            resultado = medir_rotina(args.rotina, quantidade, diretorio, args.semente, not args.sem_memoria)
+            resultado['golden'] = conferir_golden(resultado, golden, args.semente)
+            if args.atualizar_golden:
+                golden[chave_golden(quantidade, args.semente)] = {
+                    'bytes': resultado['bytes_saida'], 'sha256': resultado['sha256_saida']}
+            print(f"  preparação {resultado['preparacao_s']:.3f}s | formatação {resultado['formatacao_s']:.3f}s | "
+                  f"escrita {resultado['escrita_s']:.3f}s | generate_file {resultado['generate_file_s']:.3f}s | "
+                  f"memória {resultado['pico_memoria_mb'] or '-'} | golden: {resultado['golden']}")
+            resultados.append(resultado)
+
+    relatorio = {
+        'executado_em': datetime.now().isoformat(timespec='seconds'),
+        'versao_codigo': _versao_codigo(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'plataforma': platform.platform(),
+        'semente': args.semente,
+        'resultados': resultados,
+    }
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"Resultados gravados em {args.saida}")
+
+    if args.atualizar_golden:
+        with open(args.golden, 'w', encoding='utf-8') as f:
+            json.dump(golden, f, indent=2, sort_keys=True)
+        print(f"Golden atualizado: {args.golden}")
+    if args.comparar:
+        comparar(resultados, args.comparar)
+    if any(r['golden'] == 'divergente' for r in resultados):
+        raise SystemExit("Saída diferente do golden.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (necessário para to_parquet/read_parquet)
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Diretório local (fora do compartilhamento de rede) onde ficam as planilhas já convertidas
+CACHE_DIR = os.getenv('OFFLINE_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.offline_cache', 'planilhas'))
+CACHE_LIMITE_BYTES = int(os.getenv('OFFLINE_CACHE_LIMITE_MB', '2048')) * 1024 * 1024
+INDICE_ARQUIVO = 'indice.json'
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+_cache_lock = threading.Lock()
+_aviso_pyarrow_exibido = False
+
+
+def _avisar_pyarrow_ausente():
+    """Avisa uma única vez, no primeiro uso do cache, que o pickle substituirá o Parquet."""
+    global _aviso_pyarrow_exibido
+    if PYARROW_AVAILABLE or _aviso_pyarrow_exibido:
+        return
+    _aviso_pyarrow_exibido = True
+    print("⚠️ pyarrow não instalado. O cache de planilhas usará pickle.")
+    print("Execute: pip install pyarrow")
+
+
+def calcular_hash_arquivo(caminho, tamanho_bloco=TAMANHO_BLOCO_HASH):
+    """Calcula o SHA-256 do arquivo lendo-o em blocos."""
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _carregar_indice(cache_dir):
+    caminho = os.path.join(cache_dir, INDICE_ARQUIVO)
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            indice = json.load(f)
+    except (OSError, ValueError):
+        indice = {}
+    indice.setdefault('fontes', {})
+    indice.setdefault('entradas', {})
+    return indice
+
+
+def _salvar_indice(cache_dir, indice):
+    caminho = os.path.join(cache_dir, INDICE_ARQUIVO)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(indice, f)
+    os.replace(temporario, caminho)
+
+
+def _hash_da_fonte(caminho, stat, indice):
+    """
+    Obtém o hash do arquivo de origem. Se tamanho e mtime não mudaram desde a
+    última leitura, reaproveita o hash do índice sem reler o arquivo da rede.
+
+    Returns:
+        tuple: (hash, conteudo), onde conteudo são os bytes lidos para o hash
+        (None quando o hash veio do índice), reaproveitados pelo read_excel.
+    """
+    chave_fonte = os.path.abspath(caminho)
+    fonte = indice['fontes'].get(chave_fonte)
+    if fonte and fonte['tamanho'] == stat.st_size and fonte['mtime_ns'] == stat.st_mtime_ns:
+        return fonte['hash'], None
+    with open(caminho, 'rb') as f:
+        conteudo = f.read()
+    hash_arquivo = hashlib.sha256(conteudo).hexdigest()
+    indice['fontes'][chave_fonte] = {
+        'tamanho': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': hash_arquivo,
+    }
+    return hash_arquivo, conteudo
+
+
+def _gravar_dataframe(df, destino_base):
+    """Grava o DataFrame em Parquet (ou pickle, se o Parquet não suportar os tipos)."""
+    if PYARROW_AVAILABLE:
+        destino = destino_base + '.parquet'
+        try:
+            df.to_parquet(destino, index=True)
+            return destino
+        except Exception as e:
+            print(f"Aviso: não foi possível gravar Parquet ({e}). Usando pickle.")
+            if os.path.exists(destino):
+                os.remove(destino)
+    destino = destino_base + '.pkl'
+    df.to_pickle(destino)
+    return destino
+
+
+def _ler_dataframe(caminho):
+    if caminho.endswith('.parquet'):
+        return pd.read_parquet(caminho)
+    return pd.read_pickle(caminho)
+
+
+def _remover_entrada(cache_dir, indice, chave):
+    entrada = indice['entradas'].pop(chave, None)
+    if entrada:
+        try:
+            os.remove(os.path.join(cache_dir, entrada['arquivo']))
+        except OSError:
+            pass
+
+
+def _aplicar_lru(cache_dir, indice, limite_bytes):
+    """Remove as entradas menos usadas até o cache caber no limite."""
+    entradas = indice['entradas']
+    total = sum(e['tamanho'] for e in entradas.values())
+    for chave in sorted(entradas, key=lambda c: entradas[c]['ultimo_acesso']):
+        if total <= limite_bytes:
+            break
+        total -= entradas[chave]['tamanho']
+        _remover_entrada(cache_dir, indice, chave)
+
+
+def ler_excel_em_cache(caminho, cache_dir=None, limite_bytes=None, **kwargs_read_excel):
+    """
+    Lê uma planilha Excel usando um cache local de DataFrames já convertidos.
+
+    A chave do cache é o hash do conteúdo do arquivo (obtido de tamanho e mtime
+    quando o arquivo não mudou) somado aos parâmetros de leitura. Em reprocessamentos
+    o DataFrame é carregado do cache sem nenhuma interpretação do Excel. Quando
+    o arquivo mudou, ele é lido da rede uma única vez: os mesmos bytes servem
+    para o hash e para o pd.read_excel.
+
+    Args:
+        caminho (str): Caminho da planilha (normalmente no compartilhamento de rede).
+        cache_dir (str): Diretório do cache. Padrão: CACHE_DIR.
+        limite_bytes (int): Tamanho máximo total do cache. Padrão: CACHE_LIMITE_BYTES.
+        **kwargs_read_excel: Parâmetros repassados para pd.read_excel.
+
+    Returns:
+        pd.DataFrame: Conteúdo da planilha.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    limite_bytes = CACHE_LIMITE_BYTES if limite_bytes is None else limite_bytes
+    _avisar_pyarrow_ausente()
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        stat = os.stat(caminho)
+        with _cache_lock:
+            indice = _carregar_indice(cache_dir)
+            hash_arquivo, conteudo = _hash_da_fonte(caminho, stat, indice)
+            parametros = json.dumps(kwargs_read_excel, sort_keys=True, default=str)
+            chave = hashlib.sha256(f"{hash_arquivo}|{parametros}".encode('utf-8')).hexdigest()
+            entrada = indice['entradas'].get(chave)
+            if entrada:
+                try:
+                    df = _ler_dataframe(os.path.join(cache_dir, entrada['arquivo']))
+                    entrada['ultimo_acesso'] = time.time()
+                    _salvar_indice(cache_dir, indice)
+                    print(f"Planilha carregada do cache local: {os.path.basename(caminho)}")
+                    return df
+                except Exception as e:
+                    print(f"Aviso: entrada de cache inválida para {caminho}: {e}")
+                    _remover_entrada(cache_dir, indice, chave)
+            _salvar_indice(cache_dir, indice)
+    except Exception as e:
+        print(f"Aviso: cache de planilhas indisponível ({e}). Lendo diretamente do Excel.")
+        return pd.read_excel(caminho, **kwargs_read_excel)
+
+    df = pd.read_excel(caminho if conteudo is None else io.BytesIO(conteudo), **kwargs_read_excel)
+
+    try:
+        with _cache_lock:
+            indice = _carregar_indice(cache_dir)
+            destino = _gravar_dataframe(df, os.path.join(cache_dir, chave))
+            indice['entradas'][chave] = {
+                'arquivo': os.path.basename(destino),
+                'tamanho': os.path.getsize(destino),
+                'ultimo_acesso': time.time(),
+                'origem': os.path.basename(caminho),
+            }
+            _aplicar_lru(cache_dir, indice, limite_bytes)
+            _salvar_indice(cache_dir, indice)
+    except Exception as e:
+        print(f"Aviso: não foi possível gravar a planilha no cache: {e}")
+
+    return df
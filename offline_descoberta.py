@@ -0,0 +1,150 @@
+import os
+import re
+import threading
+from datetime import datetime, timedelta
+
+# Um único padrão compilado cobre todas as estratégias de busca:
+# "TXN" seguido opcionalmente de separador e data AAAAMMDD.
+PADRAO_TXN = re.compile(r'TXN(?:([_\s-]?)(\d{8}))?', re.IGNORECASE)
+EXTENSOES_EXCEL = ('.xlsx', '.xls')
+DIAS_RECENTES = 7
+
+# Cache das listagens por diretório: {diretorio: (mtime_ns, todos_arquivos, analises)}.
+# Tamanho e mtime dos candidatos não entram no cache: sobrescrever um arquivo
+# não muda o mtime do diretório, então eles são relidos a cada consulta.
+_cache_listagens = {}
+_cache_lock = threading.Lock()
+
+
+def _analisar_nome(nome):
+    """
+    Extrai do nome do arquivo as informações usadas pelas estratégias de busca.
+
+    Retorna None se o nome não contém "TXN"; caso contrário uma tupla
+    (nome, data_exata, data_regex), onde data_exata é a data do padrão
+    TXN_AAAAMMDD e data_regex a data de qualquer separador aceito pela regex.
+    """
+    data_exata = None
+    data_regex = None
+    encontrou = False
+    for match in PADRAO_TXN.finditer(nome):
+        encontrou = True
+        separador, data = match.groups()
+        if data is None:
+            continue
+        if data_regex is None:
+            data_regex = data
+        if separador == '_' and data_exata is None:
+            data_exata = data
+    if not encontrou:
+        return None
+    return nome, data_exata, data_regex
+
+
+def listar_candidatos(diretorio, usar_cache=True):
+    """
+    Lista o diretório em uma única passada com os.scandir e pré-processa os nomes.
+
+    A listagem fica em cache e só é refeita quando o mtime do diretório muda,
+    evitando reler o compartilhamento de rede a cada verificação. Em um
+    acerto do cache só os candidatos recebem um stat novo (tamanho e mtime
+    mudam quando o arquivo é sobrescrito no lugar).
+
+    Returns:
+        tuple: (todos_arquivos, candidatos), onde candidatos são tuplas
+        (nome, data_exata, data_regex, tamanho, mtime_ns) para os arquivos
+        Excel que contêm "TXN".
+    """
+    mtime_ns = os.stat(diretorio).st_mtime_ns
+    chave = os.path.abspath(diretorio)
+    if usar_cache:
+        with _cache_lock:
+            em_cache = _cache_listagens.get(chave)
+        if em_cache and em_cache[0] == mtime_ns:
+            return em_cache[1], _com_assinatura(diretorio, em_cache[2])
+
+    todos_arquivos = []
+    analises = []
+    candidatos = []
+    with os.scandir(diretorio) as entradas:
+        for entrada in entradas:
+            nome = entrada.name
+            todos_arquivos.append(nome)
+            if not nome.lower().endswith(EXTENSOES_EXCEL):
+                continue
+            analise = _analisar_nome(nome)
+            if analise:
+                # No Windows o stat do DirEntry vem da própria listagem
+                stat = entrada.stat()
+                analises.append(analise)
+                candidatos.append(analise + (stat.st_size, stat.st_mtime_ns))
+
+    with _cache_lock:
+        _cache_listagens[chave] = (mtime_ns, todos_arquivos, analises)
+    return todos_arquivos, candidatos
+
+
+def _com_assinatura(diretorio, analises):
+    """Acrescenta tamanho e mtime atuais às análises em cache (some quem foi removido)."""
+    candidatos = []
+    for analise in analises:
+        try:
+            stat = os.stat(os.path.join(diretorio, analise[0]))
+        except FileNotFoundError:
+            continue
+        candidatos.append(analise + (stat.st_size, stat.st_mtime_ns))
+    return candidatos
+
+
+def invalidar_cache(diretorio=None):
+    """Descarta a listagem em cache de um diretório (ou de todos)."""
+    with _cache_lock:
+        if diretorio is None:
+            _cache_listagens.clear()
+        else:
+            _cache_listagens.pop(os.path.abspath(diretorio), None)
+
+
+def classificar_candidatos(candidatos, data_referencia=None, dias_recentes=DIAS_RECENTES, ignorar=None):
+    """
+    Distribui os candidatos nas estratégias de busca, na ordem de prioridade.
+
+    Se `ignorar` for informado, os candidatos para os quais ignorar(candidato)
+    retorna True (ex.: já processados) ficam fora de todas as estratégias.
+
+    Returns:
+        dict: {'hoje': [...], 'recentes': [...], 'geral': [...], 'regex': [...]}
+        com os nomes dos arquivos de cada estratégia.
+    """
+    data_referencia = data_referencia or datetime.now()
+    dias = {
+        (data_referencia - timedelta(days=i)).strftime('%Y%m%d'): i
+        for i in range(dias_recentes)
+    }
+    data_hoje = data_referencia.strftime('%Y%m%d')
+
+    hoje = []
+    recentes = []
+    geral = []
+    regex = []
+    for posicao, candidato in enumerate(candidatos):
+        if ignorar and ignorar(candidato):
+            continue
+        nome, data_exata, data_regex = candidato[:3]
+        geral.append(nome)
+        if data_regex is not None:
+            regex.append(nome)
+        if data_exata is None:
+            continue
+        if data_exata == data_hoje:
+            hoje.append(nome)
+        if data_exata in dias:
+            recentes.append((dias[data_exata], posicao, nome))
+
+    recentes.sort()
+    return {
+        'hoje': hoje,
+        'recentes': [nome for _, _, nome in recentes],
+        'geral': geral,
+        'regex': regex,
+    }
@@ -0,0 +1,167 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from moeda import coluna_centavos
+
+# Limites do layout: sequência com 8 dígitos e total com 17 dígitos no trailer
+LIMITE_REGISTROS = 99_999_999
+LIMITE_TOTAL_CENTAVOS = 10 ** 17 - 1
+TRABALHADORES_GERACAO = None  # None: até os.cpu_count() processos
+
+# Posições de quantidade e total no trailer (ver create_trailer)
+POS_TRAILER_REGISTROS = slice(88, 96)
+POS_TRAILER_TOTAL = slice(96, 113)
+
+
+def calcular_partes(valores_centavos, max_registros=None, max_bytes=None, bytes_detalhe=None, bytes_fixos=0):
+    """
+    Calcula os intervalos [inicio, fim) de cada parte do arquivo.
+
+    Cada parte respeita o máximo de registros, o tamanho máximo em bytes
+    (header e trailer em bytes_fixos, cada detalhe em bytes_detalhe) e os
+    limites do layout para a quantidade de registros e o total em centavos.
+
+    Args:
+        valores_centavos (pd.Series): Valor de cada linha em centavos (int64).
+
+    Returns:
+        list: Tuplas (inicio, fim) com as posições das linhas de cada parte.
+    """
+    total_linhas = len(valores_centavos)
+    por_parte = LIMITE_REGISTROS
+    if max_registros:
+        por_parte = min(por_parte, int(max_registros))
+    if max_bytes:
+        if not bytes_detalhe:
+            raise ValueError("bytes_detalhe é obrigatório para dividir por tamanho.")
+        por_parte = min(por_parte, (int(max_bytes) - bytes_fixos) // bytes_detalhe)
+    if por_parte < 1:
+        raise ValueError("Limite de divisão menor que um registro por arquivo.")
+
+    acumulado = valores_centavos.cumsum().to_numpy()
+    partes = []
+    inicio = 0
+    while inicio < total_linhas:
+        fim = min(inicio + por_parte, total_linhas)
+        base = int(acumulado[inicio - 1]) if inicio else 0
+        fim_valor = int(acumulado.searchsorted(base + LIMITE_TOTAL_CENTAVOS, side='right'))
+        fim = max(inicio + 1, min(fim, fim_valor))
+        partes.append((inicio, fim))
+        inicio = fim
+    return partes
+
+
+def caminho_parte(caminho, parte, total_partes):
+    """OFFLINE_x.txt -> OFFLINE_x_P01.txt quando o arquivo é dividido."""
+    if total_partes == 1:
+        return caminho
+    raiz, extensao = os.path.splitext(caminho)
+    return f"{raiz}_P{parte:0{max(2, len(str(total_partes)))}d}{extensao}"
+
+
+def ler_totais_trailer(caminho):
+    """Lê a quantidade de registros e o total (centavos) do trailer do arquivo gerado."""
+    with open(caminho, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 4096))
+        trailer = f.read().rstrip(b'\r\n').rsplit(b'\n', 1)[-1].lstrip(b'\r')
+    return int(trailer[POS_TRAILER_REGISTROS]), int(trailer[POS_TRAILER_TOTAL])
+
+
+def _gerar_parte(gerar_arquivo, df_parte, caminho, lote, copias_parte):
+    """Gera o arquivo de uma parte (executada em um processo do pool)."""
+    if copias_parte:
+        registros = gerar_arquivo(df_parte, caminho, lote, copias_parte)
+    else:
+        registros = gerar_arquivo(df_parte, caminho, lote)
+    _, total_centavos = ler_totais_trailer(caminho)
+    return registros, total_centavos
+
+
+def gerar_arquivos_divididos(df, gerar_arquivo, caminho_saida, lote_inicial, copias=None,
+                             max_registros=None, max_bytes=None, bytes_detalhe=None, bytes_fixos=0,
+                             trabalhadores=TRABALHADORES_GERACAO, arquivo_origem=None):
+    """
+    Divide a planilha em partes e gera um arquivo (header/detalhes/trailer)
+    por parte, cada uma com o seu número de lote (lote_inicial, lote_inicial + 1, ...).
+
+    As partes são geradas com gerar_arquivo(df_parte, caminho, lote) (a
+    assinatura de generate_file), ou gerar_arquivo(df_parte, caminho, lote,
+    copias) quando há cópias. Com mais de uma parte, cada arquivo é gerado em
+    um processo separado (até `trabalhadores`), por isso gerar_arquivo deve
+    ser uma função de módulo; os lotes são numerados antes, no processo atual. Quando há mais de uma parte, um manifesto
+    JSON com os totais de cada uma é gravado ao lado dos arquivos.
+
+    Returns:
+        tuple: (partes, caminho_manifesto), onde partes é a lista de dicts com
+        parte, arquivo, caminho, lote, registros, total_centavos e linhas; o
+        manifesto é None quando o arquivo não foi dividido.
+    """
+    # Mesmo critério de generate_file: valores inválidos não entram no total
+    valores_centavos = coluna_centavos(df).fillna(0).astype('int64')
+    # Planilha vazia: um único arquivo só com header e trailer, como antes
+    intervalos = calcular_partes(valores_centavos, max_registros, max_bytes, bytes_detalhe, bytes_fixos) or [(0, 0)]
+    total_partes = len(intervalos)
+    if total_partes > 1:
+        print(f"Planilha dividida em {total_partes} arquivos.")
+
+    partes = []
+    tarefas = []
+    for numero, (inicio, fim) in enumerate(intervalos, start=1):
+        caminho = caminho_parte(caminho_saida, numero, total_partes)
+        copias_parte = [caminho_parte(c, numero, total_partes) for c in copias or []]
+        lote = lote_inicial + numero - 1
+        partes.append({
+            'parte': numero,
+            'arquivo': os.path.basename(caminho),
+            'caminho': caminho,
+            'copias': copias_parte,
+            'lote': lote,
+            'registros': None,
+            'total_centavos': None,
+            'linhas': [inicio + 1, fim],
+        })
+        # A sequência dos detalhes recomeça em cada arquivo
+        df_parte = df.iloc[inicio:fim].reset_index(drop=True)
+        tarefas.append((gerar_arquivo, df_parte, caminho, lote, copias_parte))
+
+    if total_partes == 1:
+        resultados = [_gerar_parte(*tarefas[0])]
+    else:
+        # Processos, não threads: a formatação das linhas é Python puro e
+        # ficaria presa ao GIL; map devolve os resultados na ordem das partes
+        max_trabalhadores = min(trabalhadores or os.cpu_count() or 1, total_partes)
+        with ProcessPoolExecutor(max_workers=max_trabalhadores) as executor:
+            resultados = list(executor.map(_gerar_parte, *zip(*tarefas)))
+    for parte, (registros, total_centavos) in zip(partes, resultados):
+        parte['registros'] = registros
+        parte['total_centavos'] = total_centavos
+
+    caminho_manifesto = None
+    if total_partes > 1:
+        raiz, _ = os.path.splitext(caminho_saida)
+        caminho_manifesto = f"{raiz}_MANIFESTO.json"
+        manifesto = {
+            'arquivo_origem': arquivo_origem,
+            'gerado_em': datetime.now().isoformat(timespec='seconds'),
+            'total_partes': total_partes,
+            'total_registros': sum(p['registros'] for p in partes),
+            'total_centavos': sum(p['total_centavos'] for p in partes),
+            'partes': [{k: v for k, v in p.items() if k not in ('caminho', 'copias')} for p in partes],
+        }
+        temporario = f"{caminho_manifesto}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, indent=2, ensure_ascii=False)
+        os.replace(temporario, caminho_manifesto)
+        print(f"Manifesto gerado: {caminho_manifesto}")
+    return partes, caminho_manifesto
+
+
+def descrever_partes(partes):
+    """Nome do arquivo gerado ou, quando dividido, a lista das partes com os lotes."""
+    if len(partes) == 1:
+        return partes[0]['arquivo']
+    return ", ".join(f"{p['arquivo']} (lote {p['lote']:06d})" for p in partes)
+
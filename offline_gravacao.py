@@ -0,0 +1,116 @@
+import hashlib
+import locale
+import os
+
+TAMANHO_BUFFER = 1024 * 1024  # Buffer de escrita por destino (1 MB)
+
+
+class GravadorMultiplo:
+    """
+    Grava o mesmo conteúdo em vários destinos (ex.: saída e histórico) em uma
+    única passada, sem copiar o arquivo depois de pronto.
+
+    Cada destino é escrito em um temporário no próprio diretório, com buffer
+    grande, e só é renomeado para o nome final (os.replace, atômico) depois que
+    todos foram gravados e conferidos. O SHA-256 é calculado durante a escrita;
+    na conferência, o tamanho de cada temporário é comparado ao total gravado.
+    Com verificar_conteudo=True cada destino é também relido e o hash
+    comparado; isso custa uma leitura completa por destino (no compartilhamento
+    de rede, mais tráfego que a cópia que o gravador substitui), por isso é
+    opcional.
+
+    Uso:
+        with GravadorMultiplo([saida, historico]) as gravador:
+            gravador.write(linha + '\\n')
+        gravador.sha256
+    """
+
+    def __init__(self, destinos, encoding=None, newline=os.linesep,
+                 tamanho_buffer=TAMANHO_BUFFER, verificar_conteudo=False):
+        self.destinos = list(dict.fromkeys(os.path.abspath(d) for d in destinos))
+        if not self.destinos:
+            raise ValueError("Nenhum destino informado para a gravação.")
+        # Mesmos padrões de open(caminho, 'w'): encoding do sistema e quebra de linha nativa
+        self.encoding = encoding or locale.getpreferredencoding(False)
+        self.newline = newline
+        self.tamanho_buffer = tamanho_buffer
+        self.verificar_conteudo = verificar_conteudo
+        self.sha256 = None
+        self.bytes_gravados = 0
+        self._hash = hashlib.sha256()
+        self._arquivos = []
+
+    def _temporario(self, destino):
+        return f"{destino}.{os.getpid()}.tmp"
+
+    def abrir(self):
+        try:
+            for destino in self.destinos:
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                self._arquivos.append(open(self._temporario(destino), 'wb', buffering=self.tamanho_buffer))
+        except Exception:
+            self._descartar()
+            raise
+        return self
+
+    def write(self, texto):
+        if self.newline != '\n':
+            texto = texto.replace('\n', self.newline)
+        dados = texto.encode(self.encoding)
+        for arquivo in self._arquivos:
+            arquivo.write(dados)
+        self._hash.update(dados)
+        self.bytes_gravados += len(dados)
+        return len(texto)
+
+    def _descartar(self):
+        for arquivo in self._arquivos:
+            try:
+                arquivo.close()
+            except OSError:
+                pass
+            try:
+                os.remove(arquivo.name)
+            except OSError:
+                pass
+        self._arquivos = []
+
+    def _conferir(self, caminho):
+        tamanho = os.path.getsize(caminho)
+        if tamanho != self.bytes_gravados:
+            raise IOError(f"Arquivo {caminho} com {tamanho} bytes; esperados {self.bytes_gravados}.")
+        if self.verificar_conteudo:
+            hash_arquivo = hashlib.sha256()
+            with open(caminho, 'rb') as f:
+                for bloco in iter(lambda: f.read(self.tamanho_buffer), b''):
+                    hash_arquivo.update(bloco)
+            if hash_arquivo.hexdigest() != self.sha256:
+                raise IOError(f"Checksum divergente após a gravação de {caminho}.")
+
+    def fechar(self):
+        """Fecha, confere e publica todos os destinos. Retorna o SHA-256 do conteúdo."""
+        try:
+            for arquivo in self._arquivos:
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+                arquivo.close()
+            self.sha256 = self._hash.hexdigest()
+            for arquivo in self._arquivos:
+                self._conferir(arquivo.name)
+        except Exception:
+            self._descartar()
+            raise
+        for destino, arquivo in zip(self.destinos, self._arquivos):
+            os.replace(arquivo.name, destino)
+        self._arquivos = []
+        return self.sha256
+
+    def __enter__(self):
+        return self.abrir()
+
+    def __exit__(self, tipo, valor, traceback):
+        if tipo is None:
+            self.fechar()
+        else:
+            self._descartar()
+        return False
@@ -0,0 +1,199 @@
+import argparse
+import os
+import re
+import sqlite3
+import time
+
+# Arquivos OFFLINE guardados no histórico (COMPANY_OFFLINE_*.txt, OFFLINE_*.txt, TXN_*.txt)
+PADRAO_ARQUIVO_HISTORICO = re.compile(r'^(COMPANY_OFFLINE_|OFFLINE_|TXN_).*\.txt$', re.IGNORECASE)
+
+# Layout do registro de detalhe (ver create_detail_record)
+POS_CARTAO = slice(27, 43)
+POS_TXN = slice(50, 54)
+POS_VALOR = slice(61, 78)
+POS_DATA = slice(97, 105)
+TAMANHO_MINIMO_DETALHE = 105
+_PADRAO_HEADER = re.compile(rb'^000000(\d+)0000000 {40}A')
+
+
+def conectar_indice(caminho_indice):
+    conexao = sqlite3.connect(caminho_indice)
+    conexao.executescript("""
+        CREATE TABLE IF NOT EXISTS arquivos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT UNIQUE NOT NULL,
+            tamanho INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            lote TEXT,
+            registros INTEGER,
+            indexado_em REAL
+        );
+        CREATE TABLE IF NOT EXISTS transacoes (
+            cartao TEXT NOT NULL,
+            data TEXT NOT NULL,
+            txn INTEGER NOT NULL,
+            valor_centavos INTEGER NOT NULL,
+            arquivo_id INTEGER NOT NULL REFERENCES arquivos(id),
+            linha INTEGER NOT NULL,
+            offset INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS ix_transacoes_cartao_data ON transacoes (cartao, data);
+        CREATE INDEX IF NOT EXISTS ix_transacoes_arquivo ON transacoes (arquivo_id);
+    """)
+    return conexao
+
+
+def interpretar_arquivo(caminho):
+    """
+    Lê um arquivo OFFLINE uma única vez e devolve o lote do header e as
+    transações (cartao, data, txn, valor_centavos, linha, offset).
+    """
+    lote = None
+    transacoes = []
+    offset = 0
+    with open(caminho, 'rb') as f:
+        for numero_linha, linha in enumerate(f, start=1):
+            if numero_linha == 1:
+                match = _PADRAO_HEADER.match(linha)
+                if match:
+                    lote = f"{int(match.group(1)):06d}"
+            elif linha[:1] == b'1' and len(linha) >= TAMANHO_MINIMO_DETALHE:
+                try:
+                    transacoes.append((
+                        linha[POS_CARTAO].decode('ascii'),
+                        linha[POS_DATA].decode('ascii'),
+                        int(linha[POS_TXN]),
+                        int(linha[POS_VALOR]),
+                        numero_linha,
+                        offset,
+                    ))
+                except ValueError:
+                    pass
+            offset += len(linha)
+    return lote, transacoes
+
+
+def atualizar_indice(diretorio_historico, caminho_indice):
+    """
+    Atualiza o índice de forma incremental: só arquivos novos ou alterados
+    (tamanho/mtime) são lidos; arquivos removidos do histórico saem do índice.
+
+    Returns:
+        int: Quantidade de arquivos (re)indexados.
+    """
+    conexao = conectar_indice(caminho_indice)
+    try:
+        conhecidos = {nome: (id_arquivo, tamanho, mtime_ns) for id_arquivo, nome, tamanho, mtime_ns
+                      in conexao.execute("SELECT id, nome, tamanho, mtime_ns FROM arquivos")}
+        presentes = set()
+        indexados = 0
+        with os.scandir(diretorio_historico) as entradas:
+            for entrada in entradas:
+                if not PADRAO_ARQUIVO_HISTORICO.match(entrada.name) or not entrada.is_file():
+                    continue
+                presentes.add(entrada.name)
+                stat = entrada.stat()
+                conhecido = conhecidos.get(entrada.name)
+                if conhecido and conhecido[1] == stat.st_size and conhecido[2] == stat.st_mtime_ns:
+                    continue
+                lote, transacoes = interpretar_arquivo(entrada.path)
+                with conexao:
+                    if conhecido:
+                        conexao.execute("DELETE FROM transacoes WHERE arquivo_id = ?", (conhecido[0],))
+                        conexao.execute("DELETE FROM arquivos WHERE id = ?", (conhecido[0],))
+                    cursor = conexao.execute(
+                        "INSERT INTO arquivos (nome, tamanho, mtime_ns, lote, registros, indexado_em) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (entrada.name, stat.st_size, stat.st_mtime_ns, lote, len(transacoes), time.time()))
+                    arquivo_id = cursor.lastrowid
+                    conexao.executemany(
+                        "INSERT INTO transacoes (cartao, data, txn, valor_centavos, linha, offset, arquivo_id) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (t + (arquivo_id,) for t in transacoes))
+                indexados += 1
+                print(f"Arquivo indexado: {entrada.name} (lote {lote}, {len(transacoes)} transações)")
+
+        removidos = [c for nome, c in conhecidos.items() if nome not in presentes]
+        with conexao:
+            for id_arquivo, _, _ in removidos:
+                conexao.execute("DELETE FROM transacoes WHERE arquivo_id = ?", (id_arquivo,))
+                conexao.execute("DELETE FROM arquivos WHERE id = ?", (id_arquivo,))
+        return indexados
+    finally:
+        conexao.close()
+
+
+def buscar_transacoes(caminho_indice, cartao, data=None, txn=None):
+    """
+    Busca no índice os lotes que levaram o cartão (opcionalmente na data
+    AAAAMMDD e com o código TXN informados).
+
+    Returns:
+        list: dicts com arquivo, lote, linha, offset, data, txn e valor_centavos.
+    """
+    cartao = f"{int(cartao):016d}"
+    consulta = ("SELECT a.nome, a.lote, t.linha, t.offset, t.data, t.txn, t.valor_centavos "
+                "FROM transacoes t JOIN arquivos a ON a.id = t.arquivo_id WHERE t.cartao = ?")
+    parametros = [cartao]
+    if data:
+        consulta += " AND t.data = ?"
+        parametros.append(data.replace('-', ''))
+    if txn is not None:
+        consulta += " AND t.txn = ?"
+        parametros.append(int(txn))
+    consulta += " ORDER BY t.data, a.nome, t.linha"
+    conexao = conectar_indice(caminho_indice)
+    try:
+        return [
+            {'arquivo': nome, 'lote': lote, 'linha': linha, 'offset': offset,
+             'data': data_txn, 'txn': codigo, 'valor_centavos': valor}
+            for nome, lote, linha, offset, data_txn, codigo, valor
+            in conexao.execute(consulta, parametros)
+        ]
+    finally:
+        conexao.close()
+
+
+def ler_linha(diretorio_historico, arquivo, offset):
+    """Lê diretamente a linha do arquivo a partir do offset registrado no índice."""
+    with open(os.path.join(diretorio_historico, arquivo), 'rb') as f:
+        f.seek(offset)
+        return f.readline().decode('latin-1').rstrip('\r\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice de transações do histórico OFFLINE.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    indexar = subparsers.add_parser('indexar', help="Atualiza o índice com os arquivos novos do histórico.")
+    indexar.add_argument('historico')
+    indexar.add_argument('indice')
+    buscar = subparsers.add_parser('buscar', help="Informa em quais lotes o cartão foi enviado.")
+    buscar.add_argument('indice')
+    buscar.add_argument('--cartao', required=True)
+    buscar.add_argument('--data', help="Data da transação (AAAAMMDD ou AAAA-MM-DD).")
+    buscar.add_argument('--txn', type=int)
+    buscar.add_argument('--historico', help="Se informado, exibe também a linha do arquivo.")
+    args = parser.parse_args()
+
+    if args.comando == 'indexar':
+        inicio = time.perf_counter()
+        indexados = atualizar_indice(args.historico, args.indice)
+        print(f"{indexados} arquivos indexados em {time.perf_counter() - inicio:.2f}s.")
+        return
+
+    inicio = time.perf_counter()
+    resultados = buscar_transacoes(args.indice, args.cartao, args.data, args.txn)
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    if not resultados:
+        print(f"Nenhuma transação encontrada ({duracao_ms:.1f} ms).")
+        return
+    for r in resultados:
+        print(f"Lote {r['lote'] or '?'} | {r['arquivo']} | linha {r['linha']} | data {r['data']} "
+              f"| TXN {r['txn']:04d} | valor {r['valor_centavos'] / 100:.2f}")
+        if args.historico:
+            print(f"    {ler_linha(args.historico, r['arquivo'], r['offset'])}")
+    print(f"{len(resultados)} transações encontradas em {duracao_ms:.1f} ms.")
+
+
+if __name__ == "__main__":
+    main()
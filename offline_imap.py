@@ -0,0 +1,200 @@
+import email
+import json
+import os
+import re
+import threading
+from email import policy
+from email.header import decode_header, make_header
+
+CAMPOS_CABECALHO = ('FROM', 'SUBJECT', 'DATE', 'MESSAGE-ID', 'CONTENT-TYPE', 'CONTENT-TRANSFER-ENCODING')
+TAMANHO_PREVIA = 2048  # Bytes do corpo baixados por mensagem para a prévia
+
+_PADRAO_UID = re.compile(rb'UID (\d+)')
+_PADRAO_INICIO = re.compile(rb'^\d+ \(')
+_PADRAO_SECAO = re.compile(rb'(BODY\[[^\]]*\](?:<\d+>)?)')
+_estado_lock = threading.Lock()
+
+
+def carregar_estado(arquivo_estado):
+    try:
+        with open(arquivo_estado, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def salvar_estado(arquivo_estado, estado):
+    diretorio = os.path.dirname(os.path.abspath(arquivo_estado))
+    os.makedirs(diretorio, exist_ok=True)
+    temporario = f"{arquivo_estado}.tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(estado, f, indent=2)
+    os.replace(temporario, arquivo_estado)
+
+
+def chave_estado(usuario, pasta):
+    return f"{usuario}|{pasta}"
+
+
+def selecionar_pasta(mail, pasta, somente_leitura=True):
+    """Seleciona a pasta e devolve o UIDVALIDITY informado pelo servidor."""
+    status, _ = mail.select(pasta, readonly=somente_leitura)
+    if status != 'OK':
+        raise Exception(f"Não foi possível selecionar a pasta {pasta}")
+    _, valores = mail.response('UIDVALIDITY')
+    if not valores or valores[0] is None:
+        return None
+    return int(valores[0])
+
+
+def buscar_uids_novos(mail, ultimo_uid, limite=None):
+    """
+    Busca apenas os UIDs maiores que ultimo_uid. Na primeira leitura
+    (ultimo_uid == 0) retorna somente os `limite` mais recentes.
+    """
+    status, dados = mail.uid('SEARCH', None, f'UID {ultimo_uid + 1}:*')
+    if status != 'OK':
+        raise Exception(f"Falha na busca de UIDs: {dados}")
+    # "n:*" sempre inclui o maior UID existente, mesmo que seja menor que n
+    uids = sorted(int(u) for u in (dados[0] or b'').split() if int(u) > ultimo_uid)
+    if limite and ultimo_uid == 0:
+        uids = uids[-limite:]
+    return uids
+
+
+def conjunto_uids(uids):
+    """Compacta a lista de UIDs em intervalos (ex.: 10:15,18) para um único comando."""
+    partes = []
+    inicio = anterior = None
+    for uid in uids:
+        if anterior is not None and uid == anterior + 1:
+            anterior = uid
+            continue
+        if inicio is not None:
+            partes.append(f"{inicio}:{anterior}" if inicio != anterior else str(inicio))
+        inicio = anterior = uid
+    if inicio is not None:
+        partes.append(f"{inicio}:{anterior}" if inicio != anterior else str(inicio))
+    return ",".join(partes)
+
+
+def agrupar_resposta_fetch(dados):
+    """
+    Agrupa a resposta do imaplib para um FETCH com vários itens em
+    {uid: {secao: bytes}}, onde secao é o nome do item (ex.: b'BODY[TEXT]<0>').
+    """
+    mensagens = []
+    atual = None
+    for item in dados:
+        prefixo = item[0] if isinstance(item, tuple) else item
+        if not isinstance(prefixo, bytes):
+            continue
+        if isinstance(item, tuple) and _PADRAO_INICIO.match(prefixo):
+            atual = {'secoes': {}}
+            mensagens.append(atual)
+        if atual is None:
+            continue
+        match = _PADRAO_UID.search(prefixo)
+        if match:
+            atual['uid'] = int(match.group(1))
+        if isinstance(item, tuple):
+            secoes = _PADRAO_SECAO.findall(prefixo)
+            if secoes:
+                atual['secoes'][secoes[-1]] = item[1]
+    return {m['uid']: m['secoes'] for m in mensagens if 'uid' in m}
+
+
+def texto_cabecalho(valor):
+    if valor is None:
+        return None
+    valor = str(valor)
+    try:
+        # Cabeçalhos com bytes não ASCII (sem RFC 2047) chegam com surrogates
+        valor = valor.encode('utf-8', 'surrogateescape').decode('utf-8', errors='replace')
+        return str(make_header(decode_header(valor)))
+    except Exception:
+        return str(valor)
+
+
+def montar_previa(cabecalho, corpo_parcial, tamanho=100):
+    """
+    Monta De/Assunto/Data e os primeiros caracteres do texto a partir do
+    cabeçalho e do início do corpo (que pode estar truncado).
+    """
+    mensagem = email.message_from_bytes(cabecalho.rstrip(b'\r\n') + b'\r\n\r\n' + (corpo_parcial or b''),
+                                        policy=policy.compat32)
+    corpo = ''
+    partes = mensagem.walk() if mensagem.is_multipart() else [mensagem]
+    for parte in partes:
+        if parte.get_content_type() != 'text/plain':
+            continue
+        bruto = parte.get_payload()
+        if isinstance(bruto, list):
+            continue
+        if (parte.get('Content-Transfer-Encoding') or '').lower() == 'base64':
+            # Corpo truncado: descarta o último grupo incompleto antes de decodificar
+            limpo = ''.join(bruto.split())
+            parte.set_payload(limpo[:len(limpo) - len(limpo) % 4])
+        payload = parte.get_payload(decode=True) or b''
+        charset = parte.get_content_charset() or 'utf-8'
+        try:
+            corpo = payload.decode(charset, errors='replace')
+        except LookupError:
+            corpo = payload.decode('utf-8', errors='replace')
+        break
+    return {
+        'de': texto_cabecalho(mensagem['From']),
+        'assunto': texto_cabecalho(mensagem['Subject']),
+        'data': mensagem['Date'],
+        'message_id': mensagem['Message-ID'],
+        'corpo': corpo[:tamanho],
+    }
+
+
+def ler_novas_mensagens(mail, usuario, pasta, arquivo_estado, quantidade=5, tamanho_previa=TAMANHO_PREVIA):
+    """
+    Lê apenas as mensagens novas da pasta desde a última execução.
+
+    O último UID visto e o UIDVALIDITY ficam em arquivo_estado; os cabeçalhos e
+    o início do corpo de todas as mensagens novas vêm em um único UID FETCH com
+    BODY.PEEK (as mensagens não são marcadas como lidas).
+
+    Returns:
+        list: Prévias (dicts com uid, de, assunto, data, corpo) da mais nova para a mais antiga.
+    """
+    uidvalidity = selecionar_pasta(mail, pasta)
+    chave = chave_estado(usuario, pasta)
+    with _estado_lock:
+        estado = carregar_estado(arquivo_estado)
+    registro = estado.get(chave, {})
+    ultimo_uid = registro.get('ultimo_uid', 0)
+    if registro.get('uidvalidity') != uidvalidity:
+        if registro:
+            print(f"UIDVALIDITY da pasta {pasta} mudou; reiniciando a leitura incremental.")
+        ultimo_uid = 0
+
+    uids = buscar_uids_novos(mail, ultimo_uid, quantidade)
+    previas = []
+    if uids:
+        campos = ' '.join(CAMPOS_CABECALHO)
+        status, dados = mail.uid(
+            'FETCH', conjunto_uids(uids),
+            f'(UID BODY.PEEK[HEADER.FIELDS ({campos})] BODY.PEEK[TEXT]<0.{tamanho_previa}>)')
+        if status != 'OK':
+            raise Exception(f"Falha no FETCH das mensagens: {dados}")
+        for uid, secoes in agrupar_resposta_fetch(dados).items():
+            cabecalho = next((v for k, v in secoes.items() if k.startswith(b'BODY[HEADER')), b'')
+            corpo = next((v for k, v in secoes.items() if k.startswith(b'BODY[TEXT]')), b'')
+            previa = montar_previa(cabecalho, corpo)
+            previa['uid'] = uid
+            previas.append(previa)
+        previas.sort(key=lambda p: p['uid'], reverse=True)
+
+    with _estado_lock:
+        estado = carregar_estado(arquivo_estado)
+        estado[chave] = {
+            'uidvalidity': uidvalidity,
+            'ultimo_uid': max(uids) if uids else ultimo_uid,
+        }
+        salvar_estado(arquivo_estado, estado)
+    return previas
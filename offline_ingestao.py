@@ -0,0 +1,351 @@
+import base64
+import binascii
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+from offline_descoberta import PADRAO_TXN
+from offline_imap import (buscar_uids_novos, carregar_estado, chave_estado, conjunto_uids,
+                          salvar_estado, selecionar_pasta, texto_cabecalho)
+
+EXTENSOES_ANEXO = ('.xlsx', '.xls')
+TAMANHO_BLOCO_DOWNLOAD = 1024 * 1024
+INDICE_ANEXOS = '.indice_anexos.json'
+
+_PADRAO_INICIO = re.compile(rb'^\d+ \(')
+_PADRAO_LITERAL = re.compile(rb'\{(\d+)\}$')
+_indice_lock = threading.Lock()
+
+
+class _Literal(bytes):
+    """Marca um literal IMAP ({n} seguido de n bytes) dentro da resposta."""
+
+
+# --- Interpretação de BODYSTRUCTURE ---
+
+def _segmentos_por_mensagem(dados):
+    """Separa a resposta do FETCH em listas de segmentos (texto e literais) por mensagem."""
+    mensagens = []
+    for item in dados:
+        if isinstance(item, tuple):
+            prefixo, literal = item
+            if _PADRAO_INICIO.match(prefixo):
+                mensagens.append([])
+            if mensagens:
+                mensagens[-1].append(prefixo)
+                mensagens[-1].append(_Literal(literal))
+        elif isinstance(item, bytes):
+            if _PADRAO_INICIO.match(item):
+                mensagens.append([])
+            if mensagens:
+                mensagens[-1].append(item)
+    return mensagens
+
+
+def _tokens(segmentos):
+    for segmento in segmentos:
+        if isinstance(segmento, _Literal):
+            yield ('str', bytes(segmento))
+            continue
+        i = 0
+        tamanho = len(segmento)
+        while i < tamanho:
+            c = segmento[i:i + 1]
+            if c in (b' ', b'\r', b'\n'):
+                i += 1
+            elif c in (b'(', b')'):
+                yield (c.decode(), None)
+                i += 1
+            elif c == b'"':
+                i += 1
+                valor = bytearray()
+                while i < tamanho and segmento[i:i + 1] != b'"':
+                    if segmento[i:i + 1] == b'\\':
+                        i += 1
+                    valor += segmento[i:i + 1]
+                    i += 1
+                i += 1
+                yield ('str', bytes(valor))
+            elif c == b'{' and _PADRAO_LITERAL.search(segmento[i:]):
+                # O conteúdo do literal vem no próximo segmento
+                i = tamanho
+            else:
+                inicio = i
+                while i < tamanho and segmento[i:i + 1] not in (b' ', b'(', b')', b'\r', b'\n'):
+                    i += 1
+                atomo = segmento[inicio:i]
+                yield ('atom', None if atomo.upper() == b'NIL' else atomo)
+
+
+def _lista(tokens):
+    resultado = []
+    for tipo, valor in tokens:
+        if tipo == '(':
+            resultado.append(_lista(tokens))
+        elif tipo == ')':
+            return resultado
+        else:
+            resultado.append(valor)
+    return resultado
+
+
+def _texto(valor):
+    if isinstance(valor, bytes):
+        return valor.decode('utf-8', errors='replace')
+    return valor
+
+
+def _parametros(lista):
+    if not isinstance(lista, list):
+        return {}
+    return {_texto(lista[i]).lower(): _texto(lista[i + 1]) for i in range(0, len(lista) - 1, 2)}
+
+
+def _nome_arquivo(parte):
+    nome = _parametros(parte[2]).get('name') if len(parte) > 2 else None
+    for campo in parte[7:]:
+        if (isinstance(campo, list) and len(campo) == 2 and isinstance(campo[0], bytes)
+                and isinstance(campo[1], list)):
+            nome = _parametros(campo[1]).get('filename') or nome
+    if nome:
+        nome = texto_cabecalho(nome)
+    return nome
+
+
+def listar_partes(estrutura, prefixo=''):
+    """
+    Percorre um BODYSTRUCTURE já convertido em listas e devolve as partes
+    simples como dicts (secao, tipo, encoding, tamanho, nome).
+    """
+    if estrutura and isinstance(estrutura[0], list):
+        partes = []
+        numero = 0
+        for filho in estrutura:
+            if not isinstance(filho, list):
+                break
+            numero += 1
+            partes.extend(listar_partes(filho, f"{prefixo}{numero}."))
+        return partes
+    secao = prefixo.rstrip('.') or '1'
+    return [{
+        'secao': secao,
+        'tipo': f"{_texto(estrutura[0])}/{_texto(estrutura[1])}".lower(),
+        'encoding': (_texto(estrutura[5]) or '7bit').lower() if len(estrutura) > 5 else '7bit',
+        'tamanho': int(estrutura[6]) if len(estrutura) > 6 and estrutura[6] else 0,
+        'nome': _nome_arquivo(estrutura),
+    }]
+
+
+def buscar_estruturas(mail, uids):
+    """Obtém o BODYSTRUCTURE de vários UIDs em um único UID FETCH."""
+    status, dados = mail.uid('FETCH', conjunto_uids(uids), '(UID BODYSTRUCTURE)')
+    if status != 'OK':
+        raise Exception(f"Falha no FETCH de BODYSTRUCTURE: {dados}")
+    estruturas = {}
+    for segmentos in _segmentos_por_mensagem(dados):
+        itens = _lista(_tokens(segmentos))
+        itens = itens[1] if len(itens) > 1 and isinstance(itens[1], list) else itens
+        uid = None
+        estrutura = None
+        for i in range(0, len(itens) - 1):
+            if itens[i] == b'UID':
+                uid = int(itens[i + 1])
+            elif itens[i] == b'BODYSTRUCTURE':
+                estrutura = itens[i + 1]
+        if uid is not None and isinstance(estrutura, list):
+            estruturas[uid] = estrutura
+    return estruturas
+
+
+# --- Download em streaming ---
+
+class _Decodificador:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.resto = b''
+
+    def alimentar(self, dados):
+        if self.encoding == 'base64':
+            dados = self.resto + re.sub(rb'\s+', b'', dados)
+            corte = len(dados) - len(dados) % 4
+            self.resto = dados[corte:]
+            return base64.b64decode(dados[:corte])
+        if self.encoding == 'quoted-printable':
+            dados = self.resto + dados
+            corte = dados.rfind(b'\n') + 1
+            self.resto = dados[corte:]
+            return binascii.a2b_qp(dados[:corte])
+        return dados
+
+    def finalizar(self):
+        resto, self.resto = self.resto, b''
+        if not resto:
+            return b''
+        if self.encoding == 'base64':
+            return base64.b64decode(resto + b'=' * (-len(resto) % 4))
+        if self.encoding == 'quoted-printable':
+            return binascii.a2b_qp(resto)
+        return resto
+
+
+def baixar_parte(mail, uid, secao, encoding, destino, tamanho_bloco=TAMANHO_BLOCO_DOWNLOAD):
+    """
+    Baixa uma parte da mensagem em blocos parciais (BODY.PEEK[secao]<offset.n>),
+    decodificando e gravando em disco à medida que chega. Nunca mantém em
+    memória mais que um bloco.
+
+    Returns:
+        tuple: (sha256 do conteúdo decodificado, tamanho em bytes)
+    """
+    decodificador = _Decodificador(encoding)
+    sha = hashlib.sha256()
+    total = 0
+    offset = 0
+    with open(destino, 'wb') as saida:
+        while True:
+            status, dados = mail.uid('FETCH', str(uid), f'(BODY.PEEK[{secao}]<{offset}.{tamanho_bloco}>)')
+            if status != 'OK':
+                raise Exception(f"Falha ao baixar a parte {secao} do UID {uid}: {dados}")
+            bloco = next((item[1] for item in dados if isinstance(item, tuple)), b'')
+            if bloco:
+                conteudo = decodificador.alimentar(bloco)
+                saida.write(conteudo)
+                sha.update(conteudo)
+                total += len(conteudo)
+                offset += len(bloco)
+            if len(bloco) < tamanho_bloco:
+                break
+        conteudo = decodificador.finalizar()
+        saida.write(conteudo)
+        sha.update(conteudo)
+        total += len(conteudo)
+    return sha.hexdigest(), total
+
+
+# --- Ingestão ---
+
+def _carregar_indice(destino_dir):
+    try:
+        with open(os.path.join(destino_dir, INDICE_ANEXOS), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _salvar_indice(destino_dir, indice):
+    caminho = os.path.join(destino_dir, INDICE_ANEXOS)
+    with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(indice, f, indent=2)
+    os.replace(caminho + '.tmp', caminho)
+
+
+def _nome_disponivel(destino_dir, nome):
+    nome = os.path.basename(nome).replace('\\', '_').replace('/', '_')
+    base, extensao = os.path.splitext(nome)
+    candidato = nome
+    contador = 1
+    while os.path.exists(os.path.join(destino_dir, candidato)):
+        candidato = f"{base}_{contador}{extensao}"
+        contador += 1
+    return candidato
+
+
+def anexo_elegivel(nome, extensoes=EXTENSOES_ANEXO):
+    return bool(nome) and nome.lower().endswith(extensoes) and PADRAO_TXN.search(nome) is not None
+
+
+def ingerir_anexos(mail, usuario, pasta, arquivo_estado, destino_dir, ao_receber=None,
+                   extensoes=EXTENSOES_ANEXO, limite_inicial=50):
+    """
+    Copia para destino_dir os anexos TXN das mensagens novas da pasta.
+
+    Só o BODYSTRUCTURE das mensagens é consultado; cada anexo elegível é baixado
+    em blocos direto para o disco. Anexos cujo hash já foi recebido são
+    descartados. Para cada arquivo novo, ao_receber(caminho, dados) é chamado
+    assim que o arquivo é gravado.
+
+    Returns:
+        list: Caminhos dos arquivos gravados.
+    """
+    os.makedirs(destino_dir, exist_ok=True)
+    uidvalidity = selecionar_pasta(mail, pasta)
+    chave = chave_estado(usuario, pasta) + '|anexos'
+    estado = carregar_estado(arquivo_estado)
+    registro = estado.get(chave, {})
+    ultimo_uid = registro.get('ultimo_uid', 0) if registro.get('uidvalidity') == uidvalidity else 0
+
+    uids = buscar_uids_novos(mail, ultimo_uid, limite_inicial)
+    recebidos = []
+    if not uids:
+        return recebidos
+
+    estruturas = buscar_estruturas(mail, uids)
+    for uid in uids:
+        for parte in listar_partes(estruturas.get(uid, [])):
+            if not anexo_elegivel(parte['nome'], extensoes):
+                continue
+            temporario = os.path.join(destino_dir, f".uid{uid}_{parte['secao']}.part")
+            try:
+                hash_anexo, tamanho = baixar_parte(mail, uid, parte['secao'], parte['encoding'], temporario)
+                with _indice_lock:
+                    indice = _carregar_indice(destino_dir)
+                    if hash_anexo in indice:
+                        os.remove(temporario)
+                        print(f"Anexo {parte['nome']} (UID {uid}) já recebido como {indice[hash_anexo]['arquivo']}. Ignorado.")
+                        continue
+                    nome_final = _nome_disponivel(destino_dir, parte['nome'])
+                    caminho_final = os.path.join(destino_dir, nome_final)
+                    os.replace(temporario, caminho_final)
+                    dados = {
+                        'arquivo': nome_final,
+                        'nome_original': parte['nome'],
+                        'uid': uid,
+                        'pasta': pasta,
+                        'tamanho': tamanho,
+                        'hash': hash_anexo,
+                        'recebido_em': datetime.now().isoformat(timespec='seconds'),
+                    }
+                    indice[hash_anexo] = dados
+                    _salvar_indice(destino_dir, indice)
+            finally:
+                if os.path.exists(temporario):
+                    os.remove(temporario)
+            print(f"Anexo recebido por email: {caminho_final} ({tamanho} bytes)")
+            recebidos.append(caminho_final)
+            if ao_receber:
+                ao_receber(caminho_final, dados)
+
+        # O progresso é gravado por mensagem para retomar de onde parou
+        estado = carregar_estado(arquivo_estado)
+        estado[chave] = {'uidvalidity': uidvalidity, 'ultimo_uid': uid}
+        salvar_estado(arquivo_estado, estado)
+    return recebidos
+
+
+def monitorar_anexos(conectar, usuario, pasta, arquivo_estado, destino_dir, ao_receber=None,
+                     intervalo=60, parar=None):
+    """
+    Verifica a pasta periodicamente e ingere os anexos novos.
+
+    Args:
+        conectar: Função sem argumentos que devolve uma conexão IMAP autenticada.
+        intervalo (int): Segundos entre verificações.
+        parar (threading.Event): Evento opcional para encerrar o monitoramento.
+    """
+    parar = parar or threading.Event()
+    while not parar.is_set():
+        try:
+            mail = conectar()
+            try:
+                ingerir_anexos(mail, usuario, pasta, arquivo_estado, destino_dir, ao_receber)
+            finally:
+                try:
+                    mail.logout()
+                except Exception:
+                    pass
+        except Exception as e:
+            print(f"Erro na ingestão de anexos por email: {e}")
+        parar.wait(intervalo)
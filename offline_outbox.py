@@ -0,0 +1,309 @@
+import json
+import os
+import smtplib
+import threading
+import time
+import uuid
+
+from offline_anexos import (FORMATO_COMPRESSAO, LIMITE_ANEXO_BYTES, LIMITE_COMPRESSAO_BYTES,
+                            enviar_email_com_anexos)
+
+# Servidores padrão, na ordem de preferência (primário e secundário)
+SERVIDOR_PRIMARIO = {'nome': 'primario', 'host': 'smtp.office365.com', 'porta': 587, 'seguranca': 'starttls'}
+
+PENDENTES = 'pendentes'
+ENVIADOS = 'enviados'
+FALHAS = 'falhas'
+TEMPORARIOS = 'tmp'
+
+RETENCAO_ENVIADOS_DIAS = 30  # mensagens enviadas guardadas para consulta; as falhas ficam até alguém tratar
+
+
+class CaixaSaidaEmail:
+    """
+    Caixa de saída persistente para as notificações das rotinas OFFLINE.
+
+    O processamento apenas enfileira as mensagens (gravadas em disco, uma por
+    arquivo JSON); uma thread em segundo plano mantém uma sessão SMTP autenticada
+    por servidor, envia as mensagens em lotes e, em caso de falha, alterna entre
+    os servidores e reagenda com espera exponencial. Mensagens não enviadas
+    permanecem em disco e são retomadas na próxima execução; as enviadas são
+    apagadas depois de `retencao_enviados_dias`.
+    """
+
+    def __init__(self, diretorio, servidores, usuario, senha, tamanho_lote=20,
+                 max_tentativas=8, espera_base=5, espera_maxima=600, timeout=30,
+                 limite_compressao=LIMITE_COMPRESSAO_BYTES, limite_anexo=LIMITE_ANEXO_BYTES,
+                 formato_compressao=FORMATO_COMPRESSAO, retencao_enviados_dias=RETENCAO_ENVIADOS_DIAS):
+        self.diretorio = diretorio
+        self.servidores = servidores
+        self.usuario = usuario
+        self.senha = senha
+        self.tamanho_lote = tamanho_lote
+        self.max_tentativas = max_tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.timeout = timeout
+        self.limite_compressao = limite_compressao
+        self.limite_anexo = limite_anexo
+        self.formato_compressao = formato_compressao
+        self.retencao_enviados_dias = retencao_enviados_dias
+
+        self._sessoes = {}
+        self._indisponivel_ate = {}
+        self._falhas_servidor = {}
+        self._evento = threading.Event()
+        self._parar = threading.Event()
+        self._ocioso = threading.Condition()
+        self._enviando = False
+        self._thread = None
+
+        for subdiretorio in (PENDENTES, ENVIADOS, FALHAS, TEMPORARIOS):
+            os.makedirs(os.path.join(diretorio, subdiretorio), exist_ok=True)
+
+    # --- API usada pelas rotinas ---
+
+    def iniciar(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        try:
+            self.limpar_enviados()
+        except OSError as e:
+            print(f"Não foi possível limpar as mensagens enviadas antigas: {e}")
+        self._thread = threading.Thread(target=self._loop, name='caixa-saida-email', daemon=True)
+        self._thread.start()
+        # Mensagens deixadas por execuções anteriores são enviadas imediatamente
+        self._evento.set()
+
+    def enfileirar(self, remetente, destinatarios, assunto, corpo, anexos=None, subtipo='html'):
+        """Grava a mensagem na caixa de saída e acorda o envio em segundo plano."""
+        mensagem_id = f"{time.time_ns():020d}_{uuid.uuid4().hex[:8]}"
+        dados = {
+            'id': mensagem_id,
+            'remetente': remetente,
+            'destinatarios': list(destinatarios),
+            'assunto': assunto,
+            'corpo': corpo,
+            'subtipo': subtipo,
+            'anexos': [os.path.abspath(a) for a in (anexos or [])],
+            'tentativas': 0,
+            'proxima_tentativa': 0,
+            'ultimo_erro': None,
+        }
+        self._gravar(PENDENTES, dados)
+        print(f"Email enfileirado para envio: {assunto}")
+        self._evento.set()
+        return mensagem_id
+
+    def limpar_enviados(self, agora=None):
+        """Apaga as mensagens enviadas há mais de retencao_enviados_dias. Devolve quantas."""
+        limite = (agora or time.time()) - self.retencao_enviados_dias * 86400
+        apagadas = 0
+        with os.scandir(os.path.join(self.diretorio, ENVIADOS)) as entradas:
+            for entrada in entradas:
+                if entrada.name.endswith('.json') and entrada.stat().st_mtime < limite:
+                    os.remove(entrada.path)
+                    apagadas += 1
+        return apagadas
+
+    def pendentes(self):
+        return sorted(f for f in os.listdir(os.path.join(self.diretorio, PENDENTES)) if f.endswith('.json'))
+
+    def aguardar(self, timeout=None):
+        """
+        Aguarda o envio das mensagens prontas. Retorna False se o tempo esgotar ou
+        se restarem mensagens reagendadas; elas continuam persistidas para a
+        próxima execução.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        self._evento.set()
+        with self._ocioso:
+            while self._enviando or self._prontas():
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self._ocioso.wait(restante if restante is not None else 1)
+        return not self.pendentes()
+
+    def parar(self, timeout=10):
+        self._parar.set()
+        self._evento.set()
+        if self._thread:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                # A thread ainda usa as sessões; ela mesma as fecha ao sair do loop
+                print("Caixa de saída ainda enviando; as mensagens restantes continuam em disco.")
+                return
+        self._fechar_sessoes()
+
+    # --- Persistência ---
+
+    def _caminho(self, estado, mensagem_id):
+        return os.path.join(self.diretorio, estado, f"{mensagem_id}.json")
+
+    def _gravar(self, estado, dados):
+        destino = self._caminho(estado, dados['id'])
+        temporario = destino + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False)
+        os.replace(temporario, destino)
+
+    def _ler(self, nome_arquivo):
+        with open(os.path.join(self.diretorio, PENDENTES, nome_arquivo), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _mover(self, dados, estado):
+        self._gravar(estado, dados)
+        os.remove(self._caminho(PENDENTES, dados['id']))
+
+    def _prontas(self):
+        agora = time.time()
+        prontas = []
+        for nome_arquivo in self.pendentes():
+            try:
+                dados = self._ler(nome_arquivo)
+            except (OSError, ValueError):
+                continue
+            if dados['proxima_tentativa'] <= agora:
+                prontas.append(dados)
+        return prontas
+
+    # --- Envio em segundo plano ---
+
+    def _loop(self):
+        while not self._parar.is_set():
+            self._evento.wait(self._tempo_ate_proxima())
+            self._evento.clear()
+            if self._parar.is_set():
+                break
+            with self._ocioso:
+                self._enviando = True
+            try:
+                self._enviar_prontas()
+            except Exception as e:
+                print(f"Erro inesperado na caixa de saída de email: {e}")
+            finally:
+                with self._ocioso:
+                    self._enviando = False
+                    self._ocioso.notify_all()
+        self._fechar_sessoes()
+
+    def _tempo_ate_proxima(self):
+        proximas = []
+        for nome_arquivo in self.pendentes():
+            try:
+                proximas.append(self._ler(nome_arquivo)['proxima_tentativa'])
+            except (OSError, ValueError):
+                continue
+        if not proximas:
+            return None
+        return max(0, min(proximas) - time.time())
+
+    def _enviar_prontas(self):
+        # Um lote por rodada, enviado pelas sessões já abertas
+        prontas = self._prontas()
+        for dados in prontas[:self.tamanho_lote]:
+            if self._parar.is_set():
+                return
+            if not self._enviar_mensagem(dados):
+                # Nenhum servidor disponível: as demais aguardam a próxima rodada
+                return
+        if len(prontas) > self.tamanho_lote:
+            self._evento.set()
+
+    def _enviar_mensagem(self, dados):
+        erros = []
+        tentou = False
+        for servidor in self.servidores:
+            nome = servidor['nome']
+            if self._indisponivel_ate.get(nome, 0) > time.time():
+                continue
+            tentou = True
+            try:
+                sessao = self._sessao(servidor)
+                enviar_email_com_anexos(
+                    sessao, dados['remetente'], dados['destinatarios'], dados['assunto'],
+                    dados['corpo'], dados['anexos'], subtipo=dados['subtipo'],
+                    diretorio_temp=os.path.join(self.diretorio, TEMPORARIOS),
+                    limite_compressao=self.limite_compressao, limite_anexo=self.limite_anexo,
+                    formato=self.formato_compressao)
+                self._falhas_servidor[nome] = 0
+                dados['servidor'] = nome
+                dados['enviado_em'] = time.time()
+                self._mover(dados, ENVIADOS)
+                print(f"Email enviado com sucesso pelo servidor {nome}: {dados['assunto']}")
+                return True
+            except smtplib.SMTPRecipientsRefused as e:
+                # Erro da própria mensagem: outro servidor ou nova tentativa não resolveriam
+                dados['ultimo_erro'] = f"{nome}: {e}"
+                self._mover(dados, FALHAS)
+                print(f"Destinatários recusados para '{dados['assunto']}': {e}")
+                return True
+            except Exception as e:
+                erros.append(f"{nome}: {e}")
+                self._fechar_sessao(nome)
+                falhas = self._falhas_servidor.get(nome, 0) + 1
+                self._falhas_servidor[nome] = falhas
+                self._indisponivel_ate[nome] = time.time() + self._espera(falhas)
+
+        if not tentou:
+            # Todos os servidores em espera após falhas recentes: não conta como tentativa
+            dados['proxima_tentativa'] = min(self._indisponivel_ate.values())
+            self._gravar(PENDENTES, dados)
+            return False
+
+        dados['tentativas'] += 1
+        dados['ultimo_erro'] = '; '.join(erros)
+        print(f"Falha ao enviar email '{dados['assunto']}' (tentativa {dados['tentativas']}): {dados['ultimo_erro']}")
+        if dados['tentativas'] >= self.max_tentativas:
+            self._mover(dados, FALHAS)
+            print(f"Email movido para a pasta de falhas: {self._caminho(FALHAS, dados['id'])}")
+            return True
+        dados['proxima_tentativa'] = time.time() + self._espera(dados['tentativas'])
+        self._gravar(PENDENTES, dados)
+        return False
+
+    def _espera(self, tentativas):
+        return min(self.espera_maxima, self.espera_base * (2 ** (tentativas - 1)))
+
+    # --- Sessões SMTP ---
+
+    def _sessao(self, servidor):
+        """Reaproveita a sessão autenticada do servidor ou abre uma nova."""
+        nome = servidor['nome']
+        sessao = self._sessoes.get(nome)
+        if sessao is not None:
+            try:
+                if sessao.noop()[0] == 250:
+                    return sessao
+            except Exception:
+                pass
+            self._fechar_sessao(nome)
+
+        if servidor.get('seguranca') == 'ssl':
+            sessao = smtplib.SMTP_SSL(servidor['host'], servidor['porta'], timeout=self.timeout)
+        else:
+            sessao = smtplib.SMTP(servidor['host'], servidor['porta'], timeout=self.timeout)
+            sessao.ehlo()
+            if servidor.get('seguranca') == 'starttls':
+                sessao.starttls()
+                sessao.ehlo()
+        sessao.login(self.usuario, self.senha)
+        self._sessoes[nome] = sessao
+        return sessao
+
+    def _fechar_sessao(self, nome):
+        sessao = self._sessoes.pop(nome, None)
+        if sessao is not None:
+            try:
+                sessao.quit()
+            except Exception:
+                try:
+                    sessao.close()
+                except Exception:
+                    pass
+
+    def _fechar_sessoes(self):
+        for nome in list(self._sessoes):
+            self._fechar_sessao(nome)
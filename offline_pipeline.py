@@ -0,0 +1,139 @@
+import queue
+import threading
+import time
+
+TAMANHO_FILA = 1  # Itens prontos aguardando o próximo estágio (limita a memória)
+
+_FIM = object()
+
+
+class _Estatistica:
+    def __init__(self, nome):
+        self.nome = nome
+        self.itens = 0
+        self.ocupado = 0.0
+        self.aguardando_entrada = 0.0
+        self.aguardando_saida = 0.0
+
+
+def _obter(fila, parar, estatistica):
+    inicio = time.perf_counter()
+    try:
+        while True:
+            try:
+                return fila.get(timeout=0.1)
+            except queue.Empty:
+                if parar.is_set():
+                    return _FIM
+    finally:
+        estatistica.aguardando_entrada += time.perf_counter() - inicio
+
+
+def _colocar(fila, valor, parar, estatistica):
+    inicio = time.perf_counter()
+    try:
+        while True:
+            try:
+                fila.put(valor, timeout=0.1)
+                return True
+            except queue.Full:
+                if parar.is_set():
+                    return False
+    finally:
+        estatistica.aguardando_saida += time.perf_counter() - inicio
+
+
+def executar_pipeline(itens, estagios, tamanho_fila=TAMANHO_FILA):
+    """
+    Executa os estágios em threads próprias, ligadas por filas limitadas, de
+    modo que o estágio 1 já trabalha no próximo item enquanto os seguintes
+    tratam o atual (ex.: leitura da rede, formatação, envio/histórico).
+
+    Cada estágio é uma tupla (nome, funcao) ou (nome, funcao, descartar):
+    funcao(valor) recebe a saída do estágio anterior (ou o item, no primeiro) e
+    devolve a entrada do próximo. A ordem dos itens é mantida. Na primeira
+    exceção a alimentação para, os valores já produzidos e não consumidos são
+    passados para descartar(valor) do estágio que os produziu e a exceção é
+    relançada depois do relatório de utilização.
+
+    Returns:
+        list: Saídas do último estágio, na ordem dos itens.
+    """
+    parar = threading.Event()
+    erros = []
+    resultados = []
+    filas = [queue.Queue(maxsize=tamanho_fila) for _ in estagios[1:]]
+    estatisticas = [_Estatistica(estagio[0]) for estagio in estagios]
+
+    def descartar(indice, valor):
+        """Repassa ao descartar do estágio `indice` um valor que ele produziu e não será concluído."""
+        if len(estagios[indice]) > 2 and estagios[indice][2]:
+            try:
+                estagios[indice][2](valor)
+            except Exception as e:
+                print(f"Erro ao descartar item do estágio {estagios[indice][0]}: {e}")
+
+    def executar(indice):
+        funcao = estagios[indice][1]
+        estatistica = estatisticas[indice]
+        entrada = iter(itens) if indice == 0 else None
+        saida = filas[indice] if indice < len(filas) else None
+
+        while True:
+            if entrada is not None:
+                valor = _FIM if parar.is_set() else next(entrada, _FIM)
+            else:
+                valor = _obter(filas[indice - 1], parar, estatistica)
+            if valor is _FIM:
+                break
+            if parar.is_set():
+                descartar(indice - 1, valor)
+                continue
+            inicio = time.perf_counter()
+            try:
+                valor = funcao(valor)
+            except Exception as e:
+                erros.append(e)
+                parar.set()
+                continue
+            finally:
+                estatistica.ocupado += time.perf_counter() - inicio
+            estatistica.itens += 1
+            if saida is None:
+                resultados.append(valor)
+            elif not _colocar(saida, valor, parar, estatistica):
+                descartar(indice, valor)
+        if saida is not None:
+            _colocar(saida, _FIM, parar, estatistica)
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=executar, args=(i,), name=f"pipeline-{estagio[0]}", daemon=True)
+               for i, estagio in enumerate(estagios)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Um estágio que ainda estava em funcao(valor) quando o seguinte já tinha
+    # encerrado deixa a saída na fila, sem ninguém para consumi-la
+    for indice, fila in enumerate(filas):
+        while True:
+            try:
+                valor = fila.get_nowait()
+            except queue.Empty:
+                break
+            if valor is not _FIM:
+                descartar(indice, valor)
+    duracao = time.perf_counter() - inicio
+
+    imprimir_relatorio(estatisticas, duracao)
+    if erros:
+        raise erros[0]
+    return resultados
+
+
+def imprimir_relatorio(estatisticas, duracao):
+    print(f"\nUtilização dos estágios do pipeline ({duracao:.2f}s no total):")
+    for e in estatisticas:
+        utilizacao = (e.ocupado / duracao * 100) if duracao else 0.0
+        print(f"  - {e.nome}: {e.itens} itens, ocupado {e.ocupado:.2f}s ({utilizacao:.0f}%), "
+              f"aguardando entrada {e.aguardando_entrada:.2f}s, aguardando saída {e.aguardando_saida:.2f}s")
@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from offline_cache import calcular_hash_arquivo
+from offline_descoberta import EXTENSOES_EXCEL
+
+
+class IndiceProcessados:
+    """
+    Índice persistente das planilhas TXN já processadas, por hash do conteúdo.
+
+    Cada hash guarda o lote, o arquivo gerado e a data do processamento. A
+    assinatura (nome, tamanho, mtime) de cada arquivo já visto aponta para o seu
+    hash e caminho, de modo que a busca de arquivos só faz uma pesquisa em
+    dicionário, sem abrir a planilha; o hash é calculado apenas para o arquivo
+    que vai ser processado. Assinaturas de arquivos que não existem mais são
+    podadas ao registrar um processamento.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._dados = self._carregar()
+        self._alterado = False
+
+    def _carregar(self):
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            dados = {}
+        dados.setdefault('hashes', {})
+        dados.setdefault('assinaturas', {})
+        return dados
+
+    def salvar(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+            temporario = f"{self.caminho}.tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(self._dados, f, indent=1)
+            os.replace(temporario, self.caminho)
+            self._alterado = False
+
+    def salvar_se_alterado(self):
+        """Grava o índice só se novos hashes foram calculados desde a última gravação."""
+        if self._alterado:
+            self.salvar()
+
+    @staticmethod
+    def assinatura(nome, tamanho, mtime_ns):
+        return f"{nome.upper()}|{tamanho}|{mtime_ns}"
+
+    def hash_do_arquivo(self, caminho, tamanho=None, mtime_ns=None):
+        """Hash do arquivo, reaproveitando o calculado antes se a assinatura não mudou."""
+        if tamanho is None or mtime_ns is None:
+            stat = os.stat(caminho)
+            tamanho, mtime_ns = stat.st_size, stat.st_mtime_ns
+        chave = self.assinatura(os.path.basename(caminho), tamanho, mtime_ns)
+        hash_arquivo = self._hash_da_assinatura(chave)
+        if hash_arquivo is None:
+            hash_arquivo = calcular_hash_arquivo(caminho)
+            self._guardar_assinatura(chave, hash_arquivo, caminho)
+        return hash_arquivo
+
+    def _hash_da_assinatura(self, chave):
+        with self._lock:
+            valor = self._dados['assinaturas'].get(chave)
+        # Índices antigos guardavam só o hash
+        return valor.get('hash') if isinstance(valor, dict) else valor
+
+    def _guardar_assinatura(self, chave, hash_arquivo, caminho):
+        with self._lock:
+            self._dados['assinaturas'][chave] = {'hash': hash_arquivo, 'caminho': os.path.abspath(caminho)}
+            self._alterado = True
+
+    def consultar(self, caminho, tamanho=None, mtime_ns=None):
+        """Retorna o registro do processamento anterior do conteúdo, ou None (calcula o hash se preciso)."""
+        hash_arquivo = self.hash_do_arquivo(caminho, tamanho, mtime_ns)
+        with self._lock:
+            return self._dados['hashes'].get(hash_arquivo)
+
+    def consultar_assinatura(self, nome, tamanho, mtime_ns):
+        """Registro do processamento anterior pela assinatura, sem abrir o arquivo; None se desconhecida."""
+        hash_arquivo = self._hash_da_assinatura(self.assinatura(nome, tamanho, mtime_ns))
+        if hash_arquivo is None:
+            return None
+        with self._lock:
+            return self._dados['hashes'].get(hash_arquivo)
+
+    def candidato_processado(self, diretorio, candidato):
+        """Consulta um candidato de offline_descoberta.listar_candidatos (só pela assinatura)."""
+        nome, _, _, tamanho, mtime_ns = candidato
+        return self.consultar_assinatura(nome, tamanho, mtime_ns) is not None
+
+    def podar_assinaturas(self):
+        """
+        Remove assinaturas cujo arquivo não existe mais (ou mudou desde o
+        cálculo do hash), para que o índice não cresça indefinidamente.
+
+        Returns:
+            int: Quantidade de assinaturas removidas.
+        """
+        with self._lock:
+            assinaturas = list(self._dados['assinaturas'].items())
+        obsoletas = []
+        for chave, valor in assinaturas:
+            caminho = valor.get('caminho') if isinstance(valor, dict) else None
+            try:
+                stat = os.stat(caminho) if caminho else None
+            except OSError:
+                stat = None
+            if stat is None or self.assinatura(os.path.basename(caminho), stat.st_size, stat.st_mtime_ns) != chave:
+                obsoletas.append(chave)
+        with self._lock:
+            for chave in obsoletas:
+                self._dados['assinaturas'].pop(chave, None)
+        return len(obsoletas)
+
+    def registrar(self, caminho, lote, arquivo_saida, origem='processamento'):
+        hash_arquivo = self.hash_do_arquivo(caminho)
+        with self._lock:
+            self._dados['hashes'][hash_arquivo] = {
+                'arquivo_entrada': os.path.basename(caminho),
+                'lote': f'{lote:06d}' if isinstance(lote, int) else lote,
+                'arquivo_saida': arquivo_saida,
+                'processado_em': datetime.now().isoformat(timespec='seconds'),
+                'origem': origem,
+            }
+        self.podar_assinaturas()
+        self.salvar()
+        return hash_arquivo
+
+    def reconstruir(self, diretorio_historico, trabalhadores=8):
+        """
+        Recria o índice a partir das planilhas do diretório de histórico,
+        calculando os hashes em paralelo. Registros existentes (com lote e
+        arquivo gerado) são preservados.
+
+        Returns:
+            int: Quantidade de planilhas novas incluídas no índice.
+        """
+        arquivos = []
+        with os.scandir(diretorio_historico) as entradas:
+            for entrada in entradas:
+                if entrada.is_file() and entrada.name.lower().endswith(EXTENSOES_EXCEL):
+                    stat = entrada.stat()
+                    arquivos.append((entrada.path, stat.st_size, stat.st_mtime_ns))
+
+        def calcular(item):
+            caminho, tamanho, mtime_ns = item
+            return caminho, tamanho, mtime_ns, calcular_hash_arquivo(caminho)
+
+        novos = 0
+        with ThreadPoolExecutor(max_workers=trabalhadores) as executor:
+            for caminho, tamanho, mtime_ns, hash_arquivo in executor.map(calcular, arquivos):
+                self._guardar_assinatura(self.assinatura(os.path.basename(caminho), tamanho, mtime_ns),
+                                         hash_arquivo, caminho)
+                with self._lock:
+                    if hash_arquivo not in self._dados['hashes']:
+                        novos += 1
+                        self._dados['hashes'][hash_arquivo] = {
+                            'arquivo_entrada': os.path.basename(caminho),
+                            'lote': None,
+                            'arquivo_saida': None,
+                            'processado_em': datetime.fromtimestamp(mtime_ns / 1e9).isoformat(timespec='seconds'),
+                            'origem': 'reconstrucao',
+                        }
+        self.salvar()
+        print(f"Índice reconstruído: {len(arquivos)} planilhas no histórico, {novos} novas.")
+        return novos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice de planilhas TXN já processadas.")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+    reconstruir = subparsers.add_parser('reconstruir', help="Recria o índice a partir do diretório de histórico.")
+    reconstruir.add_argument('historico', help="Diretório de histórico com as planilhas processadas.")
+    reconstruir.add_argument('indice', help="Arquivo JSON do índice.")
+    reconstruir.add_argument('--trabalhadores', type=int, default=8)
+    consultar = subparsers.add_parser('consultar', help="Verifica se uma planilha já foi processada.")
+    consultar.add_argument('arquivo')
+    consultar.add_argument('indice')
+    args = parser.parse_args()
+
+    indice = IndiceProcessados(args.indice)
+    if args.comando == 'reconstruir':
+        indice.podar_assinaturas()
+        indice.reconstruir(args.historico, args.trabalhadores)
+    else:
+        registro = indice.consultar(args.arquivo)
+        if registro:
+            print(json.dumps(registro, indent=2, ensure_ascii=False))
+        else:
+            print("Planilha não encontrada no índice de processados.")
+        indice.salvar_se_alterado()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+
+from moeda import COLUNA_CENTAVOS, para_centavos
+
+TAMANHOS_CARTAO = (16,)
+TXN_MINIMO = 1
+TXN_MAXIMO = 9999  # 4 dígitos no layout
+LIMITE_VALOR_CENTAVOS = 10 ** 17 - 1  # 17 dígitos no layout
+COLUNA_MOTIVO = 'MOTIVO REJEIÇÃO'
+
+
+def normalizar_cartoes(cartoes):
+    """
+    Converte a coluna de cartões para texto só com dígitos. Números lidos do
+    Excel como float (ex.: 4111111111111111.0) perdem o sufixo ".0".
+    """
+    texto = cartoes.astype('string').str.strip()
+    return texto.str.replace(r'\.0+$', '', regex=True)
+
+
+def luhn_valido(cartoes):
+    """
+    Verifica o dígito de Luhn de uma série de cartões (texto com dígitos) de
+    uma vez, em uma matriz de dígitos alinhada à direita.
+    """
+    resultado = pd.Series(False, index=cartoes.index)
+    formato_ok = cartoes.str.fullmatch(r'\d{1,19}').fillna(False).astype(bool)
+    if not formato_ok.any():
+        return resultado
+    alinhados = cartoes[formato_ok].str.zfill(19)
+    digitos = (np.frombuffer(''.join(alinhados).encode('ascii'), dtype=np.uint8)
+               .reshape(-1, 19).astype(np.int16) - ord('0'))
+    # Da direita para a esquerda, dobra um dígito sim, outro não (posições 17, 15, ... 1)
+    dobrados = digitos[:, -2::-2] * 2
+    dobrados = np.where(dobrados > 9, dobrados - 9, dobrados)
+    soma = digitos[:, -1::-2].sum(axis=1) + dobrados.sum(axis=1)
+    resultado[formato_ok] = soma % 10 == 0
+    return resultado
+
+
+def validar_registros(df, tamanhos_cartao=TAMANHOS_CARTAO, txn_minimo=TXN_MINIMO, txn_maximo=TXN_MAXIMO):
+    """
+    Valida todas as linhas da planilha antes da geração do arquivo, com
+    operações por coluna: tamanho e Luhn do cartão, faixa do TXN, valor
+    positivo (e dentro do layout) e data de envio preenchida.
+
+    Returns:
+        tuple: (validos, rejeitados). validos traz as colunas já normalizadas
+        (cartão em texto, TXN inteiro, valor numérico e VALOR CENTAVOS em
+        int64) e índice sequencial;
+        rejeitados traz as linhas originais com a coluna MOTIVO REJEIÇÃO.
+    """
+    cartoes = normalizar_cartoes(df['NUMERO CARTÃO'])
+    txn = pd.to_numeric(df['TXN'], errors='coerce')
+    valores = pd.to_numeric(df['VALOR'], errors='coerce')
+    centavos = para_centavos(df['VALOR'])  # do valor original, sem passar por float
+    datas = pd.to_datetime(df['DATA DE ENVIO'], errors='coerce')
+
+    tamanho_ok = cartoes.str.len().isin(tamanhos_cartao).fillna(False).astype(bool)
+    cartao_numerico = cartoes.str.fullmatch(r'\d+').fillna(False).astype(bool)
+    verificacoes = [
+        (cartao_numerico & tamanho_ok,
+         f"Cartão deve ter {'/'.join(map(str, tamanhos_cartao))} dígitos"),
+        (~(cartao_numerico & tamanho_ok) | luhn_valido(cartoes), "Cartão com dígito verificador inválido"),
+        (txn.notna() & (txn % 1 == 0) & txn.between(txn_minimo, txn_maximo),
+         f"TXN fora da faixa {txn_minimo}-{txn_maximo}"),
+        (centavos.notna() & (centavos > 0) & (centavos <= LIMITE_VALOR_CENTAVOS), "Valor não positivo ou inválido"),
+        (datas.notna(), "Data de envio vazia ou inválida"),
+    ]
+
+    motivos = pd.Series('', index=df.index, dtype=object)
+    for valido, motivo in verificacoes:
+        invalido = ~valido.fillna(False).astype(bool)
+        motivos[invalido] = motivos[invalido] + motivo + '; '
+    rejeitado = motivos != ''
+
+    validos = df.loc[~rejeitado].copy()
+    validos['NUMERO CARTÃO'] = cartoes[~rejeitado]
+    validos['TXN'] = txn[~rejeitado].astype('int64')
+    validos['VALOR'] = valores[~rejeitado]
+    validos[COLUNA_CENTAVOS] = centavos[~rejeitado].astype('int64')
+    validos['DATA DE ENVIO'] = datas[~rejeitado]
+    validos = validos.reset_index(drop=True)
+
+    rejeitados = df.loc[rejeitado].copy()
+    rejeitados.insert(0, 'LINHA PLANILHA', rejeitados.index + 2)  # +1 do cabeçalho, +1 da base 1
+    rejeitados[COLUNA_MOTIVO] = motivos[rejeitado].str.rstrip('; ')
+    return validos, rejeitados
+
+
+def salvar_rejeitados(rejeitados, caminho):
+    """Grava a planilha de rejeitados (anexada à notificação do processamento)."""
+    rejeitados.to_excel(caminho, index=False)
+    print(f"Planilha de rejeitados gerada: {caminho} ({len(rejeitados)} linhas)")
+    return caminho
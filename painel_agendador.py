@@ -0,0 +1,387 @@
+import datetime
+import heapq
+import threading
+import time
+
+INTERVALO_RECONCILIACAO = 15 * 60  # segundos entre releituras completas dos agendamentos no banco
+ESPERA_APOS_ERRO = 60  # segundos até tentar recarregar de novo quando o banco falha
+MAX_EXECUCOES_SIMULTANEAS = 4  # limite global de execuções agendadas ao mesmo tempo
+
+# Prioridade da tarefa (Tarefa.prioridade) como atraso na ordem da fila, em segundos
+PRIORIDADES = ('Alta', 'Média', 'Baixa')
+PRIORIDADE_PADRAO = 'Média'
+ATRASO_PRIORIDADE = {'Alta': 0, 'Média': 5 * 60, 'Baixa': 15 * 60}
+VAGAS_RESERVADAS = 1  # threads que 'Baixa' não ocupa com o pool saturado
+ESPERA_MAXIMA_ADIAMENTO = 30 * 60  # depois disso 'Baixa' não é mais adiado
+ESPERA_REAVALIACAO = 30  # segundos entre reavaliações da fila com trabalhos adiados
+
+# Pools de recursos: execuções simultâneas por recurso ('cd-node:*' vale para
+# qualquer nó sem capacidade própria; recursos fora da tabela não têm limite)
+CAPACIDADE_RECURSOS = {'local-cpu': 2, 'cd-node:*': 1}
+
+
+def recursos_da_tarefa(tipo_execucao, cd_destination_node=None):
+    """Recursos que a execução consome: CPU/disco local (BAT) ou sessões no nó remoto do Connect:Direct."""
+    if tipo_execucao == 'ConnectDirect':
+        return [f"cd-node:{cd_destination_node or 'desconhecido'}"]
+    return ['local-cpu']
+
+
+class PoolExecucao:
+    """
+    Pool limitado de threads para as execuções vencidas: no máximo
+    max_simultaneas ao mesmo tempo e nunca duas da mesma tarefa (chave). Um
+    trabalho cuja tarefa já está rodando espera na fila sem segurar uma
+    thread, e os seguintes continuam sendo atendidos.
+
+    A fila é um heap por (horário agendado + atraso da prioridade): 'Alta'
+    sai antes de 'Média' e 'Baixa' com o mesmo horário, e o atraso fixo faz
+    o papel de envelhecimento, já que um trabalho antigo acaba passando à
+    frente dos mais prioritários que chegaram depois. Com o pool quase
+    cheio, 'Baixa' não ocupa as últimas VAGAS_RESERVADAS threads (até
+    esperar ESPERA_MAXIMA_ADIAMENTO).
+
+    Cada trabalho declara os recursos que consome (ex.: "local-cpu",
+    "cd-node:NOME") e só é admitido quando todos têm capacidade livre;
+    enquanto isso, trabalhos de outros recursos seguem sendo atendidos.
+    """
+
+    def __init__(self, max_simultaneas=MAX_EXECUCOES_SIMULTANEAS, nome="execucao", capacidades=None):
+        self.max_simultaneas = max_simultaneas
+        self.capacidades = dict(CAPACIDADE_RECURSOS if capacidades is None else capacidades)
+        self._em_uso = {}  # {recurso: execuções em andamento}
+        self.vagas_reservadas = min(VAGAS_RESERVADAS, max_simultaneas - 1)
+        self._condicao = threading.Condition()
+        self._pendentes = []  # heap de (ordem, sequência, trabalho)
+        self._sequencia = 0
+        self._ocupadas = set()  # chaves (tarefas) em execução ou reservadas
+        self._executando = 0
+        self._metricas = {prioridade: {'iniciados': 0, 'adiados': 0, 'espera_total': 0.0, 'espera_maxima': 0.0}
+                          for prioridade in PRIORIDADES}
+        self._ativo = True
+        self._threads = [threading.Thread(target=self._trabalhar, name=f"{nome}-{i + 1}", daemon=True)
+                         for i in range(max_simultaneas)]
+        for thread in self._threads:
+            thread.start()
+
+    def enviar(self, chave, funcao, *args, prioridade=PRIORIDADE_PADRAO, agendado_para=None, recursos=()):
+        """Enfileira funcao(*args) para a tarefa `chave` sem esperar a execução."""
+        if prioridade not in ATRASO_PRIORIDADE:
+            prioridade = PRIORIDADE_PADRAO
+        horario = agendado_para.timestamp() if agendado_para else time.time()
+        trabalho = {'chave': chave, 'funcao': funcao, 'args': args, 'prioridade': prioridade,
+                    'recursos': tuple(recursos or ()), 'enfileirado_em': time.monotonic(), 'adiado': False}
+        with self._condicao:
+            if not self._ativo:
+                raise RuntimeError("Pool de execução parado")
+            self._sequencia += 1
+            heapq.heappush(self._pendentes, (horario + ATRASO_PRIORIDADE[prioridade], self._sequencia, trabalho))
+            self._condicao.notify_all()
+
+    def tentar_reservar(self, chave, recursos=()):
+        """
+        Reserva a tarefa e os seus recursos para uma execução fora do pool
+        (ex.: manual); False se a tarefa já está rodando ou falta capacidade.
+        """
+        with self._condicao:
+            if chave in self._ocupadas or not self._recursos_livres(recursos):
+                return False
+            self._ocupadas.add(chave)
+            self._ocupar_recursos(recursos, 1)
+            return True
+
+    def liberar(self, chave, recursos=()):
+        with self._condicao:
+            self._ocupadas.discard(chave)
+            self._ocupar_recursos(recursos, -1)
+            self._condicao.notify_all()
+
+    def capacidade(self, recurso):
+        """Capacidade do recurso (None = sem limite)."""
+        if recurso in self.capacidades:
+            return self.capacidades[recurso]
+        prefixo = recurso.split(':', 1)[0]
+        return self.capacidades.get(f"{prefixo}:*")
+
+    def _recursos_livres(self, recursos):
+        for recurso in recursos:
+            capacidade = self.capacidade(recurso)
+            if capacidade is not None and self._em_uso.get(recurso, 0) >= capacidade:
+                return False
+        return True
+
+    def _ocupar_recursos(self, recursos, quantidade):
+        for recurso in recursos:
+            em_uso = self._em_uso.get(recurso, 0) + quantidade
+            if em_uso > 0:
+                self._em_uso[recurso] = em_uso
+            else:
+                self._em_uso.pop(recurso, None)
+
+    def situacao(self):
+        """Execuções em andamento e, por prioridade, fila atual e tempos de espera (segundos)."""
+        with self._condicao:
+            agora = time.monotonic()
+            prioridades = {}
+            for prioridade, metricas in self._metricas.items():
+                na_fila = [t for _, _, t in self._pendentes if t['prioridade'] == prioridade]
+                prioridades[prioridade] = {
+                    'fila': len(na_fila),
+                    'espera_atual_maxima': round(max((agora - t['enfileirado_em'] for t in na_fila), default=0.0), 1),
+                    'iniciados': metricas['iniciados'],
+                    'adiados': metricas['adiados'],
+                    'espera_media': round(metricas['espera_total'] / metricas['iniciados'], 1) if metricas['iniciados'] else 0.0,
+                    'espera_maxima': round(metricas['espera_maxima'], 1),
+                }
+            recursos = {recurso: {'em_uso': self._em_uso.get(recurso, 0), 'capacidade': self.capacidade(recurso),
+                                  'fila': sum(1 for _, _, t in self._pendentes if recurso in t['recursos'])}
+                        for recurso in sorted(set(self._em_uso) | {r for _, _, t in self._pendentes for r in t['recursos']})}
+            return {'pendentes': len(self._pendentes), 'executando': self._executando,
+                    'max_simultaneas': self.max_simultaneas,
+                    'tarefas_ocupadas': sorted(self._ocupadas, key=str), 'prioridades': prioridades,
+                    'recursos': recursos}
+
+    @property
+    def ativo(self):
+        with self._condicao:
+            return self._ativo
+
+    def parar(self):
+        """Para as threads ao fim das execuções atuais; devolve os trabalhos não iniciados."""
+        with self._condicao:
+            self._ativo = False
+            pendentes, self._pendentes = [t for _, _, t in sorted(self._pendentes)], []
+            self._condicao.notify_all()
+        return pendentes
+
+    def _adiar(self, trabalho, agora):
+        if trabalho['prioridade'] != 'Baixa' or agora - trabalho['enfileirado_em'] >= ESPERA_MAXIMA_ADIAMENTO:
+            return False
+        if self._executando < self.max_simultaneas - self.vagas_reservadas:
+            return False
+        if not trabalho['adiado']:
+            trabalho['adiado'] = True
+            self._metricas['Baixa']['adiados'] += 1
+        return True
+
+    def _proximo(self):
+        """Retira o primeiro trabalho da fila com tarefa e recursos livres e que não deve ser adiado."""
+        agora = time.monotonic()
+        ignorados = []
+        trabalho = None
+        while self._pendentes:
+            entrada = heapq.heappop(self._pendentes)
+            if (entrada[2]['chave'] in self._ocupadas or not self._recursos_livres(entrada[2]['recursos'])
+                    or self._adiar(entrada[2], agora)):
+                ignorados.append(entrada)
+                continue
+            trabalho = entrada[2]
+            break
+        for entrada in ignorados:
+            heapq.heappush(self._pendentes, entrada)
+        return trabalho
+
+    def _trabalhar(self):
+        while True:
+            with self._condicao:
+                trabalho = None
+                while self._ativo:
+                    trabalho = self._proximo()
+                    if trabalho:
+                        break
+                    # Com trabalhos adiados na fila, reavalia periodicamente o envelhecimento
+                    self._condicao.wait(ESPERA_REAVALIACAO if self._pendentes else None)
+                if not trabalho:
+                    return
+                chave = trabalho['chave']
+                self._ocupadas.add(chave)
+                self._ocupar_recursos(trabalho['recursos'], 1)
+                self._executando += 1
+                espera = time.monotonic() - trabalho['enfileirado_em']
+                metricas = self._metricas[trabalho['prioridade']]
+                metricas['iniciados'] += 1
+                metricas['espera_total'] += espera
+                metricas['espera_maxima'] = max(metricas['espera_maxima'], espera)
+            try:
+                trabalho['funcao'](*trabalho['args'])
+            except Exception as e:
+                print(f"Erro na execução da tarefa {chave}: {e}")
+            finally:
+                with self._condicao:
+                    self._ocupadas.discard(chave)
+                    self._ocupar_recursos(trabalho['recursos'], -1)
+                    self._executando -= 1
+                    self._condicao.notify_all()
+
+
+class AgendadorHeap:
+    """
+    Agendador orientado a eventos: mantém a próxima execução de cada
+    agendamento ativo em um heap (menor data no topo) e dorme exatamente até
+    o primeiro vencimento, em vez de consultar o banco a cada minuto.
+
+    carregar() devolve [(agendamento_id, proxima_execucao, tarefa_id,
+    prioridade, recursos), ...] dos agendamentos ativos; disparar(agendamento_id) executa o agendamento
+    vencido e devolve a nova proxima_execucao (None quando não há mais).
+    Os vencidos vão para o pool de execução, então o laço do agendador
+    nunca espera uma execução terminar.
+
+    O banco só é relido quando notificar_alteracao() é chamado (criação,
+    edição ou exclusão) ou a cada intervalo_reconciliacao segundos, para
+    pegar alterações feitas fora do painel.
+
+    parar(parar_pool=False) seguido de iniciar() reinicia só o heap: o pool
+    e as execuções em andamento continuam, e o agendamento que ainda está
+    rodando não é disparado de novo pela releitura do banco.
+    """
+
+    def __init__(self, carregar, disparar, intervalo_reconciliacao=INTERVALO_RECONCILIACAO,
+                 agora=datetime.datetime.now, pool=None):
+        self._carregar = carregar
+        self._disparar = disparar
+        self.pool = pool or PoolExecucao()
+        self.intervalo_reconciliacao = intervalo_reconciliacao
+        self._agora = agora
+        self._condicao = threading.Condition()
+        self._heap = []  # (proxima_execucao, agendamento_id); entradas obsoletas são ignoradas
+        self._proximas = {}  # {agendamento_id: proxima_execucao} vigente
+        self._tarefas = {}  # {agendamento_id: (tarefa_id, prioridade, recursos)} para o pool
+        self._em_execucao = set()
+        self._recarregar = True
+        self._proxima_reconciliacao = 0.0
+        self._ativo = False
+        self._thread = None
+        self.recargas = 0
+        self.disparos = 0
+
+    def iniciar(self):
+        with self._condicao:
+            if self._ativo:
+                return
+        # Reinício: o laço anterior precisa sair antes de outro começar
+        if self._thread and self._thread.is_alive():
+            self._thread.join()
+        with self._condicao:
+            if self._ativo:
+                return
+            self._ativo = True
+            self._recarregar = True
+        self._thread = threading.Thread(target=self._loop, name="agendador", daemon=True)
+        self._thread.start()
+
+    def parar(self, aguardar=None, parar_pool=True):
+        with self._condicao:
+            self._ativo = False
+            self._condicao.notify_all()
+        if parar_pool:
+            self.pool.parar()
+        if aguardar is not None and self._thread:
+            self._thread.join(aguardar)
+
+    def notificar_alteracao(self):
+        """Pede a releitura dos agendamentos (chamado após criar, editar ou excluir)."""
+        with self._condicao:
+            self._recarregar = True
+            self._condicao.notify_all()
+
+    def atualizar(self, agendamento_id, proxima_execucao):
+        """Atualiza a próxima execução de um agendamento sem reler o banco."""
+        with self._condicao:
+            self._definir(agendamento_id, proxima_execucao)
+            self._condicao.notify_all()
+
+    def proximo_disparo(self):
+        """(proxima_execucao, agendamento_id) do primeiro vencimento, ou None."""
+        with self._condicao:
+            self._descartar_obsoletas()
+            return self._heap[0] if self._heap else None
+
+    def _definir(self, agendamento_id, proxima_execucao):
+        if proxima_execucao is None:
+            self._proximas.pop(agendamento_id, None)
+            return
+        self._proximas[agendamento_id] = proxima_execucao
+        heapq.heappush(self._heap, (proxima_execucao, agendamento_id))
+
+    def _descartar_obsoletas(self):
+        while self._heap and self._proximas.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def _recarregar_agendamentos(self):
+        try:
+            agendamentos = self._carregar()
+        except Exception as e:
+            print(f"Erro ao carregar agendamentos: {e}")
+            with self._condicao:
+                self._proxima_reconciliacao = time.monotonic() + ESPERA_APOS_ERRO
+            return
+        with self._condicao:
+            # Agendamentos em execução mantêm a data antiga no banco até terminarem
+            self._heap = []
+            self._proximas = {}
+            self._tarefas = {}
+            for agendamento_id, proxima_execucao, tarefa_id, prioridade, recursos in agendamentos:
+                self._tarefas[agendamento_id] = (tarefa_id, prioridade, recursos)
+                if agendamento_id not in self._em_execucao:
+                    self._definir(agendamento_id, proxima_execucao)
+            self._proxima_reconciliacao = time.monotonic() + self.intervalo_reconciliacao
+            self.recargas += 1
+
+    def _retirar_vencidos(self, agora):
+        vencidos = []
+        self._descartar_obsoletas()
+        while self._heap and self._heap[0][0] <= agora:
+            proxima_execucao, agendamento_id = heapq.heappop(self._heap)
+            del self._proximas[agendamento_id]
+            self._em_execucao.add(agendamento_id)
+            vencidos.append((agendamento_id, proxima_execucao))
+            self._descartar_obsoletas()
+        return vencidos
+
+    def _tempo_espera(self, agora):
+        espera = self._proxima_reconciliacao - time.monotonic()
+        if self._heap:
+            espera = min(espera, (self._heap[0][0] - agora).total_seconds())
+        return max(espera, 0)
+
+    def _executar(self, agendamento_id):
+        proxima_execucao = None
+        try:
+            proxima_execucao = self._disparar(agendamento_id)
+        except Exception as e:
+            # Sem a nova data, o agendamento volta na próxima reconciliação
+            print(f"Erro no agendador ao executar o agendamento {agendamento_id}: {e}")
+        finally:
+            with self._condicao:
+                self._em_execucao.discard(agendamento_id)
+                self._definir(agendamento_id, proxima_execucao)
+                self.disparos += 1
+                self._condicao.notify_all()
+
+    def _loop(self):
+        while True:
+            with self._condicao:
+                if not self._ativo:
+                    return
+                recarregar = self._recarregar or time.monotonic() >= self._proxima_reconciliacao
+                self._recarregar = False
+            if recarregar:
+                self._recarregar_agendamentos()
+
+            with self._condicao:
+                if not self._ativo:
+                    return
+                agora = self._agora()
+                vencidos = self._retirar_vencidos(agora)
+                if not vencidos:
+                    if not self._recarregar:
+                        self._condicao.wait(self._tempo_espera(agora))
+                    continue
+                tarefas = [self._tarefas.get(agendamento_id, (agendamento_id, None, ()))
+                           for agendamento_id, _ in vencidos]
+            for (agendamento_id, proxima_execucao), (tarefa_id, prioridade, recursos) in zip(vencidos, tarefas):
+                try:
+                    self.pool.enviar(tarefa_id, self._executar, agendamento_id, prioridade=prioridade,
+                                     agendado_para=proxima_execucao, recursos=recursos)
+                except RuntimeError:
+                    return
@@ -0,0 +1,259 @@
+import collections
+import datetime
+import locale
+import os
+import signal
+import subprocess
+import threading
+import time
+
+TIMEOUT_PADRAO_MINUTOS = 5  # usado quando a tarefa não define o próprio tempo limite
+TAMANHO_BUFFER = 256 * 1024  # bytes mantidos em memória por execução (o restante fica só no arquivo)
+TAMANHO_BLOCO = 4096  # bytes lidos dos pipes por vez
+ESPERA_ENCERRAMENTO = 5  # segundos entre o pedido de término e o kill forçado
+DIRETORIO_LOGS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs_execucao')
+# Retenção dos arquivos de log: os mais antigos que isso, ou além dos mais recentes por tarefa, são apagados
+RETENCAO_LOGS_DIAS = 30
+MAX_LOGS_POR_TAREFA = 100
+
+
+class BufferCircular:
+    """
+    Últimos `capacidade` bytes da saída. Os blocos mais antigos são
+    descartados ao encher, então a memória não cresce com jobs verbosos.
+    As posições são absolutas (bytes desde o início da execução), o que
+    permite a quem acompanha ler só o que chegou desde a última leitura.
+    """
+
+    def __init__(self, capacidade=TAMANHO_BUFFER):
+        self.capacidade = capacidade
+        self._blocos = collections.deque()
+        self._tamanho = 0
+        self._inicio = 0  # posição absoluta do primeiro byte mantido
+        self._lock = threading.Lock()
+
+    @property
+    def total(self):
+        with self._lock:
+            return self._inicio + self._tamanho
+
+    def escrever(self, dados):
+        with self._lock:
+            if len(dados) >= self.capacidade:
+                self._inicio += self._tamanho + len(dados) - self.capacidade
+                self._blocos.clear()
+                dados = dados[-self.capacidade:]
+                self._tamanho = 0
+            self._blocos.append(dados)
+            self._tamanho += len(dados)
+            while self._tamanho > self.capacidade:
+                excesso = self._tamanho - self.capacidade
+                primeiro = self._blocos[0]
+                if len(primeiro) <= excesso:
+                    self._blocos.popleft()
+                    cortado = len(primeiro)
+                else:
+                    self._blocos[0] = primeiro[excesso:]
+                    cortado = excesso
+                self._tamanho -= cortado
+                self._inicio += cortado
+
+    def ler_desde(self, posicao=0):
+        """Devolve (dados, nova_posicao, descartados): o que chegou depois de `posicao`."""
+        with self._lock:
+            dados = b''.join(self._blocos)
+            inicio = self._inicio
+        descartados = max(0, inicio - posicao)
+        return dados[max(0, posicao - inicio):], inicio + len(dados), descartados
+
+
+def _opcoes_grupo_processos():
+    # O processo filho abre um grupo próprio para que o timeout encerre também os netos
+    if os.name == 'nt':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+
+class ExecucaoProcesso:
+    """
+    Executa um comando lendo stdout e stderr em threads próprias, bloco a
+    bloco, conforme a saída é produzida. Cada bloco vai para o buffer
+    circular (acompanhamento ao vivo e resumo gravado no banco) e para o
+    arquivo de log em disco (saída completa). Ao passar do tempo limite, a
+    árvore inteira de processos é encerrada.
+    """
+
+    def __init__(self, comando, cwd=None, timeout_minutos=None, arquivo_log=None,
+                 tamanho_buffer=TAMANHO_BUFFER):
+        self.comando = comando
+        self.cwd = cwd
+        self.timeout = (timeout_minutos or TIMEOUT_PADRAO_MINUTOS) * 60
+        self.arquivo_log = arquivo_log
+        self.buffer = BufferCircular(tamanho_buffer)
+        self.codigo_retorno = None
+        self.expirou = False
+        self.iniciado_em = None
+        self.finalizado_em = None
+        self.finalizado = threading.Event()
+        self._processo = None
+        self._leitores = []
+        self._log = None
+        self._log_lock = threading.Lock()
+
+    def iniciar(self):
+        if self.arquivo_log:
+            os.makedirs(os.path.dirname(self.arquivo_log) or '.', exist_ok=True)
+            self._log = open(self.arquivo_log, 'wb')
+        self.iniciado_em = time.monotonic()
+        try:
+            self._processo = subprocess.Popen(
+                self.comando, cwd=self.cwd, stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, **_opcoes_grupo_processos())
+        except Exception:
+            self._fechar_log()
+            self.finalizado.set()
+            raise
+        for pipe in (self._processo.stdout, self._processo.stderr):
+            leitor = threading.Thread(target=self._ler, args=(pipe,), daemon=True)
+            leitor.start()
+            self._leitores.append(leitor)
+        return self
+
+    def _ler(self, pipe):
+        try:
+            while True:
+                dados = os.read(pipe.fileno(), TAMANHO_BLOCO)
+                if not dados:
+                    break
+                self.buffer.escrever(dados)
+                with self._log_lock:
+                    if self._log:
+                        self._log.write(dados)
+                        self._log.flush()
+        except (OSError, ValueError):
+            pass
+        finally:
+            pipe.close()
+
+    def aguardar(self):
+        """Espera o término (ou o tempo limite) e devolve o código de retorno."""
+        try:
+            self.codigo_retorno = self._processo.wait(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            self.expirou = True
+            self.encerrar_arvore()
+            self.codigo_retorno = self._processo.wait()
+        for leitor in self._leitores:
+            # Netos que herdaram o pipe e escaparam do kill não seguram a execução
+            leitor.join(ESPERA_ENCERRAMENTO)
+        self._fechar_log()
+        self.finalizado_em = time.monotonic()
+        self.finalizado.set()
+        return self.codigo_retorno
+
+    def encerrar_arvore(self):
+        """Encerra o processo e todos os descendentes."""
+        if self._processo is None or self._processo.poll() is not None:
+            return
+        if os.name == 'nt':
+            subprocess.run(['taskkill', '/F', '/T', '/PID', str(self._processo.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return
+        try:
+            os.killpg(self._processo.pid, signal.SIGTERM)
+            self._processo.wait(ESPERA_ENCERRAMENTO)
+        except subprocess.TimeoutExpired:
+            os.killpg(self._processo.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def _fechar_log(self):
+        if self._log:
+            with self._log_lock:
+                self._log.close()
+                self._log = None
+
+    @property
+    def duracao(self):
+        if not self.iniciado_em:
+            return 0
+        return (self.finalizado_em or time.monotonic()) - self.iniciado_em
+
+    def ler_desde(self, posicao=0):
+        """Texto produzido desde `posicao`: (texto, nova_posicao, bytes descartados do buffer)."""
+        dados, nova_posicao, descartados = self.buffer.ler_desde(posicao)
+        return decodificar(dados), nova_posicao, descartados
+
+    def resumo(self):
+        """Saída mantida em memória, com a indicação do que ficou só no arquivo de log."""
+        texto, total, descartados = self.ler_desde(0)
+        if descartados:
+            texto = f"[... {descartados} bytes iniciais omitidos (ver arquivo de log) ...]\n" + texto
+        return self._com_aviso_de_timeout(texto)
+
+    def log_completo(self):
+        """Saída inteira, lida do arquivo de log; sem arquivo (ou se ele não puder ser lido), o resumo."""
+        if not self.arquivo_log or self._log is not None:
+            return self.resumo()
+        try:
+            with open(self.arquivo_log, 'rb') as f:
+                texto = decodificar(f.read())
+        except OSError:
+            return self.resumo()
+        return self._com_aviso_de_timeout(texto)
+
+    def _com_aviso_de_timeout(self, texto):
+        if self.expirou:
+            texto += f"\n[Execução encerrada: excedeu o tempo limite de {self.timeout / 60:g} minutos]"
+        return texto
+
+
+def decodificar(dados):
+    # Saída do cmd.exe vem na codificação local; blocos cortados no meio de um caractere viram '?'
+    return dados.decode(locale.getpreferredencoding(False), errors='replace')
+
+
+def caminho_log(task_id, inicio=None):
+    """Arquivo de log da execução: logs_execucao/tarefa_<id>/<data_hora>.log"""
+    inicio = inicio or datetime.datetime.now()
+    return os.path.join(DIRETORIO_LOGS, f"tarefa_{task_id}", inicio.strftime('%Y%m%d_%H%M%S_%f') + '.log')
+
+
+def limpar_logs_tarefa(diretorio_tarefa, dias=RETENCAO_LOGS_DIAS, maximo=MAX_LOGS_POR_TAREFA, agora=None):
+    """
+    Apaga os logs de uma tarefa mais antigos que `dias` e os que excedem os
+    `maximo` mais recentes; remove o diretório se ficar vazio.
+
+    Returns:
+        int: Quantidade de arquivos apagados.
+    """
+    limite = (agora or time.time()) - dias * 86400
+    try:
+        with os.scandir(diretorio_tarefa) as entradas:
+            logs = sorted(((e.stat().st_mtime, e.path) for e in entradas
+                           if e.is_file() and e.name.endswith('.log')), reverse=True)
+    except FileNotFoundError:
+        return 0
+    apagados = 0
+    for posicao, (mtime, caminho) in enumerate(logs):
+        if posicao >= maximo or mtime < limite:
+            try:
+                os.remove(caminho)
+                apagados += 1
+            except OSError:
+                pass  # Ainda aberto (Windows) ou já removido; fica para a próxima limpeza
+    try:
+        os.rmdir(diretorio_tarefa)  # Só remove se estiver vazio
+    except OSError:
+        pass
+    return apagados
+
+
+def limpar_logs(diretorio=None, dias=RETENCAO_LOGS_DIAS, maximo_por_tarefa=MAX_LOGS_POR_TAREFA):
+    """Aplica a retenção a todas as tarefas (inclusive as já excluídas). Devolve os arquivos apagados."""
+    try:
+        with os.scandir(diretorio or DIRETORIO_LOGS) as entradas:
+            diretorios = [e.path for e in entradas if e.is_dir() and e.name.startswith('tarefa_')]
+    except FileNotFoundError:
+        return 0
+    return sum(limpar_logs_tarefa(d, dias, maximo_por_tarefa) for d in diretorios)
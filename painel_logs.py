@@ -0,0 +1,76 @@
+import base64
+import gzip
+import hashlib
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Trecho mantido na própria linha de painel_execucoes (caracteres do início e do fim);
+# o log completo fica comprimido em painel_logs_execucao, endereçado pelo hash do conteúdo
+TAMANHO_INICIO = 1000
+TAMANHO_FIM = 3000
+NIVEL_ZSTD = 10
+NIVEL_GZIP = 6
+
+
+def hash_log(texto):
+    """SHA-256 do texto: saídas idênticas de execuções diferentes ocupam um único registro."""
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def precisa_armazenar(texto):
+    return texto is not None and len(texto) > TAMANHO_INICIO + TAMANHO_FIM
+
+
+def trecho(texto):
+    """Início e fim do log, com a indicação do que foi omitido."""
+    if not precisa_armazenar(texto):
+        return texto
+    omitidos = len(texto) - TAMANHO_INICIO - TAMANHO_FIM
+    return (f"{texto[:TAMANHO_INICIO]}\n\n[... {omitidos} caracteres omitidos; "
+            f"log completo no histórico de execuções ...]\n\n{texto[-TAMANHO_FIM:]}")
+
+
+def comprimir(texto):
+    """Devolve (compressao, dados): zstd quando disponível, senão gzip."""
+    dados = texto.encode('utf-8')
+    if ZSTD_AVAILABLE:
+        return 'zstd', zstandard.ZstdCompressor(level=NIVEL_ZSTD).compress(dados)
+    return 'gzip', gzip.compress(dados, compresslevel=NIVEL_GZIP)
+
+
+def descomprimir(compressao, dados):
+    if compressao == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("Log comprimido com zstd; instale o pacote zstandard para lê-lo.")
+        return zstandard.ZstdDecompressor().decompress(dados).decode('utf-8')
+    if compressao == 'gzip':
+        return gzip.decompress(dados).decode('utf-8')
+    raise ValueError(f"Compressão desconhecida: {compressao}")
+
+
+def preparar_log(texto):
+    """
+    Separa o log de uma execução em (log_output, registro do armazenamento).
+    Logs curtos continuam inteiros na linha e o registro é None; os longos
+    viram um trecho na linha e um registro {hash, compressao,
+    tamanho_original, conteudo} para painel_logs_execucao.
+    """
+    if not precisa_armazenar(texto):
+        return texto, None
+    compressao, conteudo = comprimir(texto)
+    registro = {'hash': hash_log(texto), 'compressao': compressao,
+                'tamanho_original': len(texto), 'conteudo': conteudo}
+    return trecho(texto), registro
+
+
+def conteudo_para_exportacao(conteudo):
+    """Blob em base64 para os arquivos JSON de exportação/backup."""
+    return base64.b64encode(bytes(conteudo)).decode('ascii') if conteudo is not None else None
+
+
+def conteudo_da_exportacao(texto):
+    return base64.b64decode(texto) if texto else None
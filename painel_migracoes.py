@@ -0,0 +1,107 @@
+import datetime
+
+# Migrações de esquema aplicadas na abertura do banco, em ordem de versão.
+# painel_schema_versao registra as versões já aplicadas; cada migração roda na
+# sua própria transação junto com o registro da versão, e os passos são
+# idempotentes (verificam se a coluna/índice já existe), então bancos criados
+# antes do controle de versões, ou já com as estruturas novas, são aceitos.
+# Duas instâncias abrindo o mesmo banco se serializam pela trava da transação
+# (BEGIN IMMEDIATE no SQLite, sp_getapplock no SQL Server) e cada uma relê as
+# versões aplicadas depois de obtê-la.
+
+TABELA_VERSAO = 'painel_schema_versao'
+
+
+def sql_criar_controle(dialeto):
+    if dialeto == 'mssql':
+        return f"""
+            IF OBJECT_ID('{TABELA_VERSAO}', 'U') IS NULL
+                CREATE TABLE {TABELA_VERSAO} (
+                    versao INT NOT NULL PRIMARY KEY,
+                    descricao NVARCHAR(200),
+                    data_aplicacao DATETIME
+                )
+        """
+    return f"""
+        CREATE TABLE IF NOT EXISTS {TABELA_VERSAO} (
+            versao INTEGER PRIMARY KEY,
+            descricao TEXT,
+            data_aplicacao TIMESTAMP
+        )
+    """
+
+
+SQL_VERSOES_APLICADAS = f"SELECT versao FROM {TABELA_VERSAO}"
+SQL_VERSAO_APLICADA = f"SELECT 1 FROM {TABELA_VERSAO} WHERE versao = :versao"
+SQL_REGISTRAR_VERSAO = (f"INSERT INTO {TABELA_VERSAO} (versao, descricao, data_aplicacao) "
+                        "VALUES (:versao, :descricao, :data_aplicacao)")
+
+
+def sql_travar_migracoes(dialeto):
+    """Trava exclusiva até o fim da transação (SQL Server); None nos outros dialetos."""
+    if dialeto == 'mssql':
+        return (f"EXEC sp_getapplock @Resource = '{TABELA_VERSAO}', @LockMode = 'Exclusive', "
+                "@LockOwner = 'Transaction', @LockTimeout = 60000")
+    return None
+
+
+def adicionar_coluna(tabela, coluna, tipo):
+    """Passo que cria a coluna quando ela ainda não existe."""
+    def passo(dialeto, consultar):
+        if dialeto == 'mssql':
+            return [f"IF COL_LENGTH('{tabela}', '{coluna}') IS NULL ALTER TABLE {tabela} ADD {coluna} {tipo}"]
+        if coluna in [row[1] for row in consultar(f"PRAGMA table_info({tabela})")]:
+            return []
+        return [f"ALTER TABLE {tabela} ADD {coluna} {tipo}"]
+    return passo
+
+
+def criar_indice(nome, tabela, colunas):
+    """Passo que cria o índice (não único) quando ele ainda não existe."""
+    def passo(dialeto, consultar):
+        lista = ', '.join(colunas)
+        if dialeto == 'mssql':
+            return [f"IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = '{nome}' "
+                    f"AND object_id = OBJECT_ID('{tabela}')) CREATE INDEX {nome} ON {tabela} ({lista})"]
+        return [f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({lista})"]
+    return passo
+
+
+# (versao, descricao, passos). Novas migrações entram sempre no fim, com a próxima versão.
+MIGRACOES = [
+    (1, 'Colunas adicionadas depois da criação das tabelas', [
+        adicionar_coluna('painel_tarefas', 'timeout_minutos', 'INTEGER'),
+        adicionar_coluna('painel_execucoes', 'log_hash', 'VARCHAR(64)'),
+    ]),
+    (2, 'Índices das consultas frequentes', [
+        # Agendador: agendamentos ativos pela próxima execução
+        criar_indice('ix_painel_agendamentos_ativo_proxima', 'painel_agendamentos', ['ativo', 'proxima_execucao']),
+        # Histórico por tarefa (paginação por data_execucao, id)
+        criar_indice('ix_painel_execucoes_tarefa_data', 'painel_execucoes', ['tarefa_id', 'data_execucao']),
+        # Aba de alertas: pendentes/resolvidos e por tipo, mais recentes primeiro
+        criar_indice('ix_painel_alertas_resolvido_data', 'painel_alertas', ['resolvido', 'data_criacao']),
+        criar_indice('ix_painel_alertas_tipo_data', 'painel_alertas', ['tipo', 'data_criacao']),
+        # Gráfico do dashboard: faixa de dias de todas as tarefas
+        criar_indice('ix_painel_execucoes_diarias_dia', 'painel_execucoes_diarias', ['dia']),
+    ]),
+]
+
+
+def pendentes(versoes_aplicadas):
+    """Migrações ainda não aplicadas, em ordem de versão."""
+    aplicadas = set(versoes_aplicadas)
+    return [m for m in sorted(MIGRACOES, key=lambda m: m[0]) if m[0] not in aplicadas]
+
+
+def comandos_da_migracao(migracao, dialeto, consultar):
+    """SQL da migração para o dialeto; consultar(sql) devolve as linhas de uma consulta."""
+    comandos = []
+    for passo in migracao[2]:
+        comandos.extend(passo(dialeto, consultar))
+    return comandos
+
+
+def registro_da_versao(migracao, dialeto):
+    agora = datetime.datetime.now().replace(microsecond=0)
+    return {'versao': migracao[0], 'descricao': migracao[1],
+            'data_aplicacao': agora if dialeto == 'mssql' else agora.isoformat(' ')}
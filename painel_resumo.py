@@ -0,0 +1,176 @@
+import datetime
+
+# Contadores do dashboard em painel_resumo (uma linha por chave), atualizados na
+# mesma transação que grava a execução ou o alerta e lidos numa única consulta
+CHAVE_TOTAL = 'execucoes_total'
+CHAVE_SUCESSO = 'execucoes_sucesso'
+CHAVE_ALERTAS_PENDENTES = 'alertas_pendentes'
+CHAVE_ULTIMA_EXECUCAO = 'ultima_execucao'  # data em valor_data
+PREFIXO_DIA = 'execucoes_dia:'  # + AAAA-MM-DD
+
+# Consolidado por tarefa e dia em painel_execucoes_diarias, para gráficos e relatórios
+PERIODOS_GRAFICO = (7, 30, 90, 365)  # dias
+
+
+def chave_dia(data):
+    return f"{PREFIXO_DIA}{data:%Y-%m-%d}"
+
+
+def incrementos_execucao(status, data_execucao):
+    """Contadores que uma nova execução incrementa: {chave: quantidade}."""
+    incrementos = {CHAVE_TOTAL: 1, chave_dia(data_execucao): 1}
+    if status == 'sucesso':
+        incrementos[CHAVE_SUCESSO] = 1
+    return incrementos
+
+
+def sql_incrementar(dialeto):
+    """Upsert atômico de um contador; parâmetros :chave e :valor (negativo decrementa)."""
+    if dialeto == 'mssql':
+        return """
+            MERGE painel_resumo WITH (HOLDLOCK) AS r
+            USING (SELECT :chave AS chave, :valor AS valor) AS n ON r.chave = n.chave
+            WHEN MATCHED THEN UPDATE SET valor = r.valor + n.valor
+            WHEN NOT MATCHED THEN INSERT (chave, valor) VALUES (n.chave, n.valor);
+        """
+    return """
+        INSERT INTO painel_resumo (chave, valor) VALUES (:chave, :valor)
+        ON CONFLICT(chave) DO UPDATE SET valor = valor + excluded.valor
+    """
+
+
+def sql_ultima_execucao(dialeto):
+    """Guarda a data da execução mais recente; parâmetro :data."""
+    if dialeto == 'mssql':
+        return f"""
+            MERGE painel_resumo WITH (HOLDLOCK) AS r
+            USING (SELECT '{CHAVE_ULTIMA_EXECUCAO}' AS chave, :data AS valor_data) AS n ON r.chave = n.chave
+            WHEN MATCHED AND (r.valor_data IS NULL OR r.valor_data < n.valor_data)
+                THEN UPDATE SET valor_data = n.valor_data
+            WHEN NOT MATCHED THEN INSERT (chave, valor, valor_data) VALUES (n.chave, 0, n.valor_data);
+        """
+    return f"""
+        INSERT INTO painel_resumo (chave, valor, valor_data) VALUES ('{CHAVE_ULTIMA_EXECUCAO}', 0, :data)
+        ON CONFLICT(chave) DO UPDATE SET valor_data = MAX(COALESCE(valor_data, ''), excluded.valor_data)
+    """
+
+
+def sql_leitura(hoje=None):
+    """
+    Consulta única do dashboard: contadores pela chave primária mais as
+    contagens das tabelas pequenas (tarefas e agendamentos ativos).
+    Devolve (sql, parametros); as linhas são (chave, valor, valor_data).
+    """
+    hoje = hoje or datetime.date.today()
+    sql = """
+        SELECT chave, valor, valor_data FROM painel_resumo
+        WHERE chave IN (:total, :sucesso, :alertas, :ultima, :hoje)
+        UNION ALL SELECT 'tarefas_total', COUNT(*), NULL FROM painel_tarefas
+        UNION ALL SELECT 'agendamentos_ativos', COUNT(*), NULL FROM painel_agendamentos WHERE ativo = 1
+    """
+    return sql, {'total': CHAVE_TOTAL, 'sucesso': CHAVE_SUCESSO, 'alertas': CHAVE_ALERTAS_PENDENTES,
+                 'ultima': CHAVE_ULTIMA_EXECUCAO, 'hoje': chave_dia(hoje)}
+
+
+def valores_consolidado(tarefa_id, status, data_execucao, duracao, dialeto):
+    """Parâmetros de sql_consolidar_execucao para uma nova execução."""
+    dia = data_execucao.date()
+    return {'tarefa_id': tarefa_id, 'dia': dia if dialeto == 'mssql' else dia.isoformat(),
+            'sucesso': int(status == 'sucesso'), 'erro': int(status == 'erro'),
+            'timeout': int(status == 'timeout'), 'duracao': duracao or 0}
+
+
+def sql_consolidar_execucao(dialeto):
+    """Soma uma execução ao consolidado (tarefa, dia)."""
+    if dialeto == 'mssql':
+        return """
+            MERGE painel_execucoes_diarias WITH (HOLDLOCK) AS r
+            USING (SELECT :tarefa_id AS tarefa_id, :dia AS dia, :sucesso AS sucesso, :erro AS erro,
+                          :timeout AS timeout, :duracao AS duracao) AS n
+                ON r.tarefa_id = n.tarefa_id AND r.dia = n.dia
+            WHEN MATCHED THEN UPDATE SET
+                execucoes = r.execucoes + 1, sucessos = r.sucessos + n.sucesso, erros = r.erros + n.erro,
+                timeouts = r.timeouts + n.timeout, duracao_total = r.duracao_total + n.duracao,
+                duracao_min = CASE WHEN n.duracao < r.duracao_min THEN n.duracao ELSE r.duracao_min END,
+                duracao_max = CASE WHEN n.duracao > r.duracao_max THEN n.duracao ELSE r.duracao_max END
+            WHEN NOT MATCHED THEN INSERT (tarefa_id, dia, execucoes, sucessos, erros, timeouts,
+                                          duracao_total, duracao_min, duracao_max)
+                VALUES (n.tarefa_id, n.dia, 1, n.sucesso, n.erro, n.timeout, n.duracao, n.duracao, n.duracao);
+        """
+    return """
+        INSERT INTO painel_execucoes_diarias (tarefa_id, dia, execucoes, sucessos, erros, timeouts,
+                                              duracao_total, duracao_min, duracao_max)
+        VALUES (:tarefa_id, :dia, 1, :sucesso, :erro, :timeout, :duracao, :duracao, :duracao)
+        ON CONFLICT(tarefa_id, dia) DO UPDATE SET
+            execucoes = execucoes + 1, sucessos = sucessos + excluded.sucessos, erros = erros + excluded.erros,
+            timeouts = timeouts + excluded.timeouts, duracao_total = duracao_total + excluded.duracao_total,
+            duracao_min = MIN(duracao_min, excluded.duracao_min), duracao_max = MAX(duracao_max, excluded.duracao_max)
+    """
+
+
+def sql_execucoes_por_dia(dias, tarefa_id=None, hoje=None, dialeto=None):
+    """
+    Execuções por dia dos últimos `dias` dias (de todas as tarefas ou de uma),
+    lidas do consolidado. Devolve (sql, parametros); colunas: data, count,
+    sucessos, erros, timeouts, duracao_total, duracao_min, duracao_max.
+    """
+    inicio = (hoje or datetime.date.today()) - datetime.timedelta(days=dias - 1)
+    parametros = {'inicio': inicio if dialeto == 'mssql' else inicio.isoformat()}
+    filtro_tarefa = ""
+    if tarefa_id is not None:
+        filtro_tarefa = "AND tarefa_id = :tarefa_id"
+        parametros['tarefa_id'] = tarefa_id
+    sql = f"""
+        SELECT dia AS data, SUM(execucoes) AS count, SUM(sucessos) AS sucessos, SUM(erros) AS erros,
+               SUM(timeouts) AS timeouts, SUM(duracao_total) AS duracao_total,
+               MIN(duracao_min) AS duracao_min, MAX(duracao_max) AS duracao_max
+        FROM painel_execucoes_diarias
+        WHERE dia >= :inicio {filtro_tarefa}
+        GROUP BY dia
+        ORDER BY dia
+    """
+    return sql, parametros
+
+
+# Reconciliação necessária: resumo vazio, ou consolidado vazio com execuções já gravadas
+SQL_PRECISA_RECONCILIAR = """
+    SELECT CASE WHEN EXISTS (SELECT 1 FROM painel_resumo) THEN 0 ELSE 1 END
+         + CASE WHEN EXISTS (SELECT 1 FROM painel_execucoes_diarias)
+                  OR NOT EXISTS (SELECT 1 FROM painel_execucoes) THEN 0 ELSE 1 END
+"""
+
+
+def sql_reconciliar(dialeto):
+    """
+    Comandos que reconstroem painel_resumo e painel_execucoes_diarias a
+    partir das tabelas de execuções e alertas.
+    """
+    if dialeto == 'mssql':
+        dia = "CONVERT(char(10), data_execucao, 23)"
+        concatenar = f"'{PREFIXO_DIA}' + {dia}"
+        dia_consolidado = "CAST(data_execucao AS DATE)"
+    else:
+        dia = "DATE(data_execucao)"
+        concatenar = f"'{PREFIXO_DIA}' || {dia}"
+        dia_consolidado = dia
+    return [
+        "DELETE FROM painel_resumo",
+        f"INSERT INTO painel_resumo (chave, valor) SELECT '{CHAVE_TOTAL}', COUNT(*) FROM painel_execucoes",
+        f"INSERT INTO painel_resumo (chave, valor) SELECT '{CHAVE_SUCESSO}', COUNT(*) FROM painel_execucoes "
+        "WHERE status = 'sucesso'",
+        f"INSERT INTO painel_resumo (chave, valor, valor_data) SELECT '{CHAVE_ULTIMA_EXECUCAO}', 0, "
+        "MAX(data_execucao) FROM painel_execucoes",
+        f"INSERT INTO painel_resumo (chave, valor) SELECT '{CHAVE_ALERTAS_PENDENTES}', COUNT(*) FROM painel_alertas "
+        "WHERE resolvido = 0",
+        f"INSERT INTO painel_resumo (chave, valor) SELECT {concatenar}, COUNT(*) FROM painel_execucoes "
+        f"WHERE data_execucao IS NOT NULL GROUP BY {dia}",
+        "DELETE FROM painel_execucoes_diarias",
+        "INSERT INTO painel_execucoes_diarias (tarefa_id, dia, execucoes, sucessos, erros, timeouts, "
+        "duracao_total, duracao_min, duracao_max) "
+        f"SELECT tarefa_id, {dia_consolidado}, COUNT(*), "
+        "SUM(CASE WHEN status = 'sucesso' THEN 1 ELSE 0 END), SUM(CASE WHEN status = 'erro' THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN status = 'timeout' THEN 1 ELSE 0 END), COALESCE(SUM(duracao_segundos), 0), "
+        "COALESCE(MIN(duracao_segundos), 0), COALESCE(MAX(duracao_segundos), 0) "
+        "FROM painel_execucoes WHERE data_execucao IS NOT NULL AND tarefa_id IS NOT NULL "
+        f"GROUP BY tarefa_id, {dia_consolidado}",
+    ]
@@ -0,0 +1,282 @@
+import argparse
+import ast
+import importlib.util
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Arquivo de perfis padrão e prefixo das variáveis de ambiente
+# (ex.: PERFIL_CONVENIO_A__INPUT_DIR, PERFIL_CONVENIO_A__DB_CONFIG__HOST_NAME)
+PERFIS_FILE = os.getenv('PERFIS_ARQUIVO', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'perfis.json'))
+PREFIXO_AMBIENTE = 'PERFIL_'
+DIRETORIO_ROTINAS = os.path.dirname(os.path.abspath(__file__))
+
+_PADRAO_CONSTANTE = re.compile(r'^[A-Z][A-Z0-9_]*$')
+_PADRAO_NOME_PERFIL = re.compile(r'^[a-z0-9][a-z0-9_-]*$')
+_PADRAO_ARQUIVO_ROTINA = re.compile(r'^[A-Z][A-Z0-9_]*\.py$')  # ROTINAOFFLINE.py, DESCONTOEMFOLHA.py...
+
+# Cache: {caminho: (mtime_ns, variaveis de ambiente, perfis)}
+_cache_perfis = {}
+# Cache: {caminho da rotina: (mtime_ns, constantes)}
+_cache_constantes = {}
+_cache_lock = threading.Lock()
+
+
+class ErroPerfil(Exception):
+    pass
+
+
+def _valor_ambiente(texto):
+    # Números, booleanos, listas e dicts em JSON; o resto é texto (ex.: caminhos do Windows)
+    try:
+        return json.loads(texto)
+    except ValueError:
+        return texto
+
+
+def _perfis_do_ambiente(variaveis):
+    perfis = {}
+    for nome_variavel, texto in variaveis:
+        partes = nome_variavel[len(PREFIXO_AMBIENTE):].split('__')
+        if len(partes) < 2:
+            continue
+        perfil = perfis.setdefault(partes[0].lower(), {})
+        constante = partes[1].upper()
+        if len(partes) == 2:
+            perfil[constante] = _valor_ambiente(texto)
+        else:
+            # Sub-chaves de dicionários (DB_CONFIG) usam minúsculas, como no código
+            destino = perfil.setdefault(constante, {})
+            for chave in partes[2:-1]:
+                destino = destino.setdefault(chave.lower(), {})
+            destino[partes[-1].lower()] = _valor_ambiente(texto)
+    return perfis
+
+
+def _validar_configuracoes(nome, configuracoes, origem):
+    if not isinstance(configuracoes, dict):
+        raise ErroPerfil(f"Perfil {nome} ({origem}): esperado um objeto com as configurações.")
+    for chave, valor in configuracoes.items():
+        if chave == 'rotinas':
+            if not isinstance(valor, dict):
+                raise ErroPerfil(f"Perfil {nome} ({origem}): 'rotinas' deve ser um objeto por rotina.")
+            for rotina, especificas in valor.items():
+                _validar_configuracoes(f"{nome}/{rotina}", especificas, origem)
+                if 'rotinas' in especificas:
+                    raise ErroPerfil(f"Perfil {nome}/{rotina} ({origem}): 'rotinas' não pode ser aninhado.")
+        elif not _PADRAO_CONSTANTE.match(chave):
+            raise ErroPerfil(f"Perfil {nome} ({origem}): chave inválida '{chave}' (use o nome da constante).")
+
+
+def _mesclar(base, novo):
+    resultado = dict(base)
+    for chave, valor in novo.items():
+        if isinstance(valor, dict) and isinstance(resultado.get(chave), dict):
+            resultado[chave] = _mesclar(resultado[chave], valor)
+        else:
+            resultado[chave] = valor
+    return resultado
+
+
+def carregar_perfis(arquivo=None):
+    """
+    Carrega os perfis do arquivo JSON e das variáveis de ambiente PERFIL_*
+    (que prevalecem sobre o arquivo). A leitura e a validação acontecem uma
+    única vez; o resultado fica em cache até o arquivo ou o ambiente mudarem.
+
+    Formato do arquivo:
+        {"perfis": {"convenio_a": {"INPUT_DIR": "...", "DB_CONFIG": {"host_name": "..."},
+                                    "rotinas": {"ROTINAOFFLINE": {"SERVIDOR_SMTP": "..."}}}}}
+
+    Returns:
+        dict: {nome_perfil: configuracoes}
+    """
+    arquivo = os.path.abspath(arquivo or PERFIS_FILE)
+    try:
+        mtime_ns = os.stat(arquivo).st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    variaveis = tuple(sorted((k, v) for k, v in os.environ.items() if k.startswith(PREFIXO_AMBIENTE)))
+    with _cache_lock:
+        em_cache = _cache_perfis.get(arquivo)
+        if em_cache and em_cache[0] == mtime_ns and em_cache[1] == variaveis:
+            return em_cache[2]
+
+    perfis = {}
+    if mtime_ns is not None:
+        try:
+            with open(arquivo, 'r', encoding='utf-8') as f:
+                conteudo = json.load(f)
+        except ValueError as e:
+            raise ErroPerfil(f"Arquivo de perfis inválido ({arquivo}): {e}")
+        for nome, configuracoes in (conteudo.get('perfis') or {}).items():
+            _validar_configuracoes(nome, configuracoes, arquivo)
+            perfis[nome.lower()] = configuracoes
+    for nome, configuracoes in _perfis_do_ambiente(variaveis).items():
+        _validar_configuracoes(nome, configuracoes, 'ambiente')
+        perfis[nome] = _mesclar(perfis.get(nome, {}), configuracoes)
+    for nome in perfis:
+        if not _PADRAO_NOME_PERFIL.match(nome):
+            raise ErroPerfil(f"Nome de perfil inválido: '{nome}'.")
+
+    with _cache_lock:
+        _cache_perfis[arquivo] = (mtime_ns, variaveis, perfis)
+    return perfis
+
+
+def obter_perfil(nome, arquivo=None):
+    perfis = carregar_perfis(arquivo)
+    try:
+        return perfis[nome.lower()]
+    except KeyError:
+        raise ErroPerfil(f"Perfil '{nome}' não encontrado. Disponíveis: {', '.join(sorted(perfis)) or 'nenhum'}.")
+
+
+def _constantes_do_arquivo(caminho):
+    """Nomes de constantes atribuídos no nível do módulo, lidos sem importar a rotina."""
+    mtime_ns = os.stat(caminho).st_mtime_ns
+    with _cache_lock:
+        em_cache = _cache_constantes.get(caminho)
+        if em_cache and em_cache[0] == mtime_ns:
+            return em_cache[1]
+    with open(caminho, 'r', encoding='utf-8') as f:
+        arvore = ast.parse(f.read(), caminho)
+    constantes = set()
+    pendentes = list(arvore.body)
+    while pendentes:
+        no = pendentes.pop()
+        if isinstance(no, (ast.If, ast.Try, ast.With)):
+            pendentes.extend(no.body + getattr(no, 'orelse', []) + getattr(no, 'finalbody', [])
+                             + [c for h in getattr(no, 'handlers', []) for c in h.body])
+            continue
+        alvos = no.targets if isinstance(no, ast.Assign) else [no.target] if isinstance(no, ast.AnnAssign) else []
+        for alvo in alvos:
+            for nome in ast.walk(alvo):
+                if isinstance(nome, ast.Name) and _PADRAO_CONSTANTE.match(nome.id):
+                    constantes.add(nome.id)
+    with _cache_lock:
+        _cache_constantes[caminho] = (mtime_ns, constantes)
+    return constantes
+
+
+def constantes_das_rotinas(diretorio=None):
+    """União das constantes de todas as rotinas (scripts em maiúsculas) do diretório."""
+    diretorio = diretorio or DIRETORIO_ROTINAS
+    constantes = set()
+    for arquivo in os.listdir(diretorio):
+        if _PADRAO_ARQUIVO_ROTINA.match(arquivo):
+            constantes |= _constantes_do_arquivo(os.path.join(diretorio, arquivo))
+    return constantes
+
+
+def _compativel(padrao, valor):
+    if padrao is None or valor is None:
+        return True
+    if isinstance(padrao, bool) or isinstance(valor, bool):
+        return isinstance(padrao, bool) and isinstance(valor, bool)
+    if isinstance(padrao, (int, float)):
+        return isinstance(valor, (int, float))
+    return isinstance(valor, type(padrao))
+
+
+def aplicar_perfil(modulo, nome_perfil, configuracoes):
+    """
+    Sobrescreve as constantes do módulo da rotina com as do perfil. Chaves
+    comuns só se aplicam às rotinas que têm a constante, mas precisam existir
+    em alguma rotina do diretório (um erro de digitação não pode deixar a
+    rotina rodar com o padrão de produção); as da seção "rotinas" precisam
+    existir na rotina. Dicionários (ex.: DB_CONFIG) são mesclados com o
+    padrão do código.
+    """
+    rotina = modulo.__name__.split('__')[0]
+    especificas = (configuracoes.get('rotinas') or {}).get(rotina, {})
+    desconhecidas = [chave for chave in especificas if not hasattr(modulo, chave)]
+    if desconhecidas:
+        raise ErroPerfil(f"Perfil {nome_perfil}: {rotina} não possui {', '.join(desconhecidas)}.")
+
+    comuns = {k: v for k, v in configuracoes.items() if k != 'rotinas'}
+    ausentes = [chave for chave in comuns if not hasattr(modulo, chave)]
+    if ausentes:
+        conhecidas = constantes_das_rotinas()
+        desconhecidas = [chave for chave in ausentes if chave not in conhecidas]
+        if desconhecidas:
+            raise ErroPerfil(f"Perfil {nome_perfil}: nenhuma rotina possui {', '.join(desconhecidas)}.")
+        comuns = {k: v for k, v in comuns.items() if k not in ausentes}
+    for chave, valor in _mesclar(comuns, especificas).items():
+        padrao = getattr(modulo, chave)
+        if not _compativel(padrao, valor):
+            raise ErroPerfil(f"Perfil {nome_perfil}: {chave} deve ser {type(padrao).__name__} em {rotina}.")
+        if isinstance(padrao, dict) and isinstance(valor, dict):
+            extras = set(valor) - set(padrao)
+            if extras:
+                raise ErroPerfil(f"Perfil {nome_perfil}: {chave} com chaves desconhecidas {sorted(extras)}.")
+            valor = _mesclar(padrao, valor)
+        setattr(modulo, chave, valor)
+    modulo.PERFIL = nome_perfil
+    return modulo
+
+
+def carregar_rotina(rotina, nome_perfil, arquivo=None):
+    """
+    Carrega uma cópia independente do módulo da rotina com o perfil aplicado.
+    Cada cópia tem as suas próprias constantes, o que permite executar o
+    main() de vários perfis ao mesmo tempo no mesmo processo.
+    """
+    configuracoes = obter_perfil(nome_perfil, arquivo)
+    caminho = os.path.join(DIRETORIO_ROTINAS, f"{rotina}.py")
+    if not os.path.exists(caminho):
+        raise ErroPerfil(f"Rotina não encontrada: {caminho}")
+    spec = importlib.util.spec_from_file_location(f"{rotina}__{nome_perfil}", caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return aplicar_perfil(modulo, nome_perfil, configuracoes)
+
+
+def executar_perfis(rotina, nomes_perfis, arquivo=None, funcao='main', trabalhadores=None):
+    """
+    Executa funcao() (por padrão o main()) da rotina para cada perfil, em
+    paralelo. Os perfis são carregados e validados antes de qualquer execução.
+
+    Returns:
+        dict: {perfil: {'resultado': ...}} ou {perfil: {'erro': mensagem}}.
+    """
+    modulos = {nome: carregar_rotina(rotina, nome, arquivo) for nome in nomes_perfis}
+
+    def executar(nome):
+        threading.current_thread().name = f"{rotina}[{nome}]"
+        try:
+            return nome, {'resultado': getattr(modulos[nome], funcao)()}
+        except Exception as e:
+            return nome, {'erro': str(e)}
+
+    with ThreadPoolExecutor(max_workers=trabalhadores or len(modulos) or 1) as executor:
+        return dict(executor.map(executar, modulos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa rotinas em lote para um ou mais perfis em paralelo.")
+    parser.add_argument('rotina', nargs='?', help="Nome do script da rotina (ex.: ROTINACADASTRAL).")
+    parser.add_argument('perfis', nargs='*', help="Perfis a executar (padrão: todos).")
+    parser.add_argument('--arquivo', help=f"Arquivo de perfis (padrão: {PERFIS_FILE}).")
+    parser.add_argument('--listar', action='store_true', help="Lista os perfis disponíveis.")
+    args = parser.parse_args()
+
+    perfis = carregar_perfis(args.arquivo)
+    if args.listar or not args.rotina:
+        for nome, configuracoes in sorted(perfis.items()):
+            rotinas = ', '.join(sorted(configuracoes.get('rotinas', {}))) or '-'
+            print(f"{nome}: {len([k for k in configuracoes if k != 'rotinas'])} configurações comuns; rotinas: {rotinas}")
+        return
+
+    resultados = executar_perfis(args.rotina, args.perfis or sorted(perfis), args.arquivo)
+    print("\nResumo por perfil:")
+    for nome, resultado in resultados.items():
+        print(f"  - {nome}: {'erro: ' + resultado['erro'] if 'erro' in resultado else 'concluído'}")
+    if any('erro' in resultado for resultado in resultados.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+import financial_transaction_handler
+import ROTINACADASTRAL
+import ROTINAOFFLINE
+
+
+def _planilha():
+    return pd.DataFrame({
+        'NUMERO CARTÃO': ['4111111111111111', '5500000000000004', '4012888888881881'],
+        'TXN': [101, 102, 103],
+        'VALOR': [0.29, 1.005, 10.0],
+        'DATA DE ENVIO': pd.to_datetime(['2026-10-01', '2026-10-02', '2026-10-03']),
+    })
+
+
+@pytest.mark.parametrize('rotina', [ROTINAOFFLINE, ROTINACADASTRAL, financial_transaction_handler])
+def test_indice_filtrado_gera_o_mesmo_arquivo_que_o_sequencial(rotina, tmp_path):
+    planilha = _planilha()
+    filtrada = planilha.set_index(pd.Index([10, 20, 30])).iloc[1:]
+
+    gravados = rotina.generate_file(filtrada, str(tmp_path / 'filtrada.txt'), 1)
+    esperados = rotina.generate_file(planilha.iloc[1:].reset_index(drop=True), str(tmp_path / 'sequencial.txt'), 1)
+
+    assert gravados == esperados == 2
+    linhas = (tmp_path / 'filtrada.txt').read_text().splitlines()
+    assert linhas[1:] == (tmp_path / 'sequencial.txt').read_text().splitlines()[1:]
+    trailer = rotina.create_trailer(1, 2, 101 + 1000)
+    assert linhas[-1] == trailer
+
+
+@pytest.mark.parametrize('rotina', [ROTINAOFFLINE, ROTINACADASTRAL, financial_transaction_handler])
+@pytest.mark.parametrize('mover', [False, True])
+def test_lotes_do_mesmo_minuto_nao_sobrescrevem_os_anexos_um_do_outro(rotina, mover, tmp_path, monkeypatch):
+    monkeypatch.setattr(rotina, 'OUTPUT_DIR', str(tmp_path / 'saida'))
+    monkeypatch.setattr(rotina, 'HISTORICO_DIR', str(tmp_path / 'historico'), raising=False)
+    monkeypatch.setattr(rotina, 'MOVER_ARQUIVO_ORIGINAL', mover, raising=False)
+    (tmp_path / 'saida').mkdir()
+    (tmp_path / 'historico').mkdir()
+    validos, rejeitados = rotina.validar_registros(_planilha())
+    planilha = {'arquivo': 'TXN.xlsx', 'df': validos, 'rejeitados': rejeitados.iloc[:0]}
+
+    # O lote 7 ainda espera na caixa de saída quando o lote 8 é gerado
+    anterior = rotina.gerar_lote(planilha, 7)
+    conteudo = open(anterior['partes'][0]['caminho'], 'rb').read()
+    seguinte = rotina.gerar_lote(planilha, 8)
+
+    assert anterior['partes'][0]['caminho'] != seguinte['partes'][0]['caminho']
+    assert open(anterior['partes'][0]['caminho'], 'rb').read() == conteudo
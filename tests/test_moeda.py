@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from moeda import formatar_centavos, para_centavos, somar_centavos
+
+
+@pytest.mark.parametrize('valor, esperado', [
+    (0.29, 29),
+    (1.005, 101),
+    (2.675, 268),
+    (-1.005, -101),
+    ('12.345', 1235),
+    (' 0.015 ', 2),
+    (Decimal('19.99'), 1999),
+    (7, 700),
+    (np.float64(0.07), 7),
+])
+def test_para_centavos_arredonda_meio_centavo_para_longe_do_zero(valor, esperado):
+    assert para_centavos(valor) == esperado
+
+
+@pytest.mark.parametrize('valor', [None, float('nan'), float('inf'), 'abc', ''])
+def test_para_centavos_rejeita_valor_invalido(valor):
+    with pytest.raises(ValueError):
+        para_centavos(valor)
+
+
+def test_para_centavos_em_coluna_mantem_indice_e_marca_invalidos():
+    serie = pd.Series([0.29, 'x', None, '1.005'], index=[10, 20, 30, 40])
+    centavos = para_centavos(serie)
+    assert str(centavos.dtype) == 'Int64'
+    assert list(centavos.index) == [10, 20, 30, 40]
+    assert centavos[10] == 29 and centavos[40] == 101
+    assert centavos.isna().tolist() == [False, True, True, False]
+
+
+def test_coluna_float_vetorizada_igual_a_conversao_decimal():
+    rng = np.random.default_rng(7)
+    valores = np.round(rng.lognormal(4, 1.1, 20000), 2)
+    valores[:4] = [0.29, 1.005, -2.675, 1e20]
+    valores[4] = np.nan
+    centavos = para_centavos(pd.Series(valores))
+
+    assert str(centavos.dtype) == 'Int64'
+    assert centavos[:4].tolist() == [29, 101, -268, pd.NA]
+    assert centavos.isna().sum() == 2
+    esperados = [para_centavos(v) for v in valores[5:]]
+    assert centavos[5:].astype('int64').tolist() == esperados
+
+
+def test_coluna_sem_invalidos_e_int64():
+    assert str(para_centavos(pd.Series([0.1, 19.99])).dtype) == 'int64'
+    assert para_centavos(pd.Series([3, 4])).tolist() == [300, 400]
+
+
+def test_soma_exata_de_muitos_valores():
+    # 0.1 somado em float não dá 1000.00 exato; em centavos dá
+    assert somar_centavos(para_centavos(pd.Series([0.1] * 10000))) == 100000
+
+
+def test_formatar_centavos():
+    assert formatar_centavos(1234, 17) == '00000000000001234'
+    assert formatar_centavos(pd.Series([5, None], dtype='Int64'), 3).tolist() == ['005', pd.NA]
@@ -0,0 +1,43 @@
+import io
+import os
+
+import pandas as pd
+
+import offline_cache
+from offline_cache import ler_excel_em_cache
+
+
+def test_planilha_lida_da_rede_uma_vez_e_depois_do_cache(tmp_path, monkeypatch):
+    planilha = tmp_path / 'TXN.xlsx'
+    pd.DataFrame({'VALOR': [1.5, 2.25]}).to_excel(planilha, index=False)
+    leituras = []
+    read_excel = pd.read_excel
+
+    def read_excel_registrado(origem, **kwargs):
+        leituras.append(origem)
+        return read_excel(origem, **kwargs)
+
+    monkeypatch.setattr(offline_cache.pd, 'read_excel', read_excel_registrado)
+    cache_dir = str(tmp_path / 'cache')
+
+    df = ler_excel_em_cache(str(planilha), cache_dir=cache_dir)
+    assert df['VALOR'].tolist() == [1.5, 2.25]
+    # Os bytes lidos para o hash são os mesmos interpretados pelo read_excel
+    assert len(leituras) == 1 and isinstance(leituras[0], io.BytesIO)
+
+    # Mesmo conteúdo com outro mtime: novo hash, mas o DataFrame vem do cache
+    stat = os.stat(planilha)
+    os.utime(planilha, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert ler_excel_em_cache(str(planilha), cache_dir=cache_dir)['VALOR'].tolist() == [1.5, 2.25]
+    assert len(leituras) == 1
+
+
+def test_aviso_de_pyarrow_ausente_so_no_primeiro_uso(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(offline_cache, 'PYARROW_AVAILABLE', False)
+    monkeypatch.setattr(offline_cache, '_aviso_pyarrow_exibido', False)
+    planilha = tmp_path / 'TXN.xlsx'
+    pd.DataFrame({'VALOR': [1.0]}).to_excel(planilha, index=False)
+
+    for _ in range(2):
+        ler_excel_em_cache(str(planilha), cache_dir=str(tmp_path / 'cache'))
+    assert capsys.readouterr().out.count('pyarrow não instalado') == 1
@@ -0,0 +1,68 @@
+import os
+from datetime import datetime
+
+from offline_descoberta import _analisar_nome, classificar_candidatos, invalidar_cache, listar_candidatos
+
+
+def test_analisar_nome_separa_data_exata_e_data_regex():
+    assert _analisar_nome('relatorio.xlsx') is None
+    assert _analisar_nome('TXN_20261019.xlsx') == ('TXN_20261019.xlsx', '20261019', '20261019')
+    assert _analisar_nome('txn-20261018.xls') == ('txn-20261018.xls', None, '20261018')
+    assert _analisar_nome('TXN.xlsx') == ('TXN.xlsx', None, None)
+
+
+def test_classificar_candidatos_por_estrategia():
+    nomes = ['TXN.xlsx', 'TXN_20261012.xlsx', 'TXN_20261017.xlsx', 'TXN_20261019.xlsx',
+             'TXN-20261019.xlsx', 'TXN_20261018.xlsx']
+    candidatos = [_analisar_nome(nome) + (1, 1) for nome in nomes]
+    estrategias = classificar_candidatos(candidatos, data_referencia=datetime(2026, 10, 19, 8, 0))
+
+    assert estrategias['hoje'] == ['TXN_20261019.xlsx']
+    # Mais recentes primeiro; 12/10 está fora dos 7 dias
+    assert estrategias['recentes'] == ['TXN_20261019.xlsx', 'TXN_20261018.xlsx', 'TXN_20261017.xlsx']
+    assert estrategias['geral'] == nomes
+    assert estrategias['regex'] == nomes[1:]
+
+
+def test_classificar_candidatos_ignora_os_ja_processados():
+    candidatos = [_analisar_nome(nome) + (1, 1) for nome in ('TXN_20261019.xlsx', 'TXN_20261018.xlsx')]
+    estrategias = classificar_candidatos(candidatos, data_referencia=datetime(2026, 10, 19),
+                                         ignorar=lambda c: c[0] == 'TXN_20261019.xlsx')
+    assert estrategias == {'hoje': [], 'recentes': ['TXN_20261018.xlsx'],
+                           'geral': ['TXN_20261018.xlsx'], 'regex': ['TXN_20261018.xlsx']}
+
+
+def test_listar_candidatos_filtra_excel_e_usa_cache(tmp_path):
+    for nome in ('TXN_20261019.xlsx', 'TXN_20261019.txt', 'outro.xlsx'):
+        (tmp_path / nome).write_bytes(b'conteudo')
+    invalidar_cache()
+
+    todos, candidatos = listar_candidatos(str(tmp_path))
+    assert sorted(todos) == ['TXN_20261019.txt', 'TXN_20261019.xlsx', 'outro.xlsx']
+    assert [c[:4] for c in candidatos] == [('TXN_20261019.xlsx', '20261019', '20261019', 8)]
+
+    # Sem mudança no mtime do diretório a listagem vem do cache
+    mtime = os.stat(tmp_path).st_mtime_ns
+    (tmp_path / 'TXN_20261018.xlsx').write_bytes(b'x')
+    os.utime(tmp_path, ns=(mtime, mtime))
+    assert len(listar_candidatos(str(tmp_path))[1]) == 1
+    assert len(listar_candidatos(str(tmp_path), usar_cache=False)[1]) == 2
+
+
+def test_listar_candidatos_relê_tamanho_de_arquivo_sobrescrito(tmp_path):
+    arquivo = tmp_path / 'TXN_20261019.xlsx'
+    arquivo.write_bytes(b'v1')
+    invalidar_cache()
+    assert listar_candidatos(str(tmp_path))[1][0][3] == 2
+
+    # Sobrescrever no lugar não muda o mtime do diretório: a listagem vem do
+    # cache, mas a assinatura (tamanho, mtime) tem que ser a atual
+    mtime = os.stat(tmp_path).st_mtime_ns
+    arquivo.write_bytes(b'versao 2')
+    os.utime(arquivo, ns=(10 ** 18, 10 ** 18))
+    os.utime(tmp_path, ns=(mtime, mtime))
+    assert listar_candidatos(str(tmp_path))[1][0][3:] == (8, 10 ** 18)
+
+    arquivo.unlink()
+    os.utime(tmp_path, ns=(mtime, mtime))
+    assert listar_candidatos(str(tmp_path))[1] == []
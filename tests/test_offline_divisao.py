@@ -0,0 +1,58 @@
+import json
+
+import pandas as pd
+
+import ROTINAOFFLINE
+from offline_divisao import calcular_partes, gerar_arquivos_divididos
+
+
+def test_calcular_partes_respeita_registros_e_total_do_layout(monkeypatch):
+    assert calcular_partes(pd.Series([1] * 5), max_registros=2) == [(0, 2), (2, 4), (4, 5)]
+    monkeypatch.setattr('offline_divisao.LIMITE_TOTAL_CENTAVOS', 10)
+    assert calcular_partes(pd.Series([6, 3, 2, 9])) == [(0, 2), (2, 3), (3, 4)]
+
+
+def test_partes_com_lotes_consecutivos_e_manifesto(tmp_path):
+    df = pd.DataFrame({
+        'NUMERO CARTÃO': ['4111111111111111'] * 5,
+        'TXN': [101] * 5,
+        'VALOR': [1.0, 2.0, 3.0, 4.0, 5.0],
+        'DATA DE ENVIO': pd.to_datetime(['2026-10-01'] * 5),
+    })
+    partes, manifesto = gerar_arquivos_divididos(
+        df, ROTINAOFFLINE.generate_file, str(tmp_path / 'OFFLINE.txt'), 40, max_registros=2)
+
+    assert [p['lote'] for p in partes] == [40, 41, 42]
+    assert [p['registros'] for p in partes] == [2, 2, 1]
+    assert [p['total_centavos'] for p in partes] == [300, 700, 500]
+    assert [p['arquivo'] for p in partes] == ['OFFLINE_P01.txt', 'OFFLINE_P02.txt', 'OFFLINE_P03.txt']
+    with open(manifesto, encoding='utf-8') as f:
+        assert json.load(f)['total_centavos'] == 1500
+
+
+def test_partes_geradas_em_processos_na_ordem(tmp_path, monkeypatch):
+    from concurrent.futures import ProcessPoolExecutor
+    usados = []
+
+    class PoolRegistrado(ProcessPoolExecutor):
+        def __init__(self, max_workers=None):
+            usados.append(max_workers)
+            super().__init__(max_workers=max_workers)
+
+    monkeypatch.setattr('offline_divisao.ProcessPoolExecutor', PoolRegistrado)
+    df = pd.DataFrame({
+        'NUMERO CARTÃO': ['4111111111111111'] * 4,
+        'TXN': [101] * 4,
+        'VALOR': [1.0, 2.0, 3.0, 4.0],
+        'DATA DE ENVIO': pd.to_datetime(['2026-10-01'] * 4),
+    })
+    partes, _ = gerar_arquivos_divididos(
+        df, ROTINAOFFLINE.generate_file, str(tmp_path / 'OFFLINE.txt'), 7,
+        max_registros=1, trabalhadores=2)
+
+    assert usados == [2]
+    assert [p['lote'] for p in partes] == [7, 8, 9, 10]
+    assert [p['total_centavos'] for p in partes] == [100, 200, 300, 400]
+    for parte in partes:
+        with open(parte['caminho'], encoding='utf-8') as f:
+            assert f.readline().startswith(f"000000{parte['lote']:03d}")
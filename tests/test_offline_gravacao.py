@@ -0,0 +1,39 @@
+import pytest
+
+from offline_gravacao import GravadorMultiplo
+
+
+def test_grava_todos_os_destinos_na_mesma_passada(tmp_path):
+    destinos = [tmp_path / 'saida' / 'OFFLINE.txt', tmp_path / 'historico' / 'TXN.txt']
+    with GravadorMultiplo([str(d) for d in destinos], newline='\n') as gravador:
+        gravador.write('header\n')
+        gravador.write('trailer\n')
+    assert [d.read_text() for d in destinos] == ['header\ntrailer\n'] * 2
+    assert gravador.sha256 and not list(tmp_path.rglob('*.tmp'))
+
+
+def test_tamanho_divergente_e_detectado_sem_reler_o_arquivo(tmp_path):
+    destino = tmp_path / 'OFFLINE.txt'
+    gravador = GravadorMultiplo([str(destino)], newline='\n').abrir()
+    gravador.write('registro 1\n')
+    temporario = gravador._arquivos[0]
+    temporario.flush()
+    with open(temporario.name, 'ab') as f:
+        f.write(b'X')
+    with pytest.raises(IOError, match='bytes'):
+        gravador.fechar()
+    assert not destino.exists() and not list(tmp_path.glob('*.tmp'))
+
+
+def test_conteudo_divergente_apos_a_gravacao_e_detectado_com_releitura(tmp_path):
+    destino = tmp_path / 'OFFLINE.txt'
+    gravador = GravadorMultiplo([str(destino)], newline='\n', verificar_conteudo=True).abrir()
+    gravador.write('registro 1\n')
+    temporario = gravador._arquivos[0]
+    temporario.flush()
+    # Mesmo tamanho, conteúdo diferente: só a releitura com hash percebe
+    with open(temporario.name, 'r+b') as f:
+        f.write(b'X')
+    with pytest.raises(IOError, match='Checksum'):
+        gravador.fechar()
+    assert not destino.exists() and not list(tmp_path.glob('*.tmp'))
@@ -0,0 +1,114 @@
+import email
+import os
+import threading
+
+from offline_outbox import ENVIADOS, FALHAS, CaixaSaidaEmail
+
+SERVIDORES = [{'nome': 'teste', 'host': 'localhost', 'porta': 25}]
+
+
+class SessaoFalsa:
+    def __init__(self, liberar=None):
+        self.liberar = liberar
+        self.em_uso = threading.Event()
+        self.enviado = b''
+        self.encerrada = False
+
+    def ehlo_or_helo_if_needed(self):
+        pass
+
+    def noop(self):
+        return 250, b'ok'
+
+    def mail(self, remetente):
+        self.em_uso.set()
+        if self.liberar:
+            self.liberar.wait(5)
+        return 250, b'ok'
+
+    def rcpt(self, destinatario):
+        return 250, b'ok'
+
+    def docmd(self, comando):
+        return 354, b'go ahead'
+
+    def send(self, dados):
+        self.enviado += dados
+
+    def getreply(self):
+        return 250, b'ok'
+
+    def quit(self):
+        self.encerrada = True
+
+    close = quit
+
+
+def _caixa(tmp_path, sessao, monkeypatch):
+    caixa = CaixaSaidaEmail(str(tmp_path / 'outbox'), SERVIDORES, 'usuario', 'senha', espera_base=0)
+    monkeypatch.setattr(caixa, '_sessao', lambda servidor: caixa._sessoes.setdefault(servidor['nome'], sessao))
+    return caixa
+
+
+def test_envia_mensagem_com_anexo(tmp_path, monkeypatch):
+    anexo = tmp_path / 'OFFLINE.txt'
+    anexo.write_text('conteudo')
+    sessao = SessaoFalsa()
+    caixa = _caixa(tmp_path, sessao, monkeypatch)
+    caixa.iniciar()
+    caixa.enfileirar('a@x', ['b@x'], 'Lote 1', '<p>ok</p>', [str(anexo)])
+    assert caixa.aguardar(5)
+    caixa.parar()
+    assert len(os.listdir(tmp_path / 'outbox' / ENVIADOS)) == 1
+    assert b'OFFLINE.txt' in sessao.enviado
+    assert sessao.encerrada
+
+
+def test_anexo_ausente_e_citado_no_corpo_e_o_email_e_enviado(tmp_path, monkeypatch):
+    presente = tmp_path / 'OFFLINE.txt'
+    presente.write_text('conteudo')
+    sessao = SessaoFalsa()
+    caixa = _caixa(tmp_path, sessao, monkeypatch)
+    caixa.iniciar()
+    caixa.enfileirar('a@x', ['b@x'], 'Lote 2', '<html><body><p>ok</p></body></html>',
+                     [str(presente), str(tmp_path / 'sumiu.txt')])
+    assert caixa.aguardar(5)
+    caixa.parar()
+    assert len(os.listdir(tmp_path / 'outbox' / ENVIADOS)) == 1
+    assert os.listdir(tmp_path / 'outbox' / FALHAS) == []
+    assert b'filename="OFFLINE.txt"' in sessao.enviado
+    corpo = email.message_from_bytes(sessao.enviado).get_payload(0).get_payload(decode=True).decode('utf-8')
+    assert 'não foram encontrados' in corpo and 'sumiu.txt' in corpo
+
+
+def test_parar_nao_fecha_sessao_em_uso_pela_thread(tmp_path, monkeypatch):
+    liberar = threading.Event()
+    sessao = SessaoFalsa(liberar)
+    caixa = _caixa(tmp_path, sessao, monkeypatch)
+    caixa.iniciar()
+    caixa.enfileirar('a@x', ['b@x'], 'Lote 3', '<p>ok</p>')
+    assert sessao.em_uso.wait(5)
+
+    caixa.parar(timeout=0.1)
+    assert not sessao.encerrada
+
+    liberar.set()
+    caixa._thread.join(5)
+    assert sessao.encerrada
+    assert len(os.listdir(tmp_path / 'outbox' / ENVIADOS)) == 1
+
+
+def test_enviadas_antigas_sao_apagadas_ao_iniciar(tmp_path, monkeypatch):
+    caixa = _caixa(tmp_path, SessaoFalsa(), monkeypatch)
+    enviados = tmp_path / 'outbox' / ENVIADOS
+    antiga, recente = enviados / 'antiga.json', enviados / 'recente.json'
+    for mensagem in (antiga, recente):
+        mensagem.write_text('{}')
+    os.utime(antiga, (0, 0))
+    (tmp_path / 'outbox' / FALHAS / 'falha.json').write_text('{}')
+    os.utime(tmp_path / 'outbox' / FALHAS / 'falha.json', (0, 0))
+
+    caixa.iniciar()
+    caixa.parar()
+    assert os.listdir(enviados) == ['recente.json']
+    assert os.listdir(tmp_path / 'outbox' / FALHAS) == ['falha.json']
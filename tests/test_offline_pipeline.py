@@ -0,0 +1,52 @@
+import threading
+import time
+
+import pytest
+
+from offline_pipeline import executar_pipeline
+
+
+def test_resultados_na_ordem_dos_itens():
+    resultados = executar_pipeline(range(5), [('dobro', lambda v: v * 2), ('texto', str)])
+    assert resultados == ['0', '2', '4', '6', '8']
+
+
+def test_falha_no_estagio_2_descarta_tudo_que_o_estagio_1_produziu():
+    falhou = threading.Event()
+    produzidos = []
+    descartados = []
+    recebidos = []
+
+    def estagio_1(valor):
+        if valor == 2:
+            # Ainda no meio deste item quando o estágio 2 falha
+            falhou.wait(5)
+            time.sleep(0.3)
+        produzidos.append(valor)
+        return valor
+
+    def estagio_2(valor):
+        recebidos.append(valor)
+        falhou.set()
+        raise RuntimeError("falha no estágio 2")
+
+    with pytest.raises(RuntimeError, match="falha no estágio 2"):
+        executar_pipeline([1, 2, 3, 4], [('gera', estagio_1, descartados.append), ('conclui', estagio_2)])
+
+    assert recebidos == [1]
+    assert 2 in produzidos
+    assert sorted(descartados) == sorted(v for v in produzidos if v not in recebidos)
+
+
+def test_falha_no_estagio_1_interrompe_a_alimentacao():
+    vistos = []
+
+    def estagio_1(valor):
+        vistos.append(valor)
+        if valor == 1:
+            raise ValueError("planilha inválida")
+        return valor
+
+    with pytest.raises(ValueError):
+        executar_pipeline(range(10), [('leitura', estagio_1), ('fim', lambda v: v)])
+    assert vistos == [0, 1]
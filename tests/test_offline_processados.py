@@ -0,0 +1,61 @@
+import os
+
+import offline_processados
+from offline_processados import IndiceProcessados
+
+
+def _candidato(caminho):
+    stat = os.stat(caminho)
+    return (os.path.basename(caminho), None, None, stat.st_size, stat.st_mtime_ns)
+
+
+def _contar_hashes(monkeypatch):
+    lidos = []
+    original = offline_processados.calcular_hash_arquivo
+
+    def calcular(caminho):
+        lidos.append(os.path.basename(caminho))
+        return original(caminho)
+    monkeypatch.setattr(offline_processados, 'calcular_hash_arquivo', calcular)
+    return lidos
+
+
+def test_busca_nao_abre_arquivos_de_assinatura_desconhecida(tmp_path, monkeypatch):
+    lidos = _contar_hashes(monkeypatch)
+    for nome in ('TXN_20260101.xlsx', 'TXN_20260102.xlsx'):
+        (tmp_path / nome).write_bytes(nome.encode())
+    indice = IndiceProcessados(str(tmp_path / 'indice.json'))
+
+    for nome in ('TXN_20260101.xlsx', 'TXN_20260102.xlsx'):
+        assert not indice.candidato_processado(str(tmp_path), _candidato(str(tmp_path / nome)))
+    assert lidos == []
+    assert not (tmp_path / 'indice.json').exists()
+
+
+def test_copia_de_planilha_processada_e_reconhecida_pelo_conteudo(tmp_path, monkeypatch):
+    original = tmp_path / 'TXN_20260101.xlsx'
+    original.write_bytes(b'conteudo')
+    indice = IndiceProcessados(str(tmp_path / 'indice.json'))
+    indice.registrar(str(original), 7, 'COMPANY_OFFLINE.txt')
+
+    copia = tmp_path / 'TXN_20260101 (1).xlsx'
+    copia.write_bytes(b'conteudo')
+    assert not indice.candidato_processado(str(tmp_path), _candidato(str(copia)))
+    assert indice.consultar(str(copia))['lote'] == '000007'
+    # Depois do hash calculado, a assinatura basta
+    lidos = _contar_hashes(monkeypatch)
+    assert indice.candidato_processado(str(tmp_path), _candidato(str(copia)))
+    assert lidos == []
+
+
+def test_assinaturas_de_arquivos_removidos_sao_podadas(tmp_path):
+    indice = IndiceProcessados(str(tmp_path / 'indice.json'))
+    for nome in ('a.xlsx', 'b.xlsx'):
+        (tmp_path / nome).write_bytes(nome.encode())
+        indice.hash_do_arquivo(str(tmp_path / nome))
+    os.remove(tmp_path / 'a.xlsx')
+
+    assert indice.podar_assinaturas() == 1
+    assert indice.podar_assinaturas() == 0
+    (tmp_path / 'b.xlsx').write_bytes(b'alterado')
+    assert indice.podar_assinaturas() == 1
@@ -0,0 +1,39 @@
+import pandas as pd
+
+from moeda import COLUNA_CENTAVOS
+from offline_validacao import COLUNA_MOTIVO, luhn_valido, normalizar_cartoes, validar_registros
+
+
+def test_normalizar_cartoes_remove_sufixo_de_float():
+    cartoes = normalizar_cartoes(pd.Series([4111111111111111.0, ' 4111111111111111 ', None]))
+    assert cartoes.tolist()[:2] == ['4111111111111111', '4111111111111111']
+    assert pd.isna(cartoes[2])
+
+
+def test_luhn():
+    cartoes = pd.Series(['4111111111111111', '4111111111111112', '79927398713', '5500000000000004',
+                         '41111111111x1111', '', '0'])
+    assert luhn_valido(cartoes).tolist() == [True, False, True, True, False, False, True]
+
+
+def test_validar_registros_separa_validos_e_rejeitados_com_motivos():
+    df = pd.DataFrame({
+        'NUMERO CARTÃO': ['4111111111111111', '4111111111111112', '411111111111', '4111111111111111',
+                          '5500000000000004'],
+        'TXN': [101, 101, 101, 10000, 7],
+        'VALOR': ['10.05', '1', '1', '0', 0.1],
+        'DATA DE ENVIO': ['2026-10-19', '2026-10-19', '2026-10-19', None, '2026-10-19'],
+    }, index=[10, 11, 12, 13, 14])
+
+    validos, rejeitados = validar_registros(df)
+
+    assert validos['NUMERO CARTÃO'].tolist() == ['4111111111111111', '5500000000000004']
+    assert validos[COLUNA_CENTAVOS].tolist() == [1005, 10]
+    assert validos['TXN'].dtype == 'int64'
+    assert validos.index.tolist() == [0, 1]
+
+    motivos = dict(zip(rejeitados['LINHA PLANILHA'], rejeitados[COLUNA_MOTIVO]))
+    assert motivos[13] == 'Cartão com dígito verificador inválido'
+    assert motivos[14] == 'Cartão deve ter 16 dígitos'
+    assert motivos[15] == ('TXN fora da faixa 1-9999; Valor não positivo ou inválido; '
+                           'Data de envio vazia ou inválida')
@@ -0,0 +1,40 @@
+import datetime
+import threading
+import time
+
+from painel_agendador import AgendadorHeap, PoolExecucao
+
+
+def test_reinicio_mantem_o_pool_e_nao_dispara_de_novo_o_que_esta_rodando():
+    vencimento = datetime.datetime(2026, 10, 1, 8, 0)
+    liberar = threading.Event()
+    iniciou = threading.Event()
+    disparos = []
+
+    def carregar():
+        # O banco mantém a data antiga enquanto o agendamento roda
+        return [(1, vencimento, 10, 'Alta', ())]
+
+    def disparar(agendamento_id):
+        disparos.append(agendamento_id)
+        iniciou.set()
+        liberar.wait(5)
+        return None
+
+    pool = PoolExecucao(max_simultaneas=2)
+    agendador = AgendadorHeap(carregar, disparar, agora=lambda: vencimento, pool=pool)
+    agendador.iniciar()
+    assert iniciou.wait(5)
+
+    agendador.parar(aguardar=5, parar_pool=False)
+    agendador.iniciar()
+    assert pool.ativo and agendador.pool is pool
+    limite = time.monotonic() + 5
+    while agendador.recargas < 2 and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert agendador.recargas == 2
+    liberar.set()
+    agendador.parar(aguardar=5)
+
+    assert disparos == [1]
+    assert not pool.ativo
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+
+from painel_execucao import BufferCircular, ExecucaoProcesso, limpar_logs, limpar_logs_tarefa
+
+
+def test_buffer_circular_mantem_os_ultimos_bytes_com_posicoes_absolutas():
+    buffer = BufferCircular(capacidade=10)
+    buffer.escrever(b'abcdef')
+    dados, posicao, descartados = buffer.ler_desde(0)
+    assert (dados, posicao, descartados) == (b'abcdef', 6, 0)
+
+    buffer.escrever(b'ghijkl')
+    assert buffer.total == 12
+    # Quem estava na posição 6 recebe só o que chegou depois
+    assert buffer.ler_desde(posicao) == (b'ghijkl', 12, 0)
+    # Quem começa do zero perde os 2 bytes mais antigos
+    assert buffer.ler_desde(0) == (b'cdefghijkl', 12, 2)
+
+
+def test_buffer_circular_bloco_maior_que_a_capacidade():
+    buffer = BufferCircular(capacidade=4)
+    buffer.escrever(b'ab')
+    buffer.escrever(b'0123456789')
+    assert buffer.ler_desde(0) == (b'6789', 12, 8)
+    assert buffer.ler_desde(12) == (b'', 12, 0)
+
+
+def test_log_completo_vem_do_arquivo_e_nao_so_do_buffer(tmp_path):
+    execucao = ExecucaoProcesso(
+        [sys.executable, '-c', "for i in range(2000): print(f'linha {i}')"],
+        arquivo_log=str(tmp_path / 'tarefa_1' / 'execucao.log'), tamanho_buffer=1024)
+    execucao.iniciar()
+    assert execucao.aguardar() == 0
+
+    assert 'bytes iniciais omitidos' in execucao.resumo()
+    completo = execucao.log_completo().splitlines()
+    assert completo[0] == 'linha 0' and completo[-1] == 'linha 1999' and len(completo) == 2000
+
+
+def _criar_logs(diretorio, quantidade, idade_dias=0):
+    os.makedirs(diretorio, exist_ok=True)
+    agora = time.time()
+    caminhos = []
+    for i in range(quantidade):
+        caminho = os.path.join(diretorio, f'2026010{i}_000000_000000.log')
+        with open(caminho, 'w') as f:
+            f.write('saida')
+        mtime = agora - idade_dias * 86400 - (quantidade - i)  # o último criado é o mais recente
+        os.utime(caminho, (mtime, mtime))
+        caminhos.append(caminho)
+    return caminhos
+
+
+def test_retencao_mantem_apenas_os_mais_recentes(tmp_path):
+    caminhos = _criar_logs(str(tmp_path / 'tarefa_1'), 5)
+    assert limpar_logs_tarefa(str(tmp_path / 'tarefa_1'), maximo=2) == 3
+    assert sorted(os.listdir(tmp_path / 'tarefa_1')) == sorted(os.path.basename(c) for c in caminhos[-2:])
+
+
+def test_retencao_apaga_antigos_e_remove_diretorio_vazio(tmp_path):
+    _criar_logs(str(tmp_path / 'tarefa_1'), 3, idade_dias=40)
+    _criar_logs(str(tmp_path / 'tarefa_2'), 2)
+    (tmp_path / 'outro').mkdir()
+
+    assert limpar_logs(str(tmp_path), dias=30) == 3
+    assert not (tmp_path / 'tarefa_1').exists()
+    assert len(os.listdir(tmp_path / 'tarefa_2')) == 2
+    assert (tmp_path / 'outro').exists()
+    assert limpar_logs(str(tmp_path / 'inexistente')) == 0
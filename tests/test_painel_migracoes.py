@@ -0,0 +1,93 @@
+import sqlite3
+import threading
+
+import pytest
+
+import painel_migracoes
+
+
+@pytest.fixture
+def painel(monkeypatch):
+    monkeypatch.setenv('DB_USER', 'teste')
+    monkeypatch.setenv('BANCO_USERAVERBACAO', 'teste')
+    modulo = pytest.importorskip('PainelDesktop')
+    monkeypatch.setattr(modulo, 'SQLSERVER_AVAILABLE', False)  # ramo sqlite3 puro
+    return modulo
+
+
+def _app(painel, db_path):
+    app = painel.PainelDesktop.__new__(painel.PainelDesktop)
+    app.using_sqlite = True
+    app.db_path = str(db_path)
+    return app
+
+
+def _banco_antigo(db_path):
+    # Banco criado antes das colunas novas e do controle de versões
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE painel_tarefas (id INTEGER PRIMARY KEY, titulo TEXT)")
+    conn.execute("CREATE TABLE painel_execucoes (id INTEGER PRIMARY KEY, tarefa_id INTEGER, data_execucao TIMESTAMP)")
+    for tabela in ('painel_agendamentos', 'painel_alertas', 'painel_execucoes_diarias'):
+        conn.execute(f"CREATE TABLE {tabela} (id INTEGER PRIMARY KEY, ativo, proxima_execucao, resolvido, "
+                     "tipo, data_criacao, dia)")
+    conn.commit()
+    conn.close()
+
+
+def _colunas(conn, tabela):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({tabela})")]
+
+
+def test_migracoes_sao_idempotentes(painel, tmp_path):
+    db_path = tmp_path / 'painel.db'
+    _banco_antigo(db_path)
+    app = _app(painel, db_path)
+    app.run_migrations()
+    app.run_migrations()
+
+    conn = sqlite3.connect(db_path)
+    assert [r[0] for r in conn.execute("SELECT versao FROM painel_schema_versao ORDER BY versao")] == [1, 2]
+    assert _colunas(conn, 'painel_tarefas').count('timeout_minutos') == 1
+    assert _colunas(conn, 'painel_execucoes').count('log_hash') == 1
+    assert painel_migracoes.pendentes([1, 2]) == []
+
+
+def test_migracao_com_erro_nao_registra_versao_nem_aplica_parte(painel, tmp_path, monkeypatch):
+    db_path = tmp_path / 'painel.db'
+    _banco_antigo(db_path)
+    app = _app(painel, db_path)
+    app.run_migrations()
+
+    def passo_invalido(dialeto, consultar):
+        return ["ALTER TABLE tabela_inexistente ADD coluna INTEGER"]
+    monkeypatch.setattr(painel_migracoes, 'MIGRACOES', painel_migracoes.MIGRACOES + [
+        (3, 'Falha no meio', [painel_migracoes.adicionar_coluna('painel_tarefas', 'nova', 'INTEGER'), passo_invalido]),
+    ])
+    with pytest.raises(sqlite3.OperationalError):
+        app.run_migrations()
+
+    conn = sqlite3.connect(db_path)
+    assert [r[0] for r in conn.execute("SELECT versao FROM painel_schema_versao")] == [1, 2]
+    assert 'nova' not in _colunas(conn, 'painel_tarefas')
+
+
+def test_instancias_simultaneas_aplicam_cada_versao_uma_vez(painel, tmp_path):
+    db_path = tmp_path / 'painel.db'
+    _banco_antigo(db_path)
+    erros = []
+
+    def migrar():
+        try:
+            _app(painel, db_path).run_migrations()
+        except Exception as e:
+            erros.append(e)
+
+    threads = [threading.Thread(target=migrar) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert erros == []
+    conn = sqlite3.connect(db_path)
+    assert [r[0] for r in conn.execute("SELECT versao FROM painel_schema_versao ORDER BY versao")] == [1, 2]
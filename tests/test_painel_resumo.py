@@ -0,0 +1,81 @@
+import datetime
+import sqlite3
+
+import painel_resumo
+
+
+def _banco():
+    conn = sqlite3.connect(':memory:')
+    conn.executescript("""
+        CREATE TABLE painel_execucoes (id INTEGER PRIMARY KEY, tarefa_id INTEGER, data_execucao TIMESTAMP,
+                                       status TEXT, duracao_segundos REAL);
+        CREATE TABLE painel_alertas (id INTEGER PRIMARY KEY, resolvido BOOLEAN DEFAULT 0);
+        CREATE TABLE painel_resumo (chave TEXT PRIMARY KEY, valor INTEGER NOT NULL DEFAULT 0,
+                                    valor_data TIMESTAMP);
+        CREATE TABLE painel_execucoes_diarias (
+            tarefa_id INTEGER NOT NULL, dia DATE NOT NULL, execucoes INTEGER NOT NULL DEFAULT 0,
+            sucessos INTEGER NOT NULL DEFAULT 0, erros INTEGER NOT NULL DEFAULT 0,
+            timeouts INTEGER NOT NULL DEFAULT 0, duracao_total REAL NOT NULL DEFAULT 0,
+            duracao_min REAL, duracao_max REAL, PRIMARY KEY (tarefa_id, dia));
+    """)
+    return conn
+
+
+def _registrar_execucao(conn, tarefa_id, status, data_execucao, duracao):
+    # Mesmo caminho incremental de execute_task_by_id (record_execution_summary)
+    conn.execute("INSERT INTO painel_execucoes (tarefa_id, data_execucao, status, duracao_segundos) "
+                 "VALUES (?, ?, ?, ?)", (tarefa_id, data_execucao.isoformat(' '), status, duracao))
+    for chave, valor in painel_resumo.incrementos_execucao(status, data_execucao).items():
+        conn.execute(painel_resumo.sql_incrementar('sqlite'), {'chave': chave, 'valor': valor})
+    conn.execute(painel_resumo.sql_ultima_execucao('sqlite'), {'data': data_execucao.isoformat(' ')})
+    conn.execute(painel_resumo.sql_consolidar_execucao('sqlite'),
+                 painel_resumo.valores_consolidado(tarefa_id, status, data_execucao, duracao, 'sqlite'))
+
+
+def _estado(conn):
+    resumo = sorted(conn.execute("SELECT chave, valor, valor_data FROM painel_resumo"))
+    diarias = sorted(conn.execute("SELECT * FROM painel_execucoes_diarias"))
+    return resumo, diarias
+
+
+def test_incrementos_e_reconciliacao_chegam_ao_mesmo_resultado():
+    conn = _banco()
+    base = datetime.datetime(2026, 10, 18, 9, 30)
+    execucoes = [(1, 'sucesso', base, 2.5), (1, 'erro', base + datetime.timedelta(hours=3), 1.0),
+                 (2, 'timeout', base + datetime.timedelta(days=1), 300.0),
+                 (1, 'sucesso', base + datetime.timedelta(days=1, minutes=5), 4.0)]
+    for execucao in execucoes:
+        _registrar_execucao(conn, *execucao)
+    # Alertas: dois criados pendentes, um deles resolvido depois
+    for _ in range(2):
+        conn.execute("INSERT INTO painel_alertas (resolvido) VALUES (0)")
+        conn.execute(painel_resumo.sql_incrementar('sqlite'),
+                     {'chave': painel_resumo.CHAVE_ALERTAS_PENDENTES, 'valor': 1})
+    conn.execute("UPDATE painel_alertas SET resolvido = 1 WHERE id = 1")
+    conn.execute(painel_resumo.sql_incrementar('sqlite'),
+                 {'chave': painel_resumo.CHAVE_ALERTAS_PENDENTES, 'valor': -1})
+
+    incremental = _estado(conn)
+    for sql in painel_resumo.sql_reconciliar('sqlite'):
+        conn.execute(sql)
+    assert _estado(conn) == incremental
+
+    resumo = {chave: (valor, valor_data) for chave, valor, valor_data in incremental[0]}
+    assert resumo[painel_resumo.CHAVE_TOTAL][0] == 4
+    assert resumo[painel_resumo.CHAVE_SUCESSO][0] == 2
+    assert resumo[painel_resumo.CHAVE_ALERTAS_PENDENTES][0] == 1
+    assert resumo[painel_resumo.chave_dia(base.date())][0] == 2
+    assert resumo[painel_resumo.CHAVE_ULTIMA_EXECUCAO][1] == '2026-10-19 09:35:00'
+
+
+def test_execucoes_por_dia_le_do_consolidado():
+    conn = _banco()
+    hoje = datetime.date(2026, 10, 19)
+    _registrar_execucao(conn, 1, 'sucesso', datetime.datetime(2026, 10, 19, 8), 2.0)
+    _registrar_execucao(conn, 2, 'erro', datetime.datetime(2026, 10, 19, 9), 6.0)
+    _registrar_execucao(conn, 1, 'sucesso', datetime.datetime(2026, 10, 1, 9), 1.0)
+
+    sql, parametros = painel_resumo.sql_execucoes_por_dia(7, hoje=hoje)
+    assert conn.execute(sql, parametros).fetchall() == [('2026-10-19', 2, 1, 1, 0, 8.0, 2.0, 6.0)]
+    sql, parametros = painel_resumo.sql_execucoes_por_dia(30, tarefa_id=1, hoje=hoje)
+    assert [linha[:2] for linha in conn.execute(sql, parametros)] == [('2026-10-01', 1), ('2026-10-19', 1)]
@@ -0,0 +1,45 @@
+import types
+
+import pytest
+
+import perfis
+from perfis import ErroPerfil, aplicar_perfil
+
+
+@pytest.fixture
+def rotinas(tmp_path, monkeypatch):
+    (tmp_path / 'ROTINAX.py').write_text("INPUT_DIR = 'P:/producao'\nDB_CONFIG = {'host_name': 'prod'}\n")
+    (tmp_path / 'ROTINAY.py').write_text("SERVIDOR_SMTP = 'smtp.prod'\n")
+    monkeypatch.setattr(perfis, 'DIRETORIO_ROTINAS', str(tmp_path))
+    modulo = types.ModuleType('ROTINAX__teste')
+    modulo.INPUT_DIR = 'P:/producao'
+    modulo.DB_CONFIG = {'host_name': 'prod', 'port': 1433}
+    return modulo
+
+
+def test_aplica_constantes_comuns_e_mescla_dicionarios(rotinas):
+    aplicar_perfil(rotinas, 'teste', {'INPUT_DIR': 'T:/teste', 'DB_CONFIG': {'host_name': 'hml'}})
+    assert rotinas.INPUT_DIR == 'T:/teste'
+    assert rotinas.DB_CONFIG == {'host_name': 'hml', 'port': 1433}
+    assert rotinas.PERFIL == 'teste'
+
+
+def test_chave_comum_de_outra_rotina_e_ignorada(rotinas):
+    aplicar_perfil(rotinas, 'teste', {'SERVIDOR_SMTP': 'smtp.hml'})
+    assert not hasattr(rotinas, 'SERVIDOR_SMTP')
+
+
+def test_chave_comum_que_nenhuma_rotina_possui_e_rejeitada(rotinas):
+    with pytest.raises(ErroPerfil, match='INPUT_DRI'):
+        aplicar_perfil(rotinas, 'teste', {'INPUT_DRI': 'T:/teste'})
+    assert rotinas.INPUT_DIR == 'P:/producao'
+
+
+def test_chave_especifica_desconhecida_e_rejeitada(rotinas):
+    with pytest.raises(ErroPerfil):
+        aplicar_perfil(rotinas, 'teste', {'rotinas': {'ROTINAX': {'SERVIDOR_SMTP': 'smtp.hml'}}})
+
+
+def test_tipo_incompativel_e_rejeitado(rotinas):
+    with pytest.raises(ErroPerfil):
+        aplicar_perfil(rotinas, 'teste', {'INPUT_DIR': 3})